@@ -0,0 +1,72 @@
+#!python
+# -*- coding: utf-8 -*-
+import time
+import asyncio
+import subprocess
+import pytest
+from turbogenius.pyturbo.utils.execute import run, run_async, run_many, shell_needed
+
+
+def test_shell_needed():
+    assert not shell_needed("mpirun -np 4 turborvb-mpi.x")
+    assert not shell_needed("forcevmc.sh 10 -5 1")
+    assert shell_needed("(echo '1 1 0 0'; echo '0') | readalles.x")
+    assert shell_needed("OMP_NUM_THREADS=1 turborvb-serial.x")
+
+
+def test_run(tmp_path):
+    input_name = str(tmp_path / "in.test")
+    output_name = str(tmp_path / "out.test")
+    with open(input_name, "w") as f:
+        f.write("line 1\nline 2\n")
+    assert run("cat", input_name=input_name, output_name=output_name) == 0
+    with open(output_name) as f:
+        assert f.read() == "line 1\nline 2\n"
+
+    # pipelines are executed by a shell
+    run("cat | wc -l", input_name=input_name, output_name=output_name)
+    with open(output_name) as f:
+        assert int(f.read()) == 2
+
+    with pytest.raises(subprocess.CalledProcessError):
+        run("false", output_name=output_name)
+    with pytest.raises(asyncio.TimeoutError):
+        run("sleep 10", output_name=output_name, timeout=0.5)
+
+
+def test_run_async_progress(tmp_path):
+    input_name = str(tmp_path / "in.test")
+    output_name = str(tmp_path / "out.test")
+    with open(input_name, "w") as f:
+        f.write("".join(f"line {n}\n" for n in range(1000)))
+    lines = []
+    asyncio.run(
+        run_async(
+            "cat",
+            input_name=input_name,
+            output_name=output_name,
+            progress=lines.append,
+            chunk=64,
+        )
+    )
+    assert lines == [f"line {n}" for n in range(1000)]
+
+
+def test_run_many(tmp_path):
+    jobs = [
+        {"binary": "sleep 0.5", "output_name": str(tmp_path / f"out.{n}")}
+        for n in range(4)
+    ]
+    start = time.monotonic()
+    assert asyncio.run(run_many(jobs, max_concurrency=4)) == [0] * 4
+    assert time.monotonic() - start < 1.5
+
+    # a failure cancels the other jobs
+    jobs = [{"binary": "false", "output_name": str(tmp_path / "out.0")}] + [
+        {"binary": "sleep 10", "output_name": str(tmp_path / f"out.{n}")}
+        for n in range(1, 4)
+    ]
+    start = time.monotonic()
+    with pytest.raises(subprocess.CalledProcessError):
+        asyncio.run(run_many(jobs, max_concurrency=2))
+    assert time.monotonic() - start < 5.0
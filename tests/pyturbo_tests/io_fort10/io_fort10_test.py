@@ -2,7 +2,14 @@
 # -*- coding: utf-8 -*-
 import os
 import shutil
-from turbogenius.pyturbo.io_fort10 import IO_fort10
+import numpy as np
+import pytest
+from scipy.io import FortranFile
+from turbogenius.pyturbo.io_fort10 import IO_fort10, F10index, F10cache, probe_fort10
+from turbogenius.pyturbo.utils.utility import (
+    pysed_replace_lines,
+    remove_new_parameter_lines_in_fort10,
+)
 
 data_dir = os.path.dirname(os.path.abspath(__file__))
 
@@ -220,8 +227,8 @@ def test_fort10_hBN():
     io_fort10 = IO_fort10(os.path.join(data_dir, "fort.10"), in_place=True)
     assert not io_fort10.f10structure.ortho_flag
     assert io_fort10.complex_flag
-    assert io_fort10.f10detmatrix.coeff_real == [1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0]
-    assert io_fort10.f10detmatrix.coeff_imag == [0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0]
+    assert io_fort10.f10detmatrix.coeff_real.tolist() == [1.0] * 8
+    assert io_fort10.f10detmatrix.coeff_imag.tolist() == [0.0] * 8
     assert io_fort10.f10structure.phase_up == [+0.25, +0.35, +0.45]
     assert io_fort10.f10structure.phase_dn == [-0.25, -0.35, -0.45]
 
@@ -275,3 +282,487 @@ def test_fort10_ansatz_type():
 
     io_fort10 = IO_fort10(os.path.join(data_dir, "fort.10_O_solid"), in_place=False)
     assert io_fort10.ansatz_type == "sd"
+
+
+def test_fort10_index():
+    shutil.copy(
+        os.path.join(data_dir, "fort.10_hydrogen"), os.path.join(data_dir, "fort.10")
+    )
+    io_fort10 = IO_fort10(os.path.join(data_dir, "fort.10"), in_place=True)
+    index = F10index.get(os.path.join(data_dir, "fort.10"))
+    assert io_fort10.f10detmatrix.index is index
+    assert index.lineno("Ion coordinates") == 12
+    assert index.lineno("Nonzero values of  detmat *$") == 245
+    assert index.lineno("New parameters *$") == index.num_lines == 1039
+    assert io_fort10.f10structure.start_lineno == 13
+    assert io_fort10.f10structure.end_lineno == 16
+
+    # the index is rebuilt when fort.10 is modified.
+    with open(os.path.join(data_dir, "fort.10"), "r") as f:
+        lines = f.readlines()
+    with open(os.path.join(data_dir, "fort.10"), "w") as f:
+        f.writelines(lines[:12] + ["\n"] + lines[12:])
+    assert index.lineno("Ion coordinates") == 13
+    assert index.num_lines == 1040
+
+
+def test_fort10_probe():
+    for name in sorted(os.listdir(data_dir)):
+        if not name.startswith("fort.10_"):
+            continue
+        io_fort10 = IO_fort10(os.path.join(data_dir, name), in_place=False)
+        probe = probe_fort10(os.path.join(data_dir, name))
+        assert probe["pp_flag"] == io_fort10.pp_flag
+        assert probe["pbc_flag"] == io_fort10.pbc_flag
+        assert probe["complex_flag"] == io_fort10.complex_flag
+        assert probe["pfaff_flag"] == io_fort10.f10header.pfaff_flag
+        assert probe["natom"] == io_fort10.f10header.natom
+        assert probe["neldn"] == io_fort10.f10header.neldn
+        assert probe["det_mat_nonzero"] == io_fort10.f10header.det_mat_nonzero
+        assert probe["atomic_numbers"] == io_fort10.f10structure.atomic_numbers
+
+
+def test_fort10_force_matrix():
+    io_fort10 = IO_fort10(os.path.join(data_dir, "fort.10_hydrogen"), in_place=False)
+    constraint = io_fort10.f10forceconstraint
+    force_matrix = constraint.force_matrix([0.5], natom=2)
+    assert np.array_equal(force_matrix, [[0.0, 0.0, 0.25], [0.0, 0.0, -0.25]])
+    force_matrix = constraint.force_matrix([0.5], natom=2, signed=False)
+    assert np.array_equal(force_matrix, [[0.0, 0.0, 0.25], [0.0, 0.0, 0.25]])
+
+    io_fort10 = IO_fort10(os.path.join(data_dir, "fort.10_O_solid"), in_place=False)
+    constraint = io_fort10.f10forceconstraint
+    force_matrix = constraint.force_matrix([1.0, 2.0, 3.0, 4.0], natom=4)
+    assert np.array_equal(
+        force_matrix,
+        [[0.5, 0.0, 1.0], [-0.5, 0.0, -1.0], [1.5, 0.0, 2.0], [-1.5, 0.0, -2.0]],
+    )
+
+
+def test_fort10_force_matrix_mixed_signs(tmp_path):
+    # the sign of each atom comes from its own label, e.g., in [-1, 2, -4]
+    # only the atoms 1 and 4 are flipped (baseline get_forces flipped the
+    # sign cumulatively, i.e., the atoms 1 and 2)
+    with open(os.path.join(data_dir, "fort.10_O_solid"), "r") as f:
+        lines = f.read().splitlines(keepends=True)
+    lines[24:28] = [
+        "           3          -1           1           2           1"
+        "          -4           1\n",
+        "           1           3           1\n",
+        "           2          -1           3           2           3\n",
+        "           1           3           3\n",
+    ]
+    fort10 = str(tmp_path / "fort.10")
+    with open(fort10, "w") as f:
+        f.writelines(lines)
+    constraint = IO_fort10(fort10, in_place=False).f10forceconstraint
+    assert constraint.atom_label == [-1, 2, -4, 3, -1, 2, 3]
+    force_matrix = constraint.force_matrix([3.0, 2.0, 4.0, 5.0], natom=4)
+    assert np.array_equal(
+        force_matrix,
+        [[-1.0, 0.0, -2.0], [1.0, 0.0, 2.0], [2.0, 0.0, 5.0], [-1.0, 0.0, 0.0]],
+    )
+    force_matrix = constraint.force_matrix([3.0, 2.0, 4.0, 5.0], natom=4, signed=False)
+    assert np.array_equal(
+        force_matrix,
+        [[1.0, 0.0, 2.0], [1.0, 0.0, 2.0], [2.0, 0.0, 5.0], [1.0, 0.0, 0.0]],
+    )
+
+
+def test_fort10_matsymmetry():
+    io_fort10 = IO_fort10(os.path.join(data_dir, "fort.10_hydrogen"))
+    detmat_sym = io_fort10.f10detmat_sym
+    assert len(detmat_sym.constraint_num) == 133
+    assert detmat_sym.constraint_num[:3] == [2, 2, 2]
+    assert detmat_sym.row[:4] == [1, 24, 1, 24]
+    assert detmat_sym.column[:4] == [1, 24, 2, 25]
+    assert len(detmat_sym.row) == len(detmat_sym.constraint_index) == 302
+
+
+def test_fort10_set_group_parameters():
+    fort10 = os.path.join(data_dir, "fort.10")
+    shutil.copy(os.path.join(data_dir, "fort.10_hydrogen"), fort10)
+    io_fort10 = IO_fort10(fort10)
+    iesfree = io_fort10.f10header.iesfree
+    iessw = io_fort10.f10header.iessw
+    detmat_fixed = io_fort10.f10detmatrix.to_sparse().todok()[46, 46]
+    jasmat = np.arange(1, iesfree + 1) * 0.01
+    detmat = -np.arange(1, iessw + 1) * 0.1
+    io_fort10.set_group_parameters(jasmat=jasmat, detmat=detmat)
+
+    io_fort10 = IO_fort10(fort10)
+    for values, matrix, symmetry in (
+        (jasmat, io_fort10.f10jasmatrix.to_sparse().todok(), io_fort10.f10jasmat_sym),
+        (detmat, io_fort10.f10detmatrix.to_sparse().todok(), io_fort10.f10detmat_sym),
+    ):
+        num = symmetry.constraint_num
+        for group, row, col in zip(
+            symmetry.constraint_index, symmetry.row, symmetry.column
+        ):
+            if num[group] > 0:
+                expected = values[group] * np.sign(row)
+                assert matrix[abs(row) - 1, abs(col) - 1] == pytest.approx(expected)
+    # the fixed parameter (a group with -1 pair) is left untouched
+    assert io_fort10.f10detmatrix.to_sparse().todok()[46, 46] == detmat_fixed
+    os.remove(fort10)
+
+
+def test_fort10_average_group_parameters(tmp_path):
+    fort10 = str(tmp_path / "fort.10")
+    shutil.copy(os.path.join(data_dir, "fort.10_hydrogen"), fort10)
+    io_fort10 = IO_fort10(fort10)
+    iessw = io_fort10.f10header.iessw
+    jasmat_before = io_fort10.f10jasmatrix.coeff.copy()
+    history = np.random.default_rng(0).normal(0.0, 1.0, (30, iessw))
+    fort12 = str(tmp_path / "fort.12")
+    with FortranFile(fort12, "w") as f:
+        for record in history:
+            f.write_record(record)
+
+    # only detmat is optimized
+    input_name = str(tmp_path / "datasmin.input")
+    with open(input_name, "w") as f:
+        f.write("&parameters\n    iesd=0\n    iessw=1\n    !iesfree=1\n/\n")
+    io_fort10.average_group_parameters(
+        fort12=fort12, input_name=input_name, start=10
+    )
+    io_fort10 = IO_fort10(fort10)
+    detmat = io_fort10.f10detmatrix.to_sparse().todok()
+    symmetry = io_fort10.f10detmat_sym
+    averages = np.mean(history[10:], axis=0)
+    for group, row, col in zip(
+        symmetry.constraint_index, symmetry.row, symmetry.column
+    ):
+        if symmetry.constraint_num[group] > 0:
+            expected = averages[group] * np.sign(row)
+            assert detmat[abs(row) - 1, abs(col) - 1] == pytest.approx(expected)
+    assert np.array_equal(io_fort10.f10jasmatrix.coeff, jasmat_before)
+
+    # jasmat is also optimized, but fort.12 has only the detmat parameters
+    with open(input_name, "w") as f:
+        f.write("&parameters\n    iesfree=1\n    iessw=1\n/\n")
+    with pytest.raises(ValueError):
+        io_fort10.average_group_parameters(fort12=fort12, input_name=input_name)
+    # the other parameters are left to turborvb-serial.x
+    with open(input_name, "w") as f:
+        f.write("&parameters\n    iesd=1\n    iessw=1\n/\n")
+    with open(fort10, "r") as f:
+        averaged = f.read()
+    with pytest.raises(NotImplementedError):
+        io_fort10.average_group_parameters(fort12=fort12, input_name=input_name)
+    with open(fort10, "r") as f:
+        assert f.read() == averaged
+    # so is a complex detmat
+    shutil.copy(os.path.join(data_dir, "fort.10_hBN"), fort10)
+    with open(input_name, "w") as f:
+        f.write("&parameters\n    iessw=1\n/\n")
+    with pytest.raises(NotImplementedError):
+        IO_fort10(fort10).check_group_parameters(
+            fort12=fort12, input_name=input_name
+        )
+    shutil.copy(os.path.join(data_dir, "fort.10_hydrogen"), fort10)
+    assert IO_fort10(fort10).check_group_parameters(
+        fort12=fort12, input_name=input_name
+    ) == (0, iessw)
+
+    # the sign of a negative column index is not dropped silently
+    symmetry = IO_fort10(fort10, in_place=True).f10detmat_sym
+    column = symmetry.column
+    column[0] = -column[0]
+    symmetry.column = column
+    with pytest.raises(ValueError):
+        IO_fort10(fort10).f10detmat_sym.scatter(np.zeros(iessw))
+
+
+def test_fort10_read_section_bytes():
+    shutil.copy(
+        os.path.join(data_dir, "fort.10_hydrogen"), os.path.join(data_dir, "fort.10")
+    )
+    io_fort10 = IO_fort10(os.path.join(data_dir, "fort.10"), in_place=True)
+    structure = io_fort10.f10structure
+    with open(os.path.join(data_dir, "fort.10"), "r") as f:
+        lines = f.read().splitlines()
+    assert structure.read_lines() == lines[13:17]
+    assert structure.read_bytes().count(b"\n") == 4
+    assert not io_fort10.f10detmatrix.read_flag
+    assert io_fort10.f10structure.positions.shape == (2, 3)
+
+
+def test_fort10_detmat_jasmat():
+    shutil.copy(
+        os.path.join(data_dir, "fort.10_hydrogen"), os.path.join(data_dir, "fort.10")
+    )
+    io_fort10 = IO_fort10(os.path.join(data_dir, "fort.10"), in_place=True)
+    detmat = io_fort10.f10detmatrix
+    assert len(detmat.row) == io_fort10.f10header.det_mat_nonzero == 302
+    assert detmat.row.dtype == np.int32
+    assert detmat.row[:3].tolist() == [1, 1, 1]
+    assert detmat.col[:3].tolist() == [1, 2, 3]
+    assert detmat.locator[1].tolist() == [[247, 0], [247, 1], [247, 2]]
+    assert io_fort10.f10jasmatrix.locator[3].tolist() == [[711, 0], [711, 1], [711, 2]]
+    assert io_fort10.f10jasmatrix.coeff[3] == 1.0
+
+    coeff_real = detmat.coeff_real
+    coeff_real[[0, 10, 100]] = [0.5, -0.25, 2.0]
+    detmat.coeff_real = coeff_real
+    coeff = io_fort10.f10jasmatrix.coeff
+    coeff[-1] = 3.0
+    io_fort10.f10jasmatrix.coeff = coeff
+
+    io_fort10 = IO_fort10(os.path.join(data_dir, "fort.10"), in_place=True)
+    assert np.array_equal(io_fort10.f10detmatrix.coeff_real, coeff_real)
+    assert np.array_equal(io_fort10.f10jasmatrix.coeff, coeff)
+
+    # the comment lines following the matrices are not read
+    shutil.copy(
+        os.path.join(data_dir, "fort.10_N_agps_js"), os.path.join(data_dir, "fort.10")
+    )
+    io_fort10 = IO_fort10(os.path.join(data_dir, "fort.10"), in_place=True)
+    assert len(io_fort10.f10detmatrix.row) == 1065
+    assert io_fort10.f10jasmatrix.col.tolist() == [1, 2, 2]
+
+
+def test_fort10_transaction():
+    shutil.copy(
+        os.path.join(data_dir, "fort.10_hydrogen"), os.path.join(data_dir, "fort.10")
+    )
+    with open(os.path.join(data_dir, "fort.10"), "r") as f:
+        original = f.read()
+    io_fort10 = IO_fort10(os.path.join(data_dir, "fort.10"), in_place=True)
+    coeff_real = io_fort10.f10detmatrix.coeff_real
+    coeff_real[:] = np.arange(len(coeff_real)) * 0.125
+    with io_fort10.transaction() as transaction:
+        io_fort10.f10detmatrix.coeff_real = coeff_real
+        with io_fort10.transaction():
+            io_fort10.f10header.iesfree = 7
+        # 301 coefficients (the first one is unchanged) + iesfree
+        assert transaction.num_edits == len(coeff_real)
+        with open(os.path.join(data_dir, "fort.10"), "r") as f:
+            assert f.read() == original
+    assert transaction.num_edits == 0
+
+    io_fort10 = IO_fort10(os.path.join(data_dir, "fort.10"), in_place=True)
+    assert np.array_equal(io_fort10.f10detmatrix.coeff_real, coeff_real)
+    assert io_fort10.f10header.iesfree == 7
+    assert io_fort10.f10structure.positions.shape == (2, 3)
+
+    # an exception discards the edits
+    with open(os.path.join(data_dir, "fort.10"), "r") as f:
+        committed = f.read()
+    try:
+        with io_fort10.transaction():
+            io_fort10.f10header.iesfree = 8
+            raise RuntimeError
+    except RuntimeError:
+        pass
+    with open(os.path.join(data_dir, "fort.10"), "r") as f:
+        assert f.read() == committed
+    assert io_fort10.f10header.iesfree == 7
+
+
+def test_fort10_sed_replace_lines():
+    shutil.copy(
+        os.path.join(data_dir, "fort.10_hydrogen"), os.path.join(data_dir, "fort.10")
+    )
+    with open(os.path.join(data_dir, "fort.10"), "r") as f:
+        lines = f.readlines()
+    last = len(lines) - 1
+    pysed_replace_lines(
+        os.path.join(data_dir, "fort.10"),
+        lineno_list=[1, 11, last],
+        value_list=[[3], [7, -1], [lines[last].split()[0]]],
+        index_list=[[2], [0, 3], [0]],
+        inplace=True,
+    )
+    with open(os.path.join(data_dir, "fort.10"), "r") as f:
+        replaced = f.readlines()
+    # the other lines (including the last one) are kept as they are
+    assert len(replaced) == len(lines)
+    assert replaced[:1] == lines[:1] and replaced[2:11] == lines[2:11]
+    assert replaced[12:last] == lines[12:last]
+    # only the edited fields are replaced, and the spacing is kept
+    assert replaced[1] == "           1           2           3\n"
+    assert replaced[11] == " 7 133 1 -1\n"
+    assert replaced[last] == lines[last]
+    with open(os.path.join(data_dir, "fort.10_bak"), "r") as f:
+        assert f.readlines() == lines
+    io_fort10 = IO_fort10(os.path.join(data_dir, "fort.10"), in_place=True)
+    assert io_fort10.f10header.iesfree == 7
+
+    # cmd_chunk_num (of the former sed commands) is ignored
+    with pytest.warns(DeprecationWarning):
+        pysed_replace_lines(
+            os.path.join(data_dir, "fort.10"),
+            lineno_list=[11],
+            value_list=[[8]],
+            index_list=[[0]],
+            cmd_chunk_num=10,
+        )
+    assert IO_fort10(os.path.join(data_dir, "fort.10")).f10header.iesfree == 8
+    assert io_fort10.f10header.io_flag == -1
+
+
+def test_fort10_remove_new_parameter_lines():
+    with open(os.path.join(data_dir, "fort.10_hydrogen"), "r") as f:
+        original = f.read()
+    with open(os.path.join(data_dir, "fort.10"), "w") as f:
+        f.write(original + "# new parameters\n 1 2 3\n# new parameters\n 4 5\n")
+    remove_new_parameter_lines_in_fort10(os.path.join(data_dir, "fort.10"), chunk=7)
+    with open(os.path.join(data_dir, "fort.10"), "r") as f:
+        assert f.read() == original
+    # nothing to remove
+    remove_new_parameter_lines_in_fort10(os.path.join(data_dir, "fort.10"), chunk=7)
+    with open(os.path.join(data_dir, "fort.10"), "r") as f:
+        assert f.read() == original
+
+
+def test_fort10_mo_coefficient_streaming():
+    shutil.copy(
+        os.path.join(data_dir, "fort.10_O_solid"), os.path.join(data_dir, "fort.10")
+    )
+    with open(os.path.join(data_dir, "fort.10"), "r") as f:
+        original = f.readlines()
+    io_fort10 = IO_fort10(os.path.join(data_dir, "fort.10"), in_place=True)
+    detbasis = io_fort10.f10detbasissets
+    detbasis.memory_budget = 1024  # the file is streamed with small buffers
+    mo_coefficient = [
+        [0.001 * (i + 1) * (j + 1) for j in range(len(mo_coeff))]
+        for i, mo_coeff in enumerate(detbasis.mo_coefficient)
+    ]
+    detbasis.mo_coefficient = mo_coefficient
+
+    with open(os.path.join(data_dir, "fort.10"), "r") as f:
+        lines = f.readlines()
+    assert len(lines) == len(original)
+    assert lines[: detbasis.start_lineno] == original[: detbasis.start_lineno]
+    assert lines[detbasis.end_lineno + 1 :] == original[detbasis.end_lineno + 1 :]
+    io_fort10 = IO_fort10(os.path.join(data_dir, "fort.10"), in_place=True)
+    assert io_fort10.f10detbasissets.mo_coefficient == mo_coefficient
+
+
+def test_fort10_cache():
+    shutil.copy(
+        os.path.join(data_dir, "fort.10_hBN"), os.path.join(data_dir, "fort.10")
+    )
+    f10cache = F10cache(os.path.join(data_dir, "fort.10"))
+    if os.path.isfile(f10cache.file):
+        os.remove(f10cache.file)
+    io_fort10 = IO_fort10(os.path.join(data_dir, "fort.10"), cache=False)
+    assert not os.path.isfile(f10cache.file)
+    io_fort10 = IO_fort10(os.path.join(data_dir, "fort.10"), cache=True)
+    assert os.path.isfile(f10cache.file)
+    states = f10cache.load()
+    assert "coeff_imag" in "".join(states["f10detmatrix"])
+    assert states["f10structure"]["_F10structure__pbc"]
+
+    cached = IO_fort10(os.path.join(data_dir, "fort.10"), cache=True)
+    assert cached.f10detbasissets.read_flag
+    assert cached.f10header.det_mat_nonzero == io_fort10.f10header.det_mat_nonzero
+    assert cached.f10structure.positions.tolist() == (
+        io_fort10.f10structure.positions.tolist()
+    )
+    assert cached.f10detbasissets.mo_coefficient == (
+        io_fort10.f10detbasissets.mo_coefficient
+    )
+    assert cached.f10detbasissets.exponent == io_fort10.f10detbasissets.exponent
+    assert cached.f10jasbasissets.coefficient == (
+        io_fort10.f10jasbasissets.coefficient
+    )
+    assert np.array_equal(
+        cached.f10detmatrix.coeff_imag, io_fort10.f10detmatrix.coeff_imag
+    )
+
+    # the cached line numbers are used to edit fort.10 in place
+    cached.f10header.iesfree = 5
+    assert f10cache.load() is None  # out of date
+    io_fort10 = IO_fort10(os.path.join(data_dir, "fort.10"), cache=True)
+    assert io_fort10.f10header.iesfree == 5
+    assert f10cache.load() is not None
+    os.remove(f10cache.file)
+
+
+def test_fort10_update_values():
+    shutil.copy(
+        os.path.join(data_dir, "fort.10_hydrogen"), os.path.join(data_dir, "fort.10")
+    )
+    with open(os.path.join(data_dir, "fort.10"), "r") as f:
+        original = f.read()
+
+    # nothing is changed
+    io_fort10 = IO_fort10(os.path.join(data_dir, "fort.10"), in_place=False)
+    io_fort10.f10detmatrix.read()
+    io_fort10.update_values(os.path.join(data_dir, "fort.10_new"))
+    with open(os.path.join(data_dir, "fort.10_new"), "r") as f:
+        assert f.read() == original
+
+    # in-memory changes are written at once
+    io_fort10.f10header.iesfree = 3
+    coeff_real = io_fort10.f10detmatrix.coeff_real * 0.5
+    io_fort10.f10detmatrix.coeff_real = coeff_real
+    mo_coefficient = io_fort10.f10detbasissets.mo_coefficient
+    mo_coefficient[0][1] = 0.125
+    io_fort10.f10detbasissets.mo_coefficient = mo_coefficient
+    assert io_fort10.f10detbasissets.mo_coefficient[0][1] == 0.125
+    io_fort10.update_values(os.path.join(data_dir, "fort.10_new"))
+    with open(os.path.join(data_dir, "fort.10"), "r") as f:
+        assert f.read() == original
+
+    io_fort10_new = IO_fort10(os.path.join(data_dir, "fort.10_new"))
+    assert io_fort10_new.f10header.iesfree == 3
+    assert np.array_equal(io_fort10_new.f10detmatrix.coeff_real, coeff_real)
+    assert io_fort10_new.f10detbasissets.mo_coefficient == mo_coefficient
+    assert io_fort10_new.f10structure.positions.tolist() == (
+        io_fort10.f10structure.positions.tolist()
+    )
+
+    # fort.10 itself is updated by default
+    io_fort10.update_values()
+    with open(os.path.join(data_dir, "fort.10"), "r") as f:
+        updated = f.read()
+    with open(os.path.join(data_dir, "fort.10_new"), "r") as f:
+        assert f.read() == updated
+    os.remove(os.path.join(data_dir, "fort.10_new"))
+
+
+def test_fort10_sparse():
+    shutil.copy(
+        os.path.join(data_dir, "fort.10_hBN"), os.path.join(data_dir, "fort.10")
+    )
+    io_fort10 = IO_fort10(os.path.join(data_dir, "fort.10"), in_place=True)
+    detmat = io_fort10.f10detmatrix
+    matrix = detmat.to_sparse()
+    assert matrix.shape == (detmat.row.max(), detmat.col.max())
+    assert matrix.nnz == len(detmat.row)
+    dense = matrix.toarray()
+    assert dense[detmat.row[5] - 1, detmat.col[5] - 1] == (
+        detmat.coeff_real[5] + 1j * detmat.coeff_imag[5]
+    )
+
+    matrix = matrix.tocsr() * (0.5 - 0.5j)
+    detmat.from_sparse(matrix)
+    io_fort10 = IO_fort10(os.path.join(data_dir, "fort.10"), in_place=True)
+    assert np.allclose(io_fort10.f10detmatrix.to_sparse().toarray(), matrix.toarray())
+
+    # elements out of the pattern cannot be stored in fort.10
+    dense = matrix.toarray()
+    dense[dense == 0] = 1.0
+    try:
+        io_fort10.f10detmatrix.from_sparse(dense)
+        assert False
+    except ValueError:
+        pass
+
+    shutil.copy(
+        os.path.join(data_dir, "fort.10_hydrogen"), os.path.join(data_dir, "fort.10")
+    )
+    io_fort10 = IO_fort10(os.path.join(data_dir, "fort.10"), in_place=True)
+    jasmat = io_fort10.f10jasmatrix
+    shape = (jasmat.row.max() + 2, jasmat.col.max() + 2)
+    matrix = jasmat.to_sparse(shape=shape).tocsr()
+    assert matrix.shape == shape
+    jasmat.from_sparse(matrix * 2.0)
+    io_fort10 = IO_fort10(os.path.join(data_dir, "fort.10"), in_place=True)
+    assert np.array_equal(
+        io_fort10.f10jasmatrix.to_sparse(shape=shape).toarray(),
+        (matrix * 2.0).toarray(),
+    )
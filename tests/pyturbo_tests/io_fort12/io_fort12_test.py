@@ -0,0 +1,210 @@
+#!python
+# -*- coding: utf-8 -*-
+import os
+import numpy as np
+import pytest
+from scipy.io import FortranFile
+from turbogenius.pyturbo.io_fort12 import (
+    IO_fort12,
+    auto_binning_blocks,
+    autocorrelation_time,
+    blocking_curve,
+    jackknife_bins,
+    mser,
+    read_story,
+)
+from turbogenius.pyturbo.utils import utility
+from turbogenius.pyturbo.utils.utility import get_linenum_fort12, read_parameters_history
+from turbogenius.pyturbo.vmc import VMC
+
+data_dir = os.path.dirname(os.path.abspath(__file__))
+
+
+def write_fort12(fort12, records):
+    with FortranFile(fort12, "w") as f:
+        for record in records:
+            f.write_record(np.asarray(record, dtype=np.float64))
+
+
+def test_fort12_reblocking(tmp_path):
+    rng = np.random.default_rng(0)
+    num_records = 1000
+    weights = rng.uniform(0.5, 1.5, num_records)
+    energies = rng.normal(-1.0, 0.1, num_records)
+    fort12 = str(tmp_path / "fort.12")
+    write_fort12(fort12, np.stack([weights, energies, energies**2], axis=1))
+
+    io_fort12 = IO_fort12(fort12)
+    assert io_fort12.num_records == get_linenum_fort12(fort12) == num_records
+    assert io_fort12.num_columns == 3
+
+    # reference: weighted bin averages, and the jackknife over the bins
+    bin, init = 20, 100
+    w = weights[init:].reshape(-1, bin)
+    e = energies[init:].reshape(-1, bin)
+    bin_energies = np.sum(w * e, axis=1) / np.sum(w, axis=1)
+    energy = np.sum(w * e) / np.sum(w)
+    jk = (np.sum(w * e) - np.sum(w * e, axis=1)) / (np.sum(w) - np.sum(w, axis=1))
+    error = np.sqrt((len(jk) - 1) * np.mean((jk - np.mean(jk)) ** 2))
+
+    averages, bin_weights = io_fort12.bin_averages(1, bin=bin, init=init)
+    assert np.allclose(averages[:, 0], bin_energies)
+    assert np.allclose(io_fort12.energy(bin=bin, init=init), (energy, error))
+    estimate, jk_error, jk_estimates = jackknife_bins(
+        averages, bin_weights, lambda a: a[..., 0]
+    )
+    assert np.allclose((estimate, jk_error), (energy, error))
+    assert np.allclose(jk_estimates, jk)
+
+    variance, _ = io_fort12.variance(bin=bin, init=init)
+    e2 = np.sum(w * e**2) / np.sum(w)
+    assert np.isclose(variance, e2 - energy**2)
+
+    # the correcting factors: products of the last (correct) weights
+    corrected = io_fort12.weights(correct=3)
+    assert np.isclose(corrected[0], weights[0])
+    assert np.isclose(corrected[10], np.prod(weights[8:11]))
+
+    # the index follows the file
+    write_fort12(fort12, np.stack([weights, energies, energies**2], axis=1)[:500])
+    assert io_fort12.num_records == 500
+
+
+def ar1_series(num_records, phi, rng):
+    # x_t = phi * x_{t-1} + noise, whose autocorrelation time is (1+phi)/(1-phi)
+    noise = rng.normal(0.0, 1.0, num_records)
+    x = np.empty(num_records)
+    x[0] = noise[0]
+    for t in range(1, num_records):
+        x[t] = phi * x[t - 1] + noise[t]
+    return x
+
+
+def test_fort12_auto_binning(tmp_path):
+    rng = np.random.default_rng(1)
+    phi = 0.8
+    series = ar1_series(100000, phi, rng)
+    assert abs(autocorrelation_time(series) / ((1 + phi) / (1 - phi)) - 1) < 0.15
+    assert np.isclose(autocorrelation_time(rng.normal(size=10000)), 1.0, atol=0.1)
+
+    # the error bars level off at sqrt(tau) times the naive one
+    sizes, errors, _ = blocking_curve(series)
+    assert sizes[0] == 1 and sizes[1] == 2
+    assert np.isclose(errors[0], np.std(series) / np.sqrt(len(series) - 1))
+    assert abs(errors[9] / errors[0] / np.sqrt((1 + phi) / (1 - phi)) - 1) < 0.15
+
+    # an initial transient
+    transient = 20.0 * np.exp(-np.arange(5000) / 300.0)
+    energies = -1.0 + 0.01 * (ar1_series(5000, phi, rng) + transient)
+    assert 500 < mser(energies) < 2500
+    assert mser(rng.normal(size=5000)) < 250
+
+    fort12 = str(tmp_path / "fort.12")
+    write_fort12(
+        fort12, np.stack([np.ones(5000), energies, energies**2], axis=1)
+    )
+    binning = IO_fort12(fort12).auto_binning()
+    assert binning["bin"] >= 2 * (1 + phi) / (1 - phi) * 0.8
+    assert binning["init"] * binning["bin"] >= binning["warmup"]
+    assert auto_binning_blocks(fort12) == (binning["bin"], binning["init"])
+
+
+def test_vmc_native_energy_and_variance(tmp_path, monkeypatch):
+    rng = np.random.default_rng(1)
+    energies = rng.normal(-1.0, 0.1, 600)
+    monkeypatch.chdir(tmp_path)
+    write_fort12("fort.12", np.stack([np.ones(600), energies, energies**2], axis=1))
+    open("fort.10", "w").close()
+
+    vmc = VMC(in_fort10="fort.10")
+    # init is the number of disregarded bins
+    energy, error, variance, variance_error = vmc.compute_energy_and_forces(
+        init=2, bin=20, native=True
+    )
+    io_fort12 = IO_fort12("fort.12")
+    assert (energy, error) == io_fort12.energy(bin=20, init=40)
+    assert (variance, variance_error) == io_fort12.variance(bin=20, init=40)
+    assert vmc.get_energy(init=2, bin=20, native=True) == (energy, error)
+
+
+def test_fort12_parameters(tmp_path):
+    rng = np.random.default_rng(2)
+    num_iterations, num_parameters = 50, 7
+    history = rng.normal(0.0, 1.0, (num_iterations, num_parameters))
+    fort12 = str(tmp_path / "fort.12")
+    write_fort12(fort12, history)
+
+    io_fort12 = IO_fort12(fort12)
+    parameters = io_fort12.parameters()
+    # a view of the memory-mapped records
+    assert np.shares_memory(parameters, io_fort12.records)
+    assert np.allclose(parameters, history)
+    assert np.allclose(
+        io_fort12.parameters(first_column=2, num_parameters=3), history[:, 2:5]
+    )
+
+    averages, errors = io_fort12.average_parameters(start=10, stop=40)
+    assert np.allclose(averages, np.mean(history[10:40], axis=0))
+    assert np.allclose(errors, np.std(history[10:40], axis=0, ddof=1) / np.sqrt(30))
+    averages, _ = io_fort12.average_parameters(start=10)
+    assert np.allclose(averages, np.mean(history[10:], axis=0))
+
+
+def test_fort12_check_story(tmp_path):
+    rng = np.random.default_rng(4)
+    history = rng.normal(0.0, 1.0, (20, 5))
+    fort12 = str(tmp_path / "fort.12")
+    write_fort12(fort12, history)
+    story = str(tmp_path / "story.d")
+    iterations = np.arange(1, 21)
+    np.savetxt(story, np.column_stack([iterations, history]), fmt="%.10g")
+    IO_fort12(fort12).check_story(story)
+    story_iterations, story_history = read_story(story)
+    assert np.array_equal(story_iterations, iterations)
+    assert np.allclose(story_history, history)
+
+    # a shifted or a missing column is detected
+    np.savetxt(story, np.column_stack([iterations, history[:, ::-1]]), fmt="%.10g")
+    with pytest.raises(ValueError):
+        IO_fort12(fort12).check_story(story)
+    np.savetxt(story, np.column_stack([iterations, history[:, 1:]]), fmt="%.10g")
+    with pytest.raises(ValueError):
+        IO_fort12(fort12).check_story(story)
+    IO_fort12(fort12).check_story(story, first_column=1)
+
+
+def test_read_parameters_history(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    history = np.random.default_rng(5).normal(0.0, 1.0, (20, 5))
+    write_fort12("fort.12", history)
+    iterations, parameters = read_parameters_history(native=True)
+    assert np.array_equal(iterations, np.arange(1, 21))
+    assert np.allclose(parameters, history)
+
+    # by default, story.d of readalles.x is read
+    commands = []
+
+    def readalles(binary, input_name=None, output_name="out.o"):
+        commands.append(binary)
+        np.savetxt("story.d", np.column_stack([np.arange(1, 21), -history]))
+
+    monkeypatch.setattr(utility, "run", readalles)
+    iterations, parameters = read_parameters_history()
+    assert "readalles.x" in commands[0]
+    assert np.array_equal(iterations, np.arange(1, 21))
+    assert np.allclose(parameters, -history)
+    assert os.path.isfile("all_story.d")
+
+
+# fort.12 and story.d (readalles.x, binning length 1) of a real optimization
+optimization_dir = os.path.join(data_dir, "optimization")
+
+
+@pytest.mark.skipif(
+    not os.path.isfile(os.path.join(optimization_dir, "story.d")),
+    reason="no fort.12/story.d of a real optimization in io_fort12/optimization",
+)
+def test_fort12_parameters_optimization():
+    IO_fort12(os.path.join(optimization_dir, "fort.12")).check_story(
+        os.path.join(optimization_dir, "story.d")
+    )
@@ -0,0 +1,58 @@
+#!python
+# -*- coding: utf-8 -*-
+import os
+from turbogenius.pyturbo.io_output import IO_output, output_fields
+
+
+def test_output_parser(tmp_path):
+    out_min = str(tmp_path / "out_min")
+    lines = []
+    for i in range(3):
+        lines += [
+            " some other line\n",
+            f"  New   Energy =  {-1.0 - 0.1 * i}  0.001\n",
+            f"  Maximum devmax par Normal {5.0 - i} 1 2\n",
+        ]
+    lines += [" Average time for 1000 generations: 2.0\n"]
+    with open(out_min, "w") as f:
+        f.writelines(lines)
+
+    io_output = IO_output.get(out_min)
+    assert IO_output.get(out_min) is io_output
+    assert [float(i[3]) for i in io_output.fields("energy")] == [-1.0, -1.1, -1.2]
+    assert [float(i[4]) for i in io_output.fields("devmax")] == [5.0, 4.0, 3.0]
+    assert io_output.fields("time") == [
+        ["Average", "time", "for", "1000", "generations:", "2.0"]
+    ]
+    assert not io_output.found("final")
+
+    # parsed again once the file is modified
+    with open(out_min, "a") as f:
+        f.write(" Final tstep found   0.1\n")
+    assert io_output.found("final")
+    assert len(output_fields([out_min, out_min], "energy")) == 6
+
+
+def test_output_follow(tmp_path):
+    out_min = str(tmp_path / "out_min")
+    with open(out_min, "w") as f:
+        f.write("  New   Energy =  -1.0  0.001\n  Maximum devmax par Normal 5.0 1 2\n")
+        f.write("  New   Energy =  -1.1")  # being written
+    io_output = IO_output.get(out_min)
+    assert io_output.records() == [(0, -1.0, 0.001, 5.0)]
+
+    with open(out_min, "a") as f:
+        f.write("  0.002\n  Maximum devmax par Normal 4.0 1 2\n")
+    assert io_output.records(start=1) == [(1, -1.1, 0.002, 4.0)]
+
+    with open(out_min, "a") as f:
+        f.write(" Final tstep found   0.1\n")
+    records = list(io_output.follow(interval=0.01))
+    assert [r[0] for r in records] == [0, 1]
+
+    # a new file, e.g., of the next run
+    with open(out_min + "_new", "w") as f:
+        f.write("  New   Energy =  -2.0  0.001\n  Maximum devmax par Normal 1.0 1 2\n")
+    os.replace(out_min + "_new", out_min)
+    assert io_output.records() == [(0, -2.0, 0.001, 1.0)]
+    assert list(io_output.follow(interval=0.01, timeout=0.05)) == io_output.records()
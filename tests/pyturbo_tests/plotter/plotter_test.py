@@ -0,0 +1,56 @@
+#!python
+# -*- coding: utf-8 -*-
+import os
+import numpy as np
+from scipy.io import FortranFile
+from turbogenius.pyturbo.utils.plotter import decimate, plot_parameters_pages
+
+
+def test_decimate():
+    assert np.array_equal(decimate(10), np.arange(10))
+    assert np.array_equal(decimate(10, max_points=20), np.arange(10))
+    indices = decimate(1001, max_points=100)
+    assert len(indices) <= 101
+    assert indices[0] == 0 and indices[-1] == 1000
+
+
+def test_plot_parameters_pages(tmp_path):
+    rng = np.random.default_rng(0)
+    fort12 = str(tmp_path / "fort.12")
+    with FortranFile(fort12, "w") as f:
+        for record in np.cumsum(rng.normal(0.0, 0.01, (300, 50)), axis=0):
+            f.write_record(record)
+    graph_save_dir = str(tmp_path / "parameters_graphs")
+
+    files = plot_parameters_pages(
+        fort12=fort12,
+        graph_save_dir=graph_save_dir,
+        per_page=20,
+        workers=2,
+        max_points=100,
+        start=100,
+    )
+    assert sorted(os.path.basename(f) for f in files) == [
+        f"Parameters_page{n}.png" for n in range(3)
+    ]
+    assert all(os.path.isfile(f) for f in files)
+
+    files = plot_parameters_pages(
+        fort12=fort12, graph_save_dir=graph_save_dir, per_page=20, fmt="pdf"
+    )
+    assert [os.path.basename(f) for f in files] == ["Parameters_history.pdf"]
+    assert os.path.getsize(files[0]) > 0
+
+    # the histories of story.d (readalles.x)
+    story = str(tmp_path / "story.d")
+    history = np.cumsum(rng.normal(0.0, 0.01, (300, 10)), axis=0)
+    np.savetxt(story, np.column_stack([np.arange(1, 301), history]))
+    files = plot_parameters_pages(
+        story=story,
+        graph_save_dir=str(tmp_path / "story_graphs"),
+        per_page=4,
+        start=100,
+    )
+    assert sorted(os.path.basename(f) for f in files) == [
+        f"Parameters_page{n}.png" for n in range(3)
+    ]
@@ -0,0 +1,98 @@
+#!python
+# -*- coding: utf-8 -*-
+import os
+import numpy as np
+from scipy.io import FortranFile
+from turbogenius.pyturbo.utils.watcher import (
+    ConvergenceWatcher,
+    TargetErrorWatcher,
+    Watcher,
+    run_watched,
+    weighted_slope,
+)
+
+
+def write_out_min(out_min, energies, devmaxes):
+    with open(out_min, "w") as f:
+        for energy, devmax in zip(energies, devmaxes):
+            f.write(f"  New   Energy =  {energy}  0.001\n")
+            f.write(f"  Maximum devmax par Normal {devmax} 1 2\n")
+
+
+def test_weighted_slope():
+    x = np.arange(10)
+    slope, error = weighted_slope(x, 2.0 * x + 1.0, np.full(10, 0.1))
+    assert np.isclose(slope, 2.0)
+    assert np.isclose(error, 0.1 / np.sqrt(np.sum((x - x.mean()) ** 2)))
+
+
+def test_convergence_watcher(tmp_path):
+    stop_file = str(tmp_path / "stop.dat")
+
+    def poll(name, energies, devmaxes, min_iterations=0):
+        out_min = str(tmp_path / name)
+        write_out_min(out_min, energies, devmaxes)
+        watcher = ConvergenceWatcher(
+            output_name=out_min, num_iterations=5, min_iterations=min_iterations
+        )
+        stopped = watcher.poll()
+        return stopped
+
+    # the energy is still decreasing
+    assert not poll("out_min_decreasing", -1.0 - 0.01 * np.arange(10), [3.0] * 10)
+    # devmax is too large
+    assert not poll("out_min_devmax", [-1.1] * 10, [3.0] * 9 + [5.0])
+    # too few iterations
+    assert not poll("out_min_short", [-1.1] * 10, [3.0] * 10, min_iterations=20)
+    assert not os.path.isfile(stop_file)
+    # converged
+    assert poll("out_min_converged", [-1.1] * 10, [3.0] * 10)
+    assert os.path.isfile(stop_file)
+
+
+def test_target_error_watcher(tmp_path):
+    rng = np.random.default_rng(0)
+    out_vmc = str(tmp_path / "out_vmc")
+    fort12 = str(tmp_path / "fort.12")
+    stop_file = str(tmp_path / "stop.dat")
+    open(out_vmc, "w").close()
+
+    # uncorrelated energies, error bar ~ 0.1 / sqrt(n)
+    energies = rng.normal(-1.0, 0.1, 4000)
+    records = np.stack([np.ones(4000), energies, energies**2], axis=1)
+    watcher = TargetErrorWatcher(output_name=out_vmc, target_error=2.0e-3)
+    with FortranFile(fort12, "w") as f:
+        for record in records[:1000]:
+            f.write_record(record)
+    assert not watcher.poll()
+    assert watcher.projected_records > 1000
+    # fort.12 grows
+    with FortranFile(fort12, "w") as f:
+        for record in records:
+            f.write_record(record)
+    assert watcher.poll()
+    assert os.path.isfile(stop_file)
+    assert watcher.error * watcher.safety_factor <= 2.0e-3
+
+
+class StopWatcher(Watcher):
+    def converged(self, io_output):
+        return True
+
+
+def test_run_watched(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    with open("datas.input", "w") as f:
+        f.write("input\n")
+    for watcher in (None, StopWatcher(interval=0.01)):
+        # a stale stop.dat and a previous output
+        for file in ("stop.dat", "out_min"):
+            with open(file, "w") as f:
+                f.write("stale\n")
+        run_watched(
+            "cat", input_name="datas.input", output_name="out_min", watcher=watcher
+        )
+        with open("out_min") as f:
+            assert f.read() == "input\n"
+        # stop.dat never outlives the run
+        assert not os.path.exists("stop.dat")
@@ -0,0 +1,73 @@
+#!python
+# -*- coding: utf-8 -*-
+import os
+import functools
+import pytest
+
+# turbogenius modules
+from turbogenius.utils_workflows.task_farm import TaskFarm, available_cores
+
+
+class Mock_genius:
+    """a stand-in for the *_genius classes, recording its environment"""
+
+    def __init__(self, energy: float = 0.0, fail: bool = False):
+        self.energy = energy
+        self.fail = fail
+        self.energy_error = None
+
+    def run_all(self, scale: float = 1.0):
+        if self.fail:
+            raise RuntimeError("failed")
+        with open("fort.10") as f:
+            self.energy = float(f.read()) * scale
+        self.energy_error = 0.1
+        self.cwd = os.getcwd()
+        self.command = os.environ.get("TURBOVMC_RUN_COMMAND")
+        self.threads = os.environ["OMP_NUM_THREADS"]
+        self.cores = sorted(os.sched_getaffinity(0))
+
+
+def test_task_farm(tmp_path):
+    jobs = []
+    for n in range(4):
+        directory = str(tmp_path / f"job_{n}")
+        os.makedirs(directory)
+        with open(os.path.join(directory, "fort.10"), "w") as f:
+            f.write(f"{-n}.0")
+        if n == 3:
+            jobs.append((directory, Mock_genius(fail=True)))
+        else:
+            jobs.append((directory, functools.partial(Mock_genius)))
+
+    cores = available_cores()
+    farm = TaskFarm(
+        jobs,
+        cores_per_job=1,
+        num_cores=min(2, len(cores)),
+        run_command="mpirun -np {ranks} -cpu-set {cores} turborvb-mpi.x",
+        method_kwargs={"scale": 2.0},
+    )
+    table = farm.run()
+
+    assert list(table["status"]) == ["done"] * 3 + ["failed"]
+    assert list(table["genius"]) == ["Mock_genius"] * 4
+    assert list(table["energy"][:3]) == [0.0, -2.0, -4.0]
+    assert "RuntimeError" in table["error"][3]
+    for n, genius in enumerate(farm.results[:3]):
+        assert genius.cwd == jobs[n][0]
+        assert genius.threads == "1"
+        assert len(genius.cores) == 1 and genius.cores[0] in cores[:2]
+        command = f"mpirun -np 1 -cpu-set {genius.cores[0]} turborvb-mpi.x"
+        assert genius.command == command
+    assert farm.results[3] is None
+
+
+def test_task_farm_cores():
+    with pytest.raises(ValueError):
+        TaskFarm([], cores_per_job=4, ranks_per_job=3, run_command="mpirun")
+    with pytest.raises(ValueError):
+        TaskFarm([], cores_per_job=2)
+    farm = TaskFarm([], cores_per_job=2, ranks_per_job=1, num_cores=8)
+    assert len(farm.slots) == 4
+    assert farm.environment(farm.slots[0])["OMP_NUM_THREADS"] == "2"
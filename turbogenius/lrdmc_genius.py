@@ -24,6 +24,8 @@ from turbogenius.utils_workflows.env import turbo_genius_root
 from turbogenius.utils_workflows.utility import get_nonlocalmoves_setting
 from turbogenius.geniusIO import GeniusIO
 from turbogenius.pyturbo.io_fort10 import IO_fort10
+from turbogenius.pyturbo.io_fort12 import auto_binning_blocks
+from turbogenius.pyturbo.utils.watcher import Watcher, TargetErrorWatcher
 
 logger = getLogger("Turbo-Genius").getChild(__name__)
 
@@ -96,8 +98,7 @@ class LRDMC_genius(GeniusIO):
         self.lrdmc.set_parameter(
             parameter="tbra", value=time_branching, namelist="&dmclrdmc"
         )
-        io_fort10 = IO_fort10(fort10=fort10)
-        if io_fort10.pp_flag:
+        if self.io_fort10.pp_flag:
             typereg, npow = get_nonlocalmoves_setting(nonlocalmoves=nonlocalmoves)
             self.lrdmc.set_parameter(
                 parameter="typereg", value=typereg, namelist="&dmclrdmc"
@@ -209,6 +210,7 @@ class LRDMC_genius(GeniusIO):
         cont: bool = False,
         input_name: str = "datasfn.input",
         output_name: str = "out_fn",
+        target_error: Optional[float] = None,
     ) -> None:
         """
         Generate input files and run the command.
@@ -220,14 +222,25 @@ class LRDMC_genius(GeniusIO):
             cont (bool): if True, continuation run (i.e., iopt=0), if False, starting from scratch (i.e., iopt=1).
             input_name (str): input file name
             output_name (str): output file name
+            target_error (float): stop once the energy error bar reaches target_error (Ha), within lrdmcsteps.
+                bin_block and warmupblocks are then chosen from fort.12 (see TargetErrorWatcher).
 
         """
         self.generate_input(cont=cont, input_name=input_name)
-        self.run(input_name=input_name, output_name=output_name)
+        watcher = None
+        if target_error is not None:
+            if self.twist_average:
+                logger.error("target_error is not supported with twist_average.")
+                raise NotImplementedError
+            watcher = TargetErrorWatcher(
+                target_error=target_error, correct=correcting_factor
+            )
+        self.run(input_name=input_name, output_name=output_name, watcher=watcher)
         self.compute_energy_and_forces(
             bin_block=bin_block,
             warmupblocks=warmupblocks,
             correcting_factor=correcting_factor,
+            auto_binning=target_error is not None,
         )
 
     def generate_input(
@@ -246,7 +259,10 @@ class LRDMC_genius(GeniusIO):
         self.lrdmc.generate_input(input_name=input_name)
 
     def run(
-        self, input_name: str = "datasfn.input", output_name: str = "out_fn"
+        self,
+        input_name: str = "datasfn.input",
+        output_name: str = "out_fn",
+        watcher: Optional[Watcher] = None,
     ) -> None:
         """
         Run the command.
@@ -254,8 +270,9 @@ class LRDMC_genius(GeniusIO):
         Args:
             input_name (str): input file name
             output_name (str): output file name
+            watcher (Watcher): if given, the run is stopped via stop.dat once converged (e.g., TargetErrorWatcher).
         """
-        self.lrdmc.run(input_name=input_name, output_name=output_name)
+        self.lrdmc.run(input_name=input_name, output_name=output_name, watcher=watcher)
         flags = self.lrdmc.check_results(output_names=[output_name])
         assert all(flags)
 
@@ -266,6 +283,7 @@ class LRDMC_genius(GeniusIO):
         correcting_factor: int = 2,
         output_names: Optional[list] = None,
         rerun: bool = False,
+        auto_binning: bool = False,
     ) -> None:
         """
         Store results. This procedure stores estimated_time_for_1_generation, energy, and energy_error.
@@ -277,9 +295,12 @@ class LRDMC_genius(GeniusIO):
             correcting_factor (int): correcting factors
             output_names (list): a list of output file names
             rerun (bool): if true, compute energy and force again even if there are energy and force files.
+            auto_binning (bool): if true, bin_block and warmupblocks are chosen from fort.12 (see auto_binning_blocks).
         """
         if output_names is None:
             output_names = ["out_fn"]
+        if auto_binning:
+            bin_block, warmupblocks = auto_binning_blocks()
         self.estimated_time_for_1_generation = self.get_estimated_time_for_1_generation(
             output_names=output_names
         )
@@ -296,6 +317,7 @@ class LRDMC_genius(GeniusIO):
         warmupblocks: int = 2,
         correcting_factor: int = 2,
         rerun: bool = False,
+        auto_binning: bool = False,
     ) -> None:
         """
         Compute energy and forces
@@ -305,7 +327,10 @@ class LRDMC_genius(GeniusIO):
             warmupblocks (int): the number of disregarded blocks
             correcting_factor (int): correcting factors
             rerun (bool): if true, compute energy and force again even if there are energy and force files.
+            auto_binning (bool): if true, bin_block and warmupblocks are chosen from fort.12 (see auto_binning_blocks).
         """
+        if auto_binning:
+            bin_block, warmupblocks = auto_binning_blocks()
         self.energy, self.energy_error = self.lrdmc.get_energy(
             init=warmupblocks,
             correct=correcting_factor,
@@ -19,6 +19,7 @@ from logging import getLogger, StreamHandler, Formatter
 # turbogenius modules
 from turbogenius.pyturbo.lrdmcopt import LRDMCopt
 from turbogenius.pyturbo.io_fort10 import IO_fort10
+from turbogenius.pyturbo.utils.watcher import Watcher
 from turbogenius.utils_workflows.env import turbo_genius_root
 from turbogenius.utils_workflows.utility import (
     get_optimizer_flags,
@@ -303,6 +304,7 @@ class LRDMCopt_genius(GeniusIO):
         input_name: str = "datasfn_opt.input",
         output_name: str = "out_fn_opt",
         average_parameters: bool = True,
+        watcher: Optional[Watcher] = None,
     ) -> None:
         """
         Generate input files and run the command.
@@ -312,10 +314,11 @@ class LRDMCopt_genius(GeniusIO):
             input_name (str): input file name
             output_name (str): output file name
             average_parameters (bool): if True, average the optimized parameters
+            watcher (Watcher): if given, the optimization is stopped via stop.dat once converged (e.g., ConvergenceWatcher).
 
         """
         self.generate_input(cont=cont, input_name=input_name)
-        self.run(input_name=input_name, output_name=output_name)
+        self.run(input_name=input_name, output_name=output_name, watcher=watcher)
         if average_parameters:
             self.average(input_name=input_name, output_name=output_name)
 
@@ -340,6 +343,7 @@ class LRDMCopt_genius(GeniusIO):
         self,
         input_name: str = "datasfn_opt.input",
         output_name: str = "out_fn_opt",
+        watcher: Optional[Watcher] = None,
     ) -> None:
         """
         Run the command.
@@ -347,8 +351,11 @@ class LRDMCopt_genius(GeniusIO):
         Args:
             input_name (str): input file name
             output_name (str): output file name
+            watcher (Watcher): if given, the optimization is stopped via stop.dat once converged (e.g., ConvergenceWatcher).
         """
-        self.lrdmcopt.run(input_name=input_name, output_name=output_name)
+        self.lrdmcopt.run(
+            input_name=input_name, output_name=output_name, watcher=watcher
+        )
         flags = self.lrdmcopt.check_results(output_names=[output_name])
         assert all(flags)
 
@@ -392,6 +399,9 @@ class LRDMCopt_genius(GeniusIO):
         graph_plot: bool = False,
         input_name: str = "datasfn_opt.input",
         output_names: Optional[list] = None,
+        native: bool = False,
+        graph_mode: str = "single",
+        workers: int = 1,
     ) -> None:
         """
         Average parameters of fort.10
@@ -401,6 +411,9 @@ class LRDMCopt_genius(GeniusIO):
             input_name (str): the input file used in the latest calculation
             output_names (list): a list of output file names
             graph_plot (bool): Flag for plotting a graph
+            native (bool): if True, jasmat and detmat are averaged in Python when possible
+            graph_mode (str): "single" or "pages" (parameters per page, in parallel)
+            workers (int): the number of processes (graph_mode="pages")
         """
         if output_names is None:
             output_names = ["out_fn_opt"]
@@ -410,6 +423,9 @@ class LRDMCopt_genius(GeniusIO):
             equil_steps=optwarmupsteps,
             input_file_used=input_name,
             graph_plot=graph_plot,
+            native=native,
+            graph_mode=graph_mode,
+            workers=workers,
         )
 
     def get_energy(self, output_names: Optional[list] = None) -> list:
@@ -457,14 +473,31 @@ class LRDMCopt_genius(GeniusIO):
             output_names = ["out_fn_opt"]
         return self.lrdmcopt.check_results(output_names=output_names)
 
-    def plot_parameters_history(self, interactive: bool = True) -> None:
+    def plot_parameters_history(
+        self,
+        interactive: bool = True,
+        mode: str = "single",
+        workers: int = 1,
+        fmt: str = "png",
+        native: bool = False,
+    ) -> None:
         """
         plot history of optimized variational parameters
 
         Args:
             interactive (bool): flag for an interactive plot
+            mode (str): "single" (a figure per parameter) or "pages" (rendered in parallel)
+            workers (int): the number of processes (mode="pages")
+            fmt (str): "png" or "pdf" (mode="pages")
+            native (bool): if True, fort.12 is read in place of readalles.x
         """
-        self.lrdmcopt.plot_parameters_history(interactive=interactive)
+        self.lrdmcopt.plot_parameters_history(
+            interactive=interactive,
+            mode=mode,
+            workers=workers,
+            fmt=fmt,
+            native=native,
+        )
 
 
 if __name__ == "__main__":
@@ -19,7 +19,7 @@ from turbogenius.pyturbo.utils.env import turbo_convertfort10_run_command
 from turbogenius.pyturbo.utils.env import pyturbo_data_dir
 from turbogenius.pyturbo.utils.utility import file_check
 from turbogenius.pyturbo.utils.execute import run
-from turbogenius.pyturbo.io_fort10 import IO_fort10
+from turbogenius.pyturbo.io_fort10 import probe_fort10
 
 
 from logging import getLogger, StreamHandler, Formatter
@@ -53,7 +53,7 @@ class Convertfort10(FortranIO):
         """
         file_check(in_fort10)
         file_check(out_fort10)
-        if IO_fort10(fort10=in_fort10).pp_flag:
+        if probe_fort10(in_fort10)["pp_flag"]:
             file_check("pseudo.dat")
         self.in_fort10 = in_fort10
         self.out_fort10 = out_fort10
@@ -14,7 +14,7 @@ from typing import Optional
 # pyturbo modules
 from turbogenius.pyturbo.namelist import Namelist
 from turbogenius.pyturbo.fortranIO import FortranIO
-from turbogenius.pyturbo.io_fort10 import IO_fort10
+from turbogenius.pyturbo.io_fort10 import IO_fort10, probe_fort10
 from turbogenius.pyturbo.utils.env import turbo_convertfort10mol_run_command
 from turbogenius.pyturbo.utils.env import pyturbo_data_dir
 from turbogenius.pyturbo.utils.utility import file_check
@@ -51,7 +51,7 @@ class Convertfort10mol(FortranIO):
         self.namelist = namelist
 
         file_check(in_fort10)
-        if IO_fort10(fort10=in_fort10).pp_flag:
+        if probe_fort10(in_fort10)["pp_flag"]:
             file_check("pseudo.dat")
 
     def __str__(self) -> str:
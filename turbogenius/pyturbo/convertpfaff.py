@@ -14,7 +14,7 @@ from turbogenius.pyturbo.fortranIO import FortranIO
 from turbogenius.pyturbo.utils.env import turbo_convertfortpfaff_run_command
 from turbogenius.pyturbo.utils.utility import file_check
 from turbogenius.pyturbo.utils.execute import run
-from turbogenius.pyturbo.io_fort10 import IO_fort10
+from turbogenius.pyturbo.io_fort10 import IO_fort10, probe_fort10
 
 from logging import getLogger, StreamHandler, Formatter
 
@@ -39,7 +39,7 @@ class Convertpfaff(FortranIO):
         """
         file_check(in_fort10)
         file_check(out_fort10)
-        if IO_fort10(fort10=in_fort10).pp_flag:
+        if probe_fort10(in_fort10)["pp_flag"]:
             file_check("pseudo.dat")
         self.in_fort10 = in_fort10
         self.out_fort10 = out_fort10
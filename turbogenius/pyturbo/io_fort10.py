@@ -6,15 +6,17 @@ pyturbo: io_fort10 related classes and methods
 
 # python modules
 import os
+import re
 import sys
+import json
+import mmap
 import numpy as np
+from scipy.sparse import coo_matrix
 import math
 import time
 import shutil
-import psutil
-import linecache
+import tempfile
 from typing import Union, Optional
-from tqdm import tqdm
 
 # set logger
 import io
@@ -23,10 +25,10 @@ from logging import getLogger, StreamHandler, Formatter
 
 # pyturbo module
 from turbogenius.pyturbo.utils.utility import (
-    pygrep_lineno,
     pysed_replace,
-    pygetline,
     pysed_replace_lines,
+    pyreplace_lines,
+    pyreplace_values,
 )
 from turbogenius.pyturbo.utils.utility import (
     return_orb_type_chr,
@@ -34,6 +36,8 @@ from turbogenius.pyturbo.utils.utility import (
     return_num_twobody_and_flag_onebody,
 )
 from turbogenius.pyturbo.utils.utility import return_element_symbol
+from turbogenius.pyturbo.io_fort12 import IO_fort12
+from turbogenius.pyturbo.namelist import Namelist
 from turbogenius.pyturbo.structure import Structure, Cell
 from turbogenius.pyturbo.basis_set import Det_Basis_sets, Jas_Basis_sets
 
@@ -103,7 +107,11 @@ class Value:
         """
         self.__value = value
         if in_place:
-            pysed_replace(self.__file, value, self.__lineno, self.__index)
+            transaction = F10transaction.get(self.__file)
+            if transaction is not None:
+                transaction.record(self.__lineno, self.__index, value)
+            else:
+                pysed_replace(self.__file, value, self.__lineno, self.__index)
 
     def type(self, cast):
         """
@@ -140,6 +148,825 @@ class Value:
         return self.__file
 
 
+class F10index:
+    """
+
+    This class is a keyword -> line No. index of a fort.10 file.
+
+    The section keywords are located in a single forward pass over the
+    (memory-mapped) file, which goes only as far as the requested keyword, and
+    the result is shared by all the F10 section instances of the same file.
+    The index is invalidated only when the file (inode, size, or mtime) changes.
+
+    Attributes:
+         fort10 (str): File name (typically, fort.10)
+
+    """
+
+    # section keywords in the order they appear in fort.10
+    keywords = [
+        "Nelup",
+        "Ion coordinates",
+        "Constraints for forces",
+        "Parameters Jastrow two body *$",
+        "Parameters Jastrow two body",
+        "Parameters atomic wf *$",
+        "Parameters atomic wf",
+        "Parameters atomic Jastrow wf *$",
+        "Occupation atomic orbitals *$",
+        "Occupation atomic orbitals  Jastrow *$",
+        "Nonzero values of  detmat *$",
+        "Grouped par.  in the chosen ordered basis *$",
+        "Nonzero values of  jasmat *$",
+        "Eq. par. in the 3-body Jastrow in the chosen basis *$",
+        "Eq. par. in the atomic Det par.in the chosen basis *$",
+        "Eq. par. in the atomic 3-body  par. in the chosen basis *$",
+        "New parameters *$",
+    ]
+
+    # shared instances, {abspath: F10index}
+    __instances = {}
+
+    def __init__(self, fort10: str):
+        self.fort10 = fort10
+        self.__stamp = None
+        self.__reset(0)
+
+    @classmethod
+    def get(cls, fort10: str) -> "F10index":
+        """
+        Return the index shared by all the instances reading fort10
+
+        Args:
+            fort10 (str): File name (typically, fort.10)
+        Returns:
+            F10index: the shared index
+        """
+        key = os.path.abspath(fort10)
+        if key not in cls.__instances:
+            cls.__instances[key] = cls(fort10)
+        return cls.__instances[key]
+
+    def update(self) -> None:
+        """
+        Invalidate the index if the file has been modified since the last scan.
+        """
+        stat = os.stat(self.fort10)
+        stamp = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+        if stamp != self.__stamp:
+            self.__reset(stat.st_size)
+            self.__stamp = stamp
+
+    def __reset(self, size: int) -> None:
+        self.__size = size
+        self.__num_lines = None if size > 0 else 0
+        self.__lineno = {}  # keyword -> line No. (starting from 0)
+        self.__offset = {}  # keyword -> byte offsets of the line, (start, stop)
+        # state of the incremental scan of self.keywords
+        self.__next = 0  # position in self.keywords of the next keyword to search
+        self.__pos = 0  # byte offset where the next search starts
+        self.__counted = (0, 0)  # (byte offset, line No.) of the last counted line
+
+    def __scan(self, keyword: str) -> None:
+        # The keywords appear in order, so each search starts where the
+        # previous keyword was found, and the scan stops at the requested
+        # keyword: reading the header does not traverse the whole file.
+        last = self.keywords.index(keyword)
+        if self.__next > last or self.__size == 0:
+            return
+        with open(self.fort10, "rb") as f, mmap.mmap(
+            f.fileno(), 0, access=mmap.ACCESS_READ
+        ) as mm:
+            for kw in self.keywords[self.__next : last + 1]:
+                match = re.compile(kw.encode(), re.MULTILINE).search(mm, self.__pos)
+                if match is None:
+                    continue
+                self.__pos = match.start()
+                self.__offset[kw] = self.__line_offsets(mm, self.__pos)
+                # line numbers, counting the newlines from the previous keyword
+                offset, lineno = self.__counted
+                lineno += self.__count_newlines(mm, offset, self.__offset[kw][0])
+                self.__lineno[kw] = lineno
+                self.__counted = (self.__offset[kw][0], lineno)
+        self.__next = last + 1
+
+    def __count_lines(self) -> None:
+        with open(self.fort10, "rb") as f, mmap.mmap(
+            f.fileno(), 0, access=mmap.ACCESS_READ
+        ) as mm:
+            self.__scan(self.keywords[-1])
+            offset, lineno = self.__counted
+            self.__num_lines = lineno + self.__count_newlines(mm, offset, len(mm))
+            if mm[-1:] != b"\n":
+                self.__num_lines += 1
+
+    @staticmethod
+    def __line_offsets(mm, pos: int) -> tuple:
+        start = mm.rfind(b"\n", 0, pos) + 1
+        stop = mm.find(b"\n", pos)
+        return start, len(mm) if stop == -1 else stop + 1
+
+    @staticmethod
+    def __count_newlines(mm, start: int, end: int, chunk: int = 1 << 26) -> int:
+        count = 0
+        for pos in range(start, end, chunk):
+            count += mm[pos : min(pos + chunk, end)].count(b"\n")
+        return count
+
+    def __search(self, keyword: str) -> None:
+        # keywords not listed in self.keywords
+        with open(self.fort10, "rb") as f, mmap.mmap(
+            f.fileno(), 0, access=mmap.ACCESS_READ
+        ) as mm:
+            match = re.compile(keyword.encode(), re.MULTILINE).search(mm)
+            if match is None:
+                self.__lineno[keyword] = self.num_lines
+                self.__offset[keyword] = (len(mm), len(mm))
+            else:
+                self.__offset[keyword] = self.__line_offsets(mm, match.start())
+                self.__lineno[keyword] = self.__count_newlines(
+                    mm, 0, self.__offset[keyword][0]
+                )
+
+    def __lookup(self, keyword: str) -> bool:
+        # True if keyword has been found in the file
+        self.update()
+        if keyword not in self.__offset and self.__size > 0:
+            if keyword in self.keywords:
+                self.__scan(keyword)
+            else:
+                self.__search(keyword)
+        return keyword in self.__offset and self.__offset[keyword][0] < self.__size
+
+    def lineno(self, keyword: str) -> int:
+        """
+        Return the line No. (starting from 0) of the first line matching keyword.
+        If no line matches, the number of lines of the file is returned.
+
+        Args:
+            keyword (str): regular expression (e.g., "Ion coordinates")
+        Returns:
+            int: line No.
+        """
+        if not self.__lookup(keyword):
+            return self.num_lines
+        return self.__lineno[keyword]
+
+    def line_offsets(self, keyword: str) -> tuple:
+        """
+        Return the byte offsets of the beginning of the first line matching keyword
+        and of the line following it. If no line matches, (file size, file size)
+        is returned.
+
+        Args:
+            keyword (str): regular expression (e.g., "Ion coordinates")
+        Returns:
+            tuple: (start, stop) byte offsets
+        """
+        if not self.__lookup(keyword):
+            return self.__size, self.__size
+        return self.__offset[keyword]
+
+    @property
+    def num_lines(self) -> int:
+        """
+        Return the number of lines of the file.
+        """
+        self.update()
+        if self.__num_lines is None:
+            self.__count_lines()
+        return self.__num_lines
+
+
+class F10transaction:
+    """
+
+    This class collects the edits of a fort.10 file and writes them at once.
+
+    While a transaction is open, Value.replace and replace_values do not touch the
+    file, but record the edits (the last one wins for each value). When the
+    outermost transaction is closed without an exception, all the edits are
+    applied in a single streaming rewrite of the file, written to a temporary file
+    and atomically renamed onto fort.10. If an exception is raised, the edits are
+    discarded and the file is left untouched.
+
+    Transactions are shared by all the objects editing the same file, and nested
+    transactions are merged into the outermost one.
+
+    Attributes:
+         fort10 (str): File name (typically, fort.10)
+
+    Examples:
+        >>> io_fort10 = IO_fort10("fort.10")
+        >>> with io_fort10.transaction():
+        ...     io_fort10.f10detmatrix.coeff_real = coeff_real
+        ...     io_fort10.f10header.iesfree = 10
+
+    """
+
+    # open transactions, {abspath: F10transaction}
+    __active = {}
+
+    def __init__(self, fort10: str):
+        self.fort10 = fort10
+        self.rollback_hooks = []  # called when the edits are discarded
+        self.__edits = {}  # line No. -> {index: value}
+        self.__depth = 0
+
+    @classmethod
+    def get(cls, fort10: str) -> Optional["F10transaction"]:
+        """
+        Return the open transaction of fort10, or None
+
+        Args:
+            fort10 (str): File name (typically, fort.10)
+        Returns:
+            F10transaction: the open transaction
+        """
+        return cls.__active.get(os.path.abspath(fort10))
+
+    @classmethod
+    def open(cls, fort10: str) -> "F10transaction":
+        """
+        Return the open transaction of fort10, or a new one
+
+        Args:
+            fort10 (str): File name (typically, fort.10)
+        Returns:
+            F10transaction: the transaction
+        """
+        transaction = cls.get(fort10)
+        if transaction is None:
+            transaction = cls(fort10)
+        return transaction
+
+    def __enter__(self) -> "F10transaction":
+        key = os.path.abspath(self.fort10)
+        if self.__depth == 0:
+            if key in self.__active:
+                logger.error(f"A transaction of {self.fort10} is already open.")
+                raise ValueError
+            self.__active[key] = self
+        self.__depth += 1
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> bool:
+        self.__depth -= 1
+        if self.__depth == 0:
+            del self.__active[os.path.abspath(self.fort10)]
+            if exc_type is None:
+                self.commit()
+            else:
+                self.rollback()
+        return False
+
+    @property
+    def num_edits(self) -> int:
+        """
+        Return the number of pending edits
+        """
+        return sum(len(edits) for edits in self.__edits.values())
+
+    def record(self, lineno: int, index: int, value) -> None:
+        """
+        Record an edit
+
+        Args:
+            lineno (int): line No. of the value
+            index (int): index of the value in its line
+            value (str, int, float): new value
+        """
+        self.__edits.setdefault(int(lineno), {})[int(index)] = value
+
+    def record_lines(self, lineno_list, index_list, value_list) -> None:
+        """
+        Record edits, grouped by line
+
+        Args:
+            lineno_list (list): line No. of each edited line
+            index_list (list): list of the indices of the values in each line
+            value_list (list): list of the new values in each line
+        """
+        for lineno, index_list_l, value_list_l in zip(
+            lineno_list, index_list, value_list
+        ):
+            edits = self.__edits.setdefault(int(lineno), {})
+            for index, value in zip(index_list_l, value_list_l):
+                edits[int(index)] = value
+
+    def commit(self) -> None:
+        """
+        Write the pending edits to the file
+        """
+        logger.debug(f"commit {self.num_edits} edits to {self.fort10}")
+        edits = self.__edits
+        self.__edits = {}
+        pyreplace_lines(file=self.fort10, edits=edits)
+
+    def rollback(self) -> None:
+        """
+        Discard the pending edits
+        """
+        logger.debug(f"discard {self.num_edits} edits to {self.fort10}")
+        self.__edits = {}
+        for hook in self.rollback_hooks:
+            hook()
+
+
+class F10cache:
+    """
+
+    This class is a binary (.npz) sidecar cache of the parsed contents of a fort.10
+    file.
+
+    The state of each parsed section is stored in .{basename}.npz next to fort.10:
+    the Value instances as a few flat arrays (value, type, line No., and index),
+    numpy arrays as they are, and the other attributes in a JSON manifest. The
+    inode, the size, and the mtime of fort.10 are stored as well, and the sidecar
+    is valid only as long as fort.10 is not modified, so that the line numbers
+    and indices it stores can still be used to edit fort.10 in place.
+
+    Attributes:
+         fort10 (str): File name (typically, fort.10)
+         file (str): File name of the sidecar
+
+    """
+
+    # bumped whenever the layout of the sidecar changes
+    version = 3
+    # instance attributes of the sections which are not a part of the contents
+    excluded_attributes = {"fort10", "in_place", "read_flag", "memory_budget"}
+
+    # type tags of Value.v
+    __int = 0
+    __float = 1
+    __none = 2
+
+    def __init__(self, fort10: str):
+        self.fort10 = fort10
+        dirname, basename = os.path.split(os.path.abspath(fort10))
+        self.file = os.path.join(dirname, f".{basename}.npz")
+
+    def __stamp(self) -> np.ndarray:
+        stat = os.stat(self.fort10)
+        return np.array(
+            [self.version, stat.st_ino, stat.st_size, stat.st_mtime_ns], dtype=np.int64
+        )
+
+    def load(self) -> Optional[dict]:
+        """
+        Load the sidecar
+
+        Returns:
+            dict: {section name: {attribute: value}}, or None if the sidecar is
+            missing or out of date.
+        """
+        if not os.path.isfile(self.file):
+            return None
+        try:
+            with np.load(self.file, allow_pickle=False) as npz:
+                if not np.array_equal(npz["stamp"], self.__stamp()):
+                    logger.debug(f"{self.file} is out of date.")
+                    return None
+                manifest = json.loads(str(npz["manifest"]))
+                values = self.__decode_values(
+                    npz["value"], npz["tag"], npz["lineno"], npz["index"]
+                )
+                states = {}
+                for key, (kind, payload) in manifest.items():
+                    name, attribute = key.split("/")
+                    if kind == "array":
+                        value = npz[payload]
+                    elif kind == "value":
+                        value = values[payload]
+                    elif kind == "values":
+                        value = values[payload[0] : payload[1]]
+                    elif kind == "values2":
+                        start, lengths = payload
+                        value = []
+                        for n in lengths:
+                            value.append(values[start : start + n])
+                            start += n
+                    else:
+                        value = payload
+                    states.setdefault(name, {})[attribute] = value
+        except (OSError, KeyError, ValueError) as e:
+            logger.debug(f"{self.file} cannot be loaded: {e}")
+            return None
+        return states
+
+    def save(self, sections: dict) -> None:
+        """
+        Save the contents of the sections that have been read to the sidecar
+
+        Args:
+            sections (dict): {section name: F10section}
+        """
+        arrays = {"stamp": self.__stamp()}
+        manifest = {}
+        values = []
+        for name, section in sections.items():
+            if not section.read_flag:
+                continue
+            for attribute, value in vars(section).items():
+                if attribute in self.excluded_attributes:
+                    continue
+                key = f"{name}/{attribute}"
+                if isinstance(value, np.ndarray):
+                    arrays[key] = value
+                    manifest[key] = ["array", key]
+                elif isinstance(value, Value):
+                    manifest[key] = ["value", len(values)]
+                    values.append(value)
+                elif isinstance(value, list) and all(
+                    isinstance(v, Value) for v in value
+                ):
+                    manifest[key] = ["values", [len(values), len(values) + len(value)]]
+                    values += value
+                elif (
+                    isinstance(value, list)
+                    and all(isinstance(l, list) for l in value)
+                    and all(isinstance(v, Value) for l in value for v in l)
+                ):
+                    manifest[key] = ["values2", [len(values), [len(l) for l in value]]]
+                    values += [v for l in value for v in l]
+                elif isinstance(value, (bool, int, float, str, list, np.generic)):
+                    manifest[key] = ["json", np.array(value).tolist()]
+                else:
+                    raise TypeError(f"{key} of type {type(value)} cannot be cached.")
+        arrays.update(self.__encode_values(values))
+        arrays["manifest"] = np.array(json.dumps(manifest))
+
+        dirname, basename = os.path.split(self.file)
+        fd, tmp_file = tempfile.mkstemp(prefix=f"{basename}.", dir=dirname)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(f, **arrays)
+            shutil.copymode(self.fort10, tmp_file)
+            os.replace(tmp_file, self.file)
+        except BaseException:
+            if os.path.exists(tmp_file):
+                os.remove(tmp_file)
+            raise
+
+    @staticmethod
+    def restore(section: "F10section", state: dict) -> None:
+        """
+        Restore the contents of a section from its state loaded from the sidecar
+
+        Args:
+            section (F10section): the section
+            state (dict): {attribute: value}
+        """
+        vars(section).update(state)
+        section.read_flag = True
+
+    def __encode_values(self, values: list) -> dict:
+        tag = np.empty(len(values), dtype=np.uint8)
+        v = np.zeros(len(values), dtype=np.float64)
+        for n, value in enumerate(values):
+            if value.v is None:
+                tag[n] = self.__none
+            elif isinstance(value.v, (int, np.integer)) and not isinstance(
+                value.v, bool
+            ):
+                tag[n] = self.__int
+                v[n] = value.v
+            elif isinstance(value.v, (float, np.floating)):
+                tag[n] = self.__float
+                v[n] = value.v
+            else:
+                raise TypeError(f"a value of type {type(value.v)} cannot be cached.")
+        return {
+            "value": v,
+            "tag": tag,
+            "lineno": np.array([value.l for value in values], dtype=np.int64),
+            "index": np.array([value.i for value in values], dtype=np.int64),
+        }
+
+    def __decode_values(self, v, tag, lineno, index) -> list:
+        float_list = v.tolist()
+        int_list = v.astype(np.int64).tolist()
+        return [
+            Value(
+                value=i if t == self.__int else None if t == self.__none else x,
+                lineno=l,
+                index=n,
+                file=self.fort10,
+            )
+            for t, x, i, l, n in zip(
+                tag.tolist(), float_list, int_list, lineno.tolist(), index.tolist()
+            )
+        ]
+
+
+class F10section:
+    """
+
+    This class is the base class of the fort.10 sections,
+    i.e., the lines between start_keyword and end_keyword.
+
+    """
+
+    fort10 = "fort.10"
+    start_keyword = ""
+    end_keyword = ""
+
+    @property
+    def index(self) -> F10index:
+        return F10index.get(self.fort10)
+
+    @property
+    def start_lineno(self) -> int:
+        return self.index.lineno(self.start_keyword) + 1
+
+    @property
+    def end_lineno(self) -> int:
+        return self.index.lineno(self.end_keyword) - 1
+
+    def read_bytes(self) -> bytes:
+        """
+        Return the raw content of the section, i.e., from start_lineno to end_lineno.
+        """
+        _, start = self.index.line_offsets(self.start_keyword)
+        end, _ = self.index.line_offsets(self.end_keyword)
+        if end <= start:
+            return b""
+        with open(self.fort10, "rb") as f, mmap.mmap(
+            f.fileno(), 0, access=mmap.ACCESS_READ
+        ) as mm:
+            return mm[start:end]
+
+    def read_lines(self) -> list:
+        """
+        Return the lines of the section, from start_lineno to end_lineno.
+        """
+        return self.read_bytes().decode().splitlines()
+
+    def located_values(self) -> tuple:
+        """
+        Return the values held by the section with their locations in fort.10,
+        as they are written by IO_fort10.update_values(). Nothing is returned if
+        the section has not been read, i.e., the section is left as it is.
+
+        Returns:
+            tuple: line No., index, and value of each value
+        """
+        lineno = []
+        index = []
+        values = []
+        if self.read_flag:
+            for value in vars(self).values():
+                if isinstance(value, Value):
+                    value = [value]
+                elif isinstance(value, list) and all(
+                    isinstance(v, list) for v in value
+                ):
+                    value = [v for l in value for v in l]
+                elif not isinstance(value, list):
+                    continue
+                for v in value:
+                    if isinstance(v, Value) and v.v is not None:
+                        lineno.append(v.l)
+                        index.append(v.i)
+                        values.append(v.v)
+        return lineno, index, values
+
+
+def tokenize(buf: bytes, count: int = -1) -> tuple:
+    """
+    Split a block of fort.10 into numbers without creating a python object per token
+
+    Args:
+        buf (bytes): whitespace-separated numbers
+        count (int): if non-negative, only the first count tokens are read and the
+            rest of buf (e.g., the following comment lines) is ignored
+    Returns:
+        tuple: values (float64), line No. counted from the top of buf (int32),
+        and index of each value in its line (int32)
+    """
+    b = np.frombuffer(buf, dtype=np.uint8)
+    blank = (b == ord(" ")) | (b == ord("\n")) | (b == ord("\t")) | (b == ord("\r"))
+    start = np.flatnonzero(~blank & np.concatenate(([True], blank[:-1])))
+    if len(start) == 0:
+        empty = np.empty(0, dtype=np.int32)
+        return np.empty(0, dtype=np.float64), empty, empty
+    if 0 <= count < len(start):
+        buf = buf[: start[count]]
+        start = start[:count]
+    values = np.fromstring(buf, dtype=np.float64, sep=" ")
+    if len(values) != len(start):
+        logger.error("Non-numerical values are found in the block.")
+        raise ValueError
+    lineno = np.searchsorted(np.flatnonzero(b == ord("\n")), start)
+    # index = (token No.) - (No. of the first token in the same line)
+    first = np.zeros(len(start), dtype=np.int64)
+    new_line = np.flatnonzero(np.diff(lineno)) + 1
+    first[new_line] = new_line
+    index = np.arange(len(start)) - np.maximum.accumulate(first)
+    return values, lineno.astype(np.int32), index.astype(np.int32)
+
+
+def split_shells(section: F10section, num_shell: int, complex_flag: bool = False):
+    """
+    Split a basis set section of fort.10 into its shells, with an integer cursor
+    over the flat token arrays (see tokenize).
+
+    Each shell is written as its multiplicity, param_num, angular momentum
+    (TurboRVB notation), and atom label, followed by its param_num parameters
+    (3/2 x param_num numbers for a complex wavefunction).
+
+    Args:
+        section (F10section): basis set section
+        num_shell (int): the number of shells
+        complex_flag (bool): if True, the parameters of a complex wavefunction
+    Returns:
+        tuple: the shells (int32, dimension (shell, 4)) and their (line No., index)
+        (dimension (shell, 4, 2)), the parameters of all the shells one after
+        another (float64) and their (line No., index) (dimension (params, 2)),
+        and the offset of the parameters of each shell (dimension (shell + 1))
+    """
+    values, lineno, index = tokenize(section.read_bytes())
+    locator = np.stack([lineno + section.start_lineno, index], axis=-1)
+    shell_start = np.empty(num_shell, dtype=np.int64)
+    cursor = 0
+    for n in range(num_shell):
+        if cursor + 4 > len(values):
+            logger.error(f"{n} shells are found for {num_shell} shells.")
+            raise ValueError
+        shell_start[n] = cursor
+        param_num = int(values[cursor + 1])
+        if complex_flag:
+            param_num = int(param_num * 3.0 / 2.0)
+        cursor += 4 + param_num
+    if cursor > len(values):
+        logger.error(f"{cursor} values are requested, but {len(values)} found.")
+        raise ValueError
+    shell = shell_start[:, np.newaxis] + np.arange(4)
+    is_param = np.ones(cursor, dtype=bool)
+    is_param[shell.ravel()] = False
+    # the parameters of the n-th shell start after the 4 x (n + 1) shell values
+    param_start = np.append(
+        shell_start - 4 * np.arange(num_shell), cursor - 4 * num_shell
+    )
+    return (
+        values[shell].astype(np.int32),
+        locator[shell],
+        values[:cursor][is_param],
+        locator[:cursor][is_param],
+        param_start,
+    )
+
+
+def sparse_pattern_values(matrix, row, col) -> np.ndarray:
+    """
+    Return the elements of a matrix on a sparsity pattern, i.e., the (row, col)
+    elements stored in fort.10. Since fort.10 cannot store additional elements,
+    a ValueError is raised if the matrix has nonzero elements out of the pattern.
+
+    Args:
+        matrix (scipy.sparse matrix or array_like): matrix
+        row (np.ndarray): row indices of the pattern (starting from 1)
+        col (np.ndarray): column indices of the pattern (starting from 1)
+    Returns:
+        np.ndarray: the elements on the pattern
+    """
+    coo = coo_matrix(matrix)
+    coo.sum_duplicates()
+    if len(row) > 0 and (coo.shape[0] < row.max() or coo.shape[1] < col.max()):
+        logger.error(f"The shape of the matrix {coo.shape} is too small.")
+        raise ValueError
+    pattern = (row.astype(np.int64) - 1) * coo.shape[1] + (col - 1)
+    nonzero = coo.data != 0
+    key = coo.row[nonzero].astype(np.int64) * coo.shape[1] + coo.col[nonzero]
+    outside = np.count_nonzero(~np.isin(key, pattern))
+    if outside > 0:
+        logger.error(f"{outside} nonzero elements are out of the pattern of fort.10.")
+        raise ValueError
+    return np.asarray(coo.tocsr()[row - 1, col - 1]).ravel()
+
+
+def replace_values(file: str, lineno, index, values) -> None:
+    """
+    Replace values in a file, all at once.
+
+    Args:
+        file (str): File name (typically, fort.10)
+        lineno (array_like): line No. of each value
+        index (array_like): index of each value in its line
+        values (array_like): new values
+    """
+    lineno = np.asarray(lineno)
+    index = np.asarray(index)
+    values = np.asarray(values).tolist()
+    if len(values) == 0:
+        return
+    lineno_list = []
+    index_list = []
+    value_list = []
+    for i in np.argsort(lineno, kind="stable"):
+        if len(lineno_list) == 0 or lineno_list[-1] != lineno[i]:
+            lineno_list.append(int(lineno[i]))
+            index_list.append([])
+            value_list.append([])
+        index_list[-1].append(int(index[i]))
+        value_list[-1].append(values[i])
+    replace_lines(
+        file=file,
+        lineno_list=lineno_list,
+        value_list=value_list,
+        index_list=index_list,
+    )
+
+
+def replace_lines(file: str, lineno_list, value_list, index_list) -> None:
+    """
+    Replace values in a file, grouped by line. If a transaction of the file is
+    open, the edits are recorded in it instead.
+
+    Args:
+        file (str): File name (typically, fort.10)
+        lineno_list (list): line No. of each edited line
+        value_list (list): list of the new values in each line
+        index_list (list): list of the indices of the values in each line
+    """
+    transaction = F10transaction.get(file)
+    if transaction is not None:
+        transaction.record_lines(lineno_list, index_list, value_list)
+    else:
+        pysed_replace_lines(
+            file=file,
+            lineno_list=lineno_list,
+            value_list=value_list,
+            index_list=index_list,
+        )
+
+
+def probe_fort10(fort10: str = "fort.10") -> dict:
+    """
+    Read the flags and the counts of a WF file from its first lines,
+    the header block, and the atomic coordinates only, without
+    instantiating IO_fort10 (i.e., without indexing the whole file).
+
+    Args:
+        fort10 (str): File name (typically, fort.10)
+    Returns:
+        dict: the header counts (nelup, neldn, nel, natom, shell_det, shell_jas,
+        jas_2body, det, three_body_atomic_par, det_mat_nonzero, jas_mat_nonzero,
+        eq_det_atomic_par, eq_3_body_atomic_par, iesfree, iessw, ieskinr, io_flag),
+        the flags (pbc_flag, tilted_flag, complex_flag, pfaff_flag, pp_flag),
+        and the atomic_numbers and valence_electrons lists.
+    """
+    header_keys = [
+        ["nelup", "nel", "natom"],
+        ["shell_det", "shell_jas"],
+        ["jas_2body", "det", "three_body_atomic_par"],
+        ["det_mat_nonzero", "jas_mat_nonzero"],
+        ["eq_det_atomic_par", "eq_3_body_atomic_par"],
+        ["iesfree", "iessw", "ieskinr", "io_flag"],
+    ]
+
+    def next_line(f, keyword: Optional[str] = None) -> str:
+        for line in f:
+            if keyword is None or keyword in line:
+                return line
+        logger.error(f"{fort10} ends before the header has been read.")
+        raise ValueError
+
+    probe = {}
+    with open(fort10, "r") as f:
+        first_line = next_line(f)
+        probe["pbc_flag"] = "PBC_C" in first_line or "PBC_T" in first_line
+        probe["tilted_flag"] = "PBC_T" in first_line
+        if "Nelup" not in first_line:
+            next_line(f, keyword="Nelup")
+        for i, keys in enumerate(header_keys):
+            if i > 0:
+                next_line(f)  # comment line
+            line = next_line(f).split()
+            if len(line) < len(keys):
+                logger.error(f"The header of {fort10} is broken.")
+                raise ValueError
+            probe.update({key: int(v) for key, v in zip(keys, line)})
+        next_line(f, keyword="Ion coordinates")
+        coords = []
+        while len(coords) < 5 * probe["natom"]:
+            coords += next_line(f).split()
+
+    probe["neldn"] = abs(probe["nel"]) - abs(probe["nelup"])
+    probe["complex_flag"] = probe["shell_det"] < 0
+    probe["pfaff_flag"] = probe["nel"] < 0
+    probe["valence_electrons"] = [float(v) for v in coords[0::5]]
+    probe["atomic_numbers"] = [float(v) for v in coords[1::5]]
+    probe["pp_flag"] = bool(
+        np.sum(
+            np.array(probe["atomic_numbers"]) - np.array(probe["valence_electrons"])
+        )
+        != 0.0
+    )
+    return probe
+
+
 class IO_fort10:
     """
     This class is a wrapper for python fort.10 file
@@ -147,6 +974,8 @@ class IO_fort10:
     Attributes:
         fort.10 (str): the name of fort.10 WF file
         in_place (bool): if True, fort.10 file is updated whenever fort10 instance is updated.
+        cache (bool): if True, the parsed contents are loaded from (or saved to)
+            a binary sidecar of fort.10 (see F10cache). Default: IO_fort10.use_cache.
     """
 
     __f10structure_start_keyword = "Ion coordinates"
@@ -184,11 +1013,23 @@ class IO_fort10:
     )
     __f10jasbasis_sym_end_keyword = "New parameters *$"
 
-    def __init__(self, fort10: str = "fort.10", in_place: bool = True):
+    # default of the cache argument of the constructor
+    use_cache = False
+
+    def __init__(
+        self,
+        fort10: str = "fort.10",
+        in_place: bool = True,
+        cache: Optional[bool] = None,
+    ):
 
         self.fort10 = fort10
         self.in_place = in_place
+        self.cache = self.use_cache if cache is None else cache
+        states = F10cache(self.fort10).load() if self.cache else None
         self.f10header = F10header(fort10=self.fort10, in_place=self.in_place)
+        if states is not None and "f10header" in states:
+            F10cache.restore(self.f10header, states["f10header"])
         # logger.debug("header")
         self.f10structure = F10structure(
             fort10=self.fort10,
@@ -295,8 +1136,226 @@ class IO_fort10:
             in_place=self.in_place,
         )
         # logger.debug("f10jasbasis_sym")
+        if states is not None:
+            for name, section in self.__sections().items():
+                if name in states:
+                    F10cache.restore(section, states[name])
+        elif self.cache:
+            self.save_cache()
         # logger.debug("Init End")
 
+    def transaction(self) -> F10transaction:
+        """
+        Return a transaction collecting the edits of fort.10, to be used as a
+        context manager. The edits made in the with block are written to fort.10 in
+        a single rewrite when the block exits. If an exception is raised, fort.10 is
+        left untouched and the sections are re-read from it at the next access.
+
+        Returns:
+            F10transaction: the transaction
+        """
+        transaction = F10transaction.open(self.fort10)
+        if self.__reload not in transaction.rollback_hooks:
+            transaction.rollback_hooks.append(self.__reload)
+        return transaction
+
+    def __reload(self):
+        for section in self.__sections().values():
+            section.read_flag = False
+
+    def __sections(self) -> dict:
+        return {
+            name: section
+            for name, section in vars(self).items()
+            if isinstance(section, F10section)
+        }
+
+    def update_values(self, output_fort10: Optional[str] = None) -> None:
+        """
+        Update the values of fort.10 with those held by the sections, e.g.,
+        after editing them with in_place=False.
+
+        This is not a serializer: each value is replaced at its (line No.,
+        index) in the original fort.10, whose layout (comment lines, line
+        breaks, the number of values, etc.) is kept as it is. All the values
+        are replaced in a single buffered pass (see pyreplace_values), and the
+        lines whose values are unchanged are copied as they are.
+
+        Args:
+            output_fort10 (str): output file name, None -> fort.10 is updated
+                in place
+        """
+        if output_fort10 is None:
+            output_fort10 = self.fort10
+        lineno = []
+        index = []
+        values = []
+        for section in self.__sections().values():
+            lineno_s, index_s, values_s = section.located_values()
+            lineno += lineno_s
+            index += index_s
+            values += values_s
+        if len(values) == 0:
+            if os.path.abspath(output_fort10) != os.path.abspath(self.fort10):
+                shutil.copyfile(self.fort10, output_fort10)
+            return
+        pyreplace_values(
+            file=self.fort10,
+            lineno=lineno,
+            index=index,
+            values=values,
+            output_file=output_fort10,
+            compare=True,
+        )
+
+    def save_cache(self) -> None:
+        """
+        Read all the sections of fort.10 and save their contents to the binary
+        sidecar (see F10cache), from which the next IO_fort10(fort10, cache=True)
+        loads them instead of parsing fort.10 again. The sections which cannot be
+        read are left out of the sidecar.
+        """
+        for name, section in self.__sections().items():
+            try:
+                section.read()
+            except Exception as e:
+                logger.debug(f"{name} is not cached: {e}")
+        f10cache = F10cache(self.fort10)
+        try:
+            f10cache.save(self.__sections())
+        except (OSError, TypeError) as e:
+            logger.warning(f"{f10cache.file} cannot be saved: {e}")
+
+    def set_group_parameters(self, detmat=None, jasmat=None) -> None:
+        """
+        Set the parameters of the symmetry groups of detmat (the iessw
+        parameters) and jasmat (the iesfree parameters), in the order of the
+        groups in fort.10, to their matrix elements (see
+        F10matsymmetry.scatter). The fixed parameters are left untouched, and
+        all the elements are written in a single rewrite of fort.10.
+
+        Args:
+            detmat (array_like): the iessw parameters, None -> unchanged
+            jasmat (array_like): the iesfree parameters, None -> unchanged
+        """
+        if detmat is not None and self.complex_flag:
+            logger.error("The parameters of a complex detmat are not supported.")
+            raise NotImplementedError
+        with self.transaction():
+            for values, matrix, symmetry, coeff in (
+                (detmat, self.f10detmatrix, self.f10detmat_sym, "coeff_real"),
+                (jasmat, self.f10jasmatrix, self.f10jasmat_sym, "coeff"),
+            ):
+                if values is None:
+                    continue
+                row, column, values = symmetry.scatter(values)
+                elements = {
+                    (r, c): n
+                    for n, (r, c) in enumerate(
+                        zip(matrix.row.tolist(), matrix.col.tolist())
+                    )
+                }
+                try:
+                    position = [
+                        elements[(r, c)]
+                        for r, c in zip(row.tolist(), column.tolist())
+                    ]
+                except KeyError as e:
+                    logger.error(f"The element {e} of a group is not in fort.10.")
+                    raise ValueError
+                new = getattr(matrix, coeff)
+                new[position] = values
+                setattr(matrix, coeff, new)
+
+    # the optimization flags (&parameters) of the other parameters, which
+    # are written to fort.12 together with jasmat and detmat
+    other_optimization_flags = ("iesd", "iesup", "iesm", "ieskin")
+
+    def check_group_parameters(
+        self, fort12: str = "fort.12", input_name: str = "datasmin.input"
+    ) -> tuple:
+        """
+        Check that the parameters of an optimization can be averaged by
+        average_group_parameters, i.e., only the real jasmat and detmat groups
+        are optimized and fort.12 has a column per group. The other parameters,
+        e.g., the basis parameters grouped by F10basissymmetry (iesup=1 or
+        iesm=1), are left to readalles.x and turborvb-serial.x.
+
+        Args:
+            fort12 (str): fort.12 of the optimization
+            input_name (str): the input file of the optimization
+        Returns:
+            tuple: the numbers of the jasmat and detmat groups in fort.12
+        Raises:
+            NotImplementedError: if other parameters or a complex detmat are
+                optimized
+            ValueError: if the number of columns of fort.12 is inconsistent
+        """
+        flags = {}
+        namelist = Namelist.parse_namelist_from_file(input_name)
+        for parameters in namelist.parameters.values():
+            flags.update(parameters)
+        others = [
+            f"{flag}={flags[flag]}"
+            for flag in self.other_optimization_flags
+            if flags.get(flag, 0) != 0
+        ]
+        if others:
+            logger.warning(
+                f"{', '.join(others)} in {input_name}. Only the jasmat and the"
+                " detmat parameters can be averaged in Python."
+            )
+            raise NotImplementedError
+        num_jasmat = self.f10header.iesfree if flags.get("iesfree", 0) != 0 else 0
+        num_detmat = self.f10header.iessw if flags.get("iessw", 0) != 0 else 0
+        if num_detmat > 0 and self.complex_flag:
+            logger.warning("The parameters of a complex detmat are not supported.")
+            raise NotImplementedError
+
+        num_columns = IO_fort12(fort12).num_columns
+        if num_columns != num_jasmat + num_detmat:
+            logger.warning(
+                f"{fort12} has {num_columns} parameters, while {input_name}"
+                f" optimizes {num_jasmat} jasmat and {num_detmat} detmat"
+                " parameters."
+            )
+            raise ValueError
+        return num_jasmat, num_detmat
+
+    def average_group_parameters(
+        self,
+        fort12: str = "fort.12",
+        input_name: str = "datasmin.input",
+        start: int = 10,
+    ) -> None:
+        """
+        Average the parameters of an optimization in fort.12 (see
+        IO_fort12.average_parameters) and set them to the symmetry groups of
+        jasmat and detmat (see set_group_parameters).
+
+        The columns of fort.12 are taken as the iesfree jasmat groups (if
+        iesfree=1 in input_name) followed by the iessw detmat groups (if
+        iessw=1), one per group in the order of fort.10. The optimizations
+        which do not fit this layout are refused (see check_group_parameters),
+        and fort.10 is then left untouched.
+
+        Args:
+            fort12 (str): fort.12 of the optimization
+            input_name (str): the input file of the optimization
+            start (int): the number of disregarded iterations
+        Raises:
+            NotImplementedError: if other parameters are optimized
+            ValueError: if the number of columns of fort.12 is inconsistent
+        """
+        num_jasmat, num_detmat = self.check_group_parameters(
+            fort12=fort12, input_name=input_name
+        )
+        averages, _ = IO_fort12(fort12).average_parameters(start=start)
+        self.set_group_parameters(
+            jasmat=averages[:num_jasmat] if num_jasmat > 0 else None,
+            detmat=averages[num_jasmat:] if num_detmat > 0 else None,
+        )
+
     # properties!!
     @property
     def pp_flag(self) -> bool:
@@ -388,7 +1447,7 @@ class IO_fort10:
         return ansatz
 
 
-class F10header:
+class F10header(F10section):
     def __init__(self, fort10: str, in_place: bool = True):
         self.start_keyword = "Nelup"
         self.end_keyword = "Ion coordinates"
@@ -422,115 +1481,115 @@ class F10header:
 
     def read(self):
         if not self.read_flag:
-            with open(self.fort10, "r"):
-                lineno = self.start_lineno
-                line = pygetline(filename=self.fort10, lineno=lineno).split()
-                self.__Nelup = Value(
-                    value=int(line[0]),
-                    lineno=lineno,
-                    index=0,
-                    file=self.fort10,
-                )
-                self.__Nel = Value(
-                    value=int(line[1]),
-                    lineno=lineno,
-                    index=1,
-                    file=self.fort10,
-                )
-                self.__Ion = Value(
-                    value=int(line[2]),
-                    lineno=lineno,
-                    index=2,
-                    file=self.fort10,
-                )
-                lineno += 2
-                line = pygetline(filename=self.fort10, lineno=lineno).split()
-                self.__Shell_Det = Value(
-                    value=int(line[0]),
-                    lineno=lineno,
-                    index=0,
-                    file=self.fort10,
-                )
-                self.__Shell_Jas = Value(
-                    value=int(line[1]),
-                    lineno=lineno,
-                    index=1,
-                    file=self.fort10,
-                )
-                lineno += 2
-                line = pygetline(filename=self.fort10, lineno=lineno).split()
-                self.__Jas_2body = Value(
-                    value=int(line[0]),
-                    lineno=lineno,
-                    index=0,
-                    file=self.fort10,
-                )
-                self.__Det = Value(
-                    value=int(line[1]),
-                    lineno=lineno,
-                    index=1,
-                    file=self.fort10,
-                )
-                self.__three_body_atomic_par = Value(
-                    value=int(line[2]),
-                    lineno=lineno,
-                    index=2,
-                    file=self.fort10,
-                )
-                lineno += 2
-                line = pygetline(filename=self.fort10, lineno=lineno).split()
-                self.__Det_mat_nonzero = Value(
-                    value=int(line[0]),
-                    lineno=lineno,
-                    index=0,
-                    file=self.fort10,
-                )
-                self.__Jas_mat_nonzero = Value(
-                    value=int(line[1]),
-                    lineno=lineno,
-                    index=1,
-                    file=self.fort10,
-                )
-                lineno += 2
-                line = pygetline(filename=self.fort10, lineno=lineno).split()
-                self.__Eq_Det_atomic_par = Value(
-                    value=int(line[0]),
-                    lineno=lineno,
-                    index=0,
-                    file=self.fort10,
-                )
-                self.__Eq_3_body_atomic_par = Value(
-                    value=int(line[1]),
-                    lineno=lineno,
-                    index=1,
-                    file=self.fort10,
-                )
-                lineno += 2
-                line = pygetline(filename=self.fort10, lineno=lineno).split()
-                self.__iesfree = Value(
-                    value=int(line[0]),
-                    lineno=lineno,
-                    index=0,
-                    file=self.fort10,
-                )
-                self.__iessw = Value(
-                    value=int(line[1]),
-                    lineno=lineno,
-                    index=1,
-                    file=self.fort10,
-                )
-                self.__ieskinr = Value(
-                    value=int(line[2]),
-                    lineno=lineno,
-                    index=2,
-                    file=self.fort10,
-                )
-                self.__io_flag = Value(
-                    value=int(line[3]),
-                    lineno=lineno,
-                    index=3,
-                    file=self.fort10,
-                )
+            lines = self.read_lines()
+            lineno = self.start_lineno
+            line = lines[lineno - self.start_lineno].split()
+            self.__Nelup = Value(
+                value=int(line[0]),
+                lineno=lineno,
+                index=0,
+                file=self.fort10,
+            )
+            self.__Nel = Value(
+                value=int(line[1]),
+                lineno=lineno,
+                index=1,
+                file=self.fort10,
+            )
+            self.__Ion = Value(
+                value=int(line[2]),
+                lineno=lineno,
+                index=2,
+                file=self.fort10,
+            )
+            lineno += 2
+            line = lines[lineno - self.start_lineno].split()
+            self.__Shell_Det = Value(
+                value=int(line[0]),
+                lineno=lineno,
+                index=0,
+                file=self.fort10,
+            )
+            self.__Shell_Jas = Value(
+                value=int(line[1]),
+                lineno=lineno,
+                index=1,
+                file=self.fort10,
+            )
+            lineno += 2
+            line = lines[lineno - self.start_lineno].split()
+            self.__Jas_2body = Value(
+                value=int(line[0]),
+                lineno=lineno,
+                index=0,
+                file=self.fort10,
+            )
+            self.__Det = Value(
+                value=int(line[1]),
+                lineno=lineno,
+                index=1,
+                file=self.fort10,
+            )
+            self.__three_body_atomic_par = Value(
+                value=int(line[2]),
+                lineno=lineno,
+                index=2,
+                file=self.fort10,
+            )
+            lineno += 2
+            line = lines[lineno - self.start_lineno].split()
+            self.__Det_mat_nonzero = Value(
+                value=int(line[0]),
+                lineno=lineno,
+                index=0,
+                file=self.fort10,
+            )
+            self.__Jas_mat_nonzero = Value(
+                value=int(line[1]),
+                lineno=lineno,
+                index=1,
+                file=self.fort10,
+            )
+            lineno += 2
+            line = lines[lineno - self.start_lineno].split()
+            self.__Eq_Det_atomic_par = Value(
+                value=int(line[0]),
+                lineno=lineno,
+                index=0,
+                file=self.fort10,
+            )
+            self.__Eq_3_body_atomic_par = Value(
+                value=int(line[1]),
+                lineno=lineno,
+                index=1,
+                file=self.fort10,
+            )
+            lineno += 2
+            line = lines[lineno - self.start_lineno].split()
+            self.__iesfree = Value(
+                value=int(line[0]),
+                lineno=lineno,
+                index=0,
+                file=self.fort10,
+            )
+            self.__iessw = Value(
+                value=int(line[1]),
+                lineno=lineno,
+                index=1,
+                file=self.fort10,
+            )
+            self.__ieskinr = Value(
+                value=int(line[2]),
+                lineno=lineno,
+                index=2,
+                file=self.fort10,
+            )
+            self.__io_flag = Value(
+                value=int(line[3]),
+                lineno=lineno,
+                index=3,
+                file=self.fort10,
+            )
 
             self.read_flag = True
 
@@ -574,14 +1633,6 @@ class F10header:
 
             # logger.debug("End init of IO_fort10")
 
-    @property
-    def start_lineno(self):
-        return pygrep_lineno(self.fort10, self.start_keyword) + 1
-
-    @property
-    def end_lineno(self):
-        return pygrep_lineno(self.fort10, self.end_keyword) - 1
-
     @property
     def nelup(self):
         self.read()
@@ -748,7 +1799,7 @@ class F10header:
         return np.abs(self.__Nel.v) - np.abs(self.__Nelup.v)
 
 
-class F10structure:
+class F10structure(F10section):
     def __init__(
         self,
         fort10: str,
@@ -775,7 +1826,9 @@ class F10structure:
     def read(self):
         if not self.read_flag:
             # read PBC flag
-            first_line = pygetline(filename=self.fort10, lineno=0)
+            with open(self.fort10, "r") as f:
+                head = [f.readline(), f.readline()]
+            first_line = head[0]
             if "PBC_C" in first_line:
                 self.__pbc = True
                 self.__tilted_flag = False
@@ -790,7 +1843,7 @@ class F10structure:
             if self.__pbc:
                 if not self.__tilted_flag:
                     lineno = 1
-                    line = pygetline(filename=self.fort10, lineno=lineno).split()
+                    line = head[lineno].split()
                     self.__r_s = Value(
                         value=float(line[0]),
                         lineno=lineno,
@@ -862,7 +1915,7 @@ class F10structure:
 
                 else:
                     lineno = 1
-                    line = pygetline(filename=self.fort10, lineno=lineno).split()
+                    line = head[lineno].split()
                     self.__vec_a_1 = Value(
                         value=float(line[0]),
                         lineno=lineno,
@@ -973,14 +2026,7 @@ class F10structure:
             self.__atomic_numbers = []
             self.__valence_electrons = []
             self.__positions = []
-            lines = [
-                pygetline(filename=self.fort10, lineno=lineno, clearcache=False)
-                for lineno in range(self.start_lineno, self.end_lineno + 1)
-            ]  # clearcache should be false (for loop), otherwise so slow
-
-            # a manual clearcache is better to avoid
-            # unexpected behaviour of pygetline
-            linecache.clearcache()
+            lines = self.read_lines()
             lineno = self.start_lineno
             p = []
             for line in lines:
@@ -1007,9 +2053,6 @@ class F10structure:
 
             self.read_flag = True
 
-    def write(self):
-        raise NotImplementedError
-
     @property
     def structure(self):
         self.read()
@@ -1094,16 +2137,8 @@ class F10structure:
         self.read()
         return [self.__phase_dn_1.v, self.__phase_dn_2.v, self.__phase_dn_3.v]
 
-    @property
-    def start_lineno(self):
-        return pygrep_lineno(self.fort10, self.start_keyword) + 1
 
-    @property
-    def end_lineno(self):
-        return pygrep_lineno(self.fort10, self.end_keyword) - 1
-
-
-class F10forceconstraint:
+class F10forceconstraint(F10section):
     def __init__(
         self,
         fort10: str,
@@ -1123,6 +2158,12 @@ class F10forceconstraint:
         self.__constraint_index = []
         self.__atom_label = []
         self.__direction = []
+        # the constraints as arrays, for scattering force components
+        self.__scatter_divisor = np.zeros(0)
+        self.__scatter_component = np.zeros(0, dtype=int)
+        self.__scatter_row = np.zeros(0, dtype=int)
+        self.__scatter_col = np.zeros(0, dtype=int)
+        self.__scatter_sign = np.zeros(0)
 
     def read(self):
         if not self.read_flag:
@@ -1132,13 +2173,7 @@ class F10forceconstraint:
             self.__atom_label = []
             self.__direction = []
 
-            lines = [
-                pygetline(filename=self.fort10, lineno=lineno, clearcache=False)
-                for lineno in range(self.start_lineno, self.end_lineno + 1)
-            ]  # clearcache should be false (for for loop); otherwise very slow
-            # a manual clearcache is better to avoid
-            # unexpected behaviour of pygetline
-            linecache.clearcache()
+            lines = self.read_lines()
             lineno = self.start_lineno
             p = []
             for line in lines:
@@ -1168,10 +2203,42 @@ class F10forceconstraint:
 
                 c_index += 2 * num_constraints + 1
 
+            atom_label = np.array([i.v for i in self.__atom_label], dtype=int)
+            self.__scatter_divisor = np.array(
+                [i.v for i in self.__constraint_num], dtype=float
+            )
+            self.__scatter_component = np.array(self.__constraint_index, dtype=int)
+            self.__scatter_row = np.abs(atom_label) - 1
+            self.__scatter_col = (
+                np.array([i.v for i in self.__direction], dtype=int) - 1
+            )
+            self.__scatter_sign = np.where(atom_label < 0, -1.0, 1.0)
+
             self.read_flag = True
 
-    def write(self):
-        raise NotImplementedError
+    def force_matrix(self, components, natom: int, signed: bool = True) -> np.ndarray:
+        """
+        Scatter the computed force components into a (natom, 3) matrix.
+
+        Each component is divided by the number of its constraints, and is
+        assigned to all the (atom, direction) pairs of the constraints, with
+        the sign of the atom label if signed is True.
+
+        Args:
+            components (array_like): the ieskinr force components (or error bars)
+            natom (int): the number of atoms
+            signed (bool): True for forces, False for error bars
+        Returns:
+            np.ndarray: (natom, 3) matrix
+        """
+        self.read()
+        components = np.asarray(components, dtype=float) / self.__scatter_divisor
+        values = components[self.__scatter_component]
+        if signed:
+            values = values * self.__scatter_sign
+        matrix = np.zeros((natom, 3))
+        matrix[self.__scatter_row, self.__scatter_col] = values
+        return matrix
 
     @property
     def constraint_num(self):
@@ -1193,16 +2260,8 @@ class F10forceconstraint:
         self.read()
         return [i.v for i in self.__direction]
 
-    @property
-    def start_lineno(self):
-        return pygrep_lineno(self.fort10, self.start_keyword) + 1
-
-    @property
-    def end_lineno(self):
-        return pygrep_lineno(self.fort10, self.end_keyword) - 1
-
 
-class F10jastwobody:
+class F10jastwobody(F10section):
     def __init__(
         self,
         fort10: str,
@@ -1226,12 +2285,7 @@ class F10jastwobody:
     def read(self):
         if not self.read_flag:
             # read det basis sets, molecular orbitals, and hybrid orbitals
-            lines = [
-                pygetline(filename=self.fort10, lineno=lineno, clearcache=False)
-                for lineno in range(self.start_lineno, self.end_lineno + 1)
-            ]  # clearcache should be false
-            # a manual clearcache is better to avoid unexpected
-            linecache.clearcache()
+            lines = self.read_lines()
             lineno = self.start_lineno
             p = []
             for line in lines:
@@ -1281,9 +2335,6 @@ class F10jastwobody:
 
             self.read_flag = True
 
-    def write(self):
-        raise NotImplementedError
-
     @property
     def num_jas_param(self):
         self.read()
@@ -1299,16 +2350,13 @@ class F10jastwobody:
         self.read()
         return [i.v for i in self.__onebody_list]
 
-    @property
-    def start_lineno(self):
-        return pygrep_lineno(self.fort10, self.start_keyword) + 1
-
-    @property
-    def end_lineno(self):
-        return pygrep_lineno(self.fort10, self.end_keyword) - 1
 
+class F10detbasissets(F10section):
+    # orbital kinds of the shells
+    atomic_orbital = 0
+    molecular_orbital = 1
+    hybrid_orbital = 2
 
-class F10detbasissets:
     def __init__(
         self,
         fort10: str,
@@ -1317,6 +2365,7 @@ class F10detbasissets:
         start_keyword: str,
         end_keyword: str,
         in_place: bool = True,
+        memory_budget: int = 1 << 26,
     ):
         self.start_keyword = start_keyword
         self.end_keyword = end_keyword
@@ -1325,274 +2374,201 @@ class F10detbasissets:
         self.shell_det = shell_det
         self.complex_flag = complex_flag
         self.in_place = in_place
-
-        # Values()
-        self.__atom_label = []  # starting from 1!
-        self.__param_num = []
-        self.__shell_multiplicity = []
-        self.__shell_ang_mom_turbo_notation = []
-        self.__exponent = []
-        self.__coefficient = []
-        self.__coefficient_imag = []
-        # auxiliary values
-        self.__shell_index = []
-
-        # Values()
-        self.__mo_atom_label = []  # starting from 1!
-        self.__mo_param_num = []
-        self.__mo_shell_multiplicity = []
-        self.__mo_shell_ang_mom_turbo_notation = []
-        self.__mo_prim_index = []
-        # dimension (prim_ao.num, mo.num) prim_ao.num != ao.num
-        # in the turborvb implementation.
-        self.__mo_coefficient = []
-        # dimension (prim_ao.num, mo.num) prim_ao.num != ao.num
-        # in the turborvb implementation.
-        self.__mo_coefficient_imag = []
-        # dimension (prim_ao.num, mo.num) prim_ao.num != ao.num
-        # in the turborvb implementation.
-
-        # Values()
-        self.__hyb_atom_label = []  # starting from 1!
-        self.__hyb_param_num = []
-        self.__hyb_shell_multiplicity = []
-        self.__hyb_shell_ang_mom_turbo_notation = []
-        self.__hyb_prim_index = []
-        # dimension (prim_ao.num, hyb.num) prim_ao.num != ao.num
-        # in the turborvb implementation.
-        self.__hyb_coefficient = []
-        # dimension (prim_ao.num, hyb.num) prim_ao.num != ao.num
-        # in the turborvb implementation.
-        self.__hyb_coefficient_imag = []
-        # dimension (prim_ao.num, hyb.num) prim_ao.num != ao.num
-        # in the turborvb implementation.
+        # bytes of fort.10 held in memory when the MO coefficients are replaced
+        self.memory_budget = memory_budget
+
+        # np.arrays of all the shells (atomic orbitals, molecular orbitals,
+        # and hybrid orbitals) in the order of fort.10
+        # multiplicity, param_num, ang. mom. (turbo notation), atom label (from 1!)
+        # dimension (shell, 4)
+        self.__shell = np.empty((0, 4), dtype=np.int32)
+        # (line No., index) of the shell values, dimension (shell, 4, 2)
+        self.__shell_locator = np.empty((0, 4, 2), dtype=np.int32)
+        # atomic_orbital, molecular_orbital, hybrid_orbital, or -1 (others)
+        self.__orbital_kind = np.empty(0, dtype=np.int8)
+        # the parameters of all the shells one after another, i.e., those of the
+        # n-th shell are params[param_start[n] : param_start[n + 1]]
+        self.__params = np.empty(0, dtype=np.float64)
+        self.__param_start = np.zeros(1, dtype=np.int64)
+        # (line No., index) of the parameters, dimension (params, 2)
+        self.__param_locator = np.empty((0, 2), dtype=np.int32)
+
+        # auxiliary values of the atomic orbitals: the indices of the exponents
+        # and the coefficients in params (-1: uncontracted, i.e., no coefficient),
+        # and the index of the shell of each exponent among the atomic shells
+        self.__exponent_index = np.empty(0, dtype=np.int64)
+        self.__coefficient_index = np.empty(0, dtype=np.int64)
+        self.__coefficient_imag_index = np.empty(0, dtype=np.int64)
+        self.__shell_index = np.empty(0, dtype=np.int64)
 
     def read(self):
         if not self.read_flag:
-            # logger.debug("Reading!!")
             # read det basis sets, molecular orbitals, and hybrid orbitals
-            # logger.debug("Check0")
-            lines = [
-                pygetline(filename=self.fort10, lineno=lineno, clearcache=False)
-                for lineno in range(self.start_lineno, self.end_lineno + 1)
-            ]  # clearcache should be False otherwise very slow.
-            # a manual clearcache is better to avoid
-            # unexpected behaviour of pygetline
-            linecache.clearcache()
-            lineno = self.start_lineno
-            p = []
-            # logger.debug("Check1")
-            for line in lines:
-                # logger.debug(line)
-                for i, value in enumerate(line.split()):
-                    p.append(
-                        Value(
-                            value=value,
-                            lineno=lineno,
-                            index=i,
-                            file=self.fort10,
-                        )
-                    )
-                lineno += 1
+            (
+                self.__shell,
+                self.__shell_locator,
+                self.__params,
+                self.__param_locator,
+                self.__param_start,
+            ) = split_shells(self, abs(self.shell_det), self.complex_flag)
+
+            kinds = {"hyb": self.hybrid_orbital, "mol": self.molecular_orbital}
+            kinds.update({c: self.atomic_orbital for c in "spdfghi"})
+            self.__orbital_kind = np.full(len(self.__shell), -1, dtype=np.int8)
+            contraction = np.zeros(len(self.__shell), dtype=bool)
+            for code in np.unique(self.__shell[:, 2]).tolist():
+                shells = self.__shell[:, 2] == code
+                orb_type_chr = str(return_orb_type_chr(code))
+                self.__orbital_kind[shells] = kinds.get(orb_type_chr, -1)
+                if orb_type_chr in {"s", "p", "d", "f", "g", "h", "i"}:
+                    contraction[shells] = return_contraction_flag(code)
+
+            exponent_index = []
+            coefficient_index = []
+            coefficient_imag_index = []
+            shell_index = []
+            atomic_shells = np.flatnonzero(self.__orbital_kind == self.atomic_orbital)
+            for n, s in enumerate(atomic_shells.tolist()):
+                start = int(self.__param_start[s])
+                if contraction[s]:
+                    # the first half are the exponents, and the second half are
+                    # the coefficients (real and imaginary parts alternately)
+                    num = int(self.__shell[s, 1] / 2)
+                    exponent_index.append(np.arange(start, start + num))
+                    if self.complex_flag:
+                        coefficient = np.arange(start + num, start + 3 * num, 2)
+                        coefficient_index.append(coefficient)
+                        coefficient_imag_index.append(coefficient + 1)
+                    else:
+                        coefficient_index.append(np.arange(start + num, start + 2 * num))
+                    shell_index.append(np.full(num, n))
+                else:
+                    exponent_index.append(np.array([start]))
+                    coefficient_index.append(np.array([-1]))
+                    shell_index.append(np.array([n]))
+            empty = [np.empty(0, dtype=np.int64)]
+            self.__exponent_index = np.concatenate(empty + exponent_index)
+            self.__coefficient_index = np.concatenate(empty + coefficient_index)
+            self.__coefficient_imag_index = np.concatenate(
+                empty + coefficient_imag_index
+            )
+            self.__shell_index = np.concatenate(empty + shell_index)
 
-            # logger.debug("Check2")
-            for num in range(abs(self.shell_det)):
-                p[0].type(int)
-                multiplicity = p[0]
-                p[1].type(int)
-                param_num = p[1]
-                p[2].type(int)
-                shell_ang_mom_turbo_notation = p[2]
-                p[3].type(int)
-                atom_label = p[3]
-
-                orb_type_chr = str(return_orb_type_chr(shell_ang_mom_turbo_notation.v))
-
-                if orb_type_chr == "hyb":
-                    self.__hyb_shell_multiplicity.append(multiplicity)
-                    self.__hyb_param_num.append(param_num)
-                    self.__hyb_shell_ang_mom_turbo_notation.append(
-                        shell_ang_mom_turbo_notation
-                    )
-                    self.__hyb_atom_label.append(atom_label)
-
-                    hyb_prim_index = []
-                    hyb_coefficient = []
-                    hyb_coefficient_imag = []
-                    num = int(param_num.v / 2)
-
-                    if not self.complex_flag:  # real
-                        for n in p[4 : 4 + num]:
-                            n.type(int)
-                            hyb_prim_index.append(n)
-                        for n in p[4 + num : 4 + param_num.v]:
-                            n.type(float)
-                            hyb_coefficient.append(n)
-
-                    else:  # complex
-                        for n in p[4 : 4 + num]:
-                            n.type(int)
-                            hyb_prim_index.append(n)
-                        for i, n in enumerate(
-                            p[4 + num : 4 + int(param_num.v * 3.0 / 2.0)]
-                        ):
-                            if i % 2 == 0:
-                                n.type(float)
-                                hyb_coefficient.append(n)
-                            else:
-                                n.type(float)
-                                hyb_coefficient_imag.append(n)
-
-                    self.__hyb_prim_index.append(hyb_prim_index)
-                    self.__hyb_coefficient.append(hyb_coefficient)
-                    self.__hyb_coefficient_imag.append(hyb_coefficient_imag)
-
-                elif orb_type_chr == "mol":
-                    self.__mo_shell_multiplicity.append(multiplicity)
-                    self.__mo_param_num.append(param_num)
-                    self.__mo_shell_ang_mom_turbo_notation.append(
-                        shell_ang_mom_turbo_notation
-                    )
-                    self.__mo_atom_label.append(atom_label)
-
-                    mo_prim_index = []
-                    mo_coefficient = []
-                    mo_coefficient_imag = []
-                    ind_num = int(param_num.v / 2)
-
-                    if not self.complex_flag:  # real case
-                        for n in p[4 : 4 + ind_num]:
-                            n.type(int)
-                            mo_prim_index.append(n)
-                        for n in p[4 + ind_num : 4 + param_num.v]:
-                            n.type(float)
-                            mo_coefficient.append(n)
-
-                    else:  # complex case!!
-                        for n in p[4 : 4 + ind_num]:
-                            n.type(int)
-                            mo_prim_index.append(n)
-                        for i, n in enumerate(
-                            p[4 + ind_num : 4 + int(param_num.v * 3.0 / 2.0)]
-                        ):
-                            if i % 2 == 0:
-                                n.type(float)
-                                mo_coefficient.append(n)
-                            else:
-                                n.type(float)
-                                mo_coefficient_imag.append(n)
-
-                    self.__mo_prim_index.append(mo_prim_index)
-                    self.__mo_coefficient.append(mo_coefficient)
-                    self.__mo_coefficient_imag.append(mo_coefficient_imag)
-
-                elif orb_type_chr in {"s", "p", "d", "f", "g", "h", "i"}:
-                    shell_index = len(self.__shell_multiplicity)
-                    self.__shell_multiplicity.append(multiplicity)
-                    self.__param_num.append(param_num)
-                    self.__shell_ang_mom_turbo_notation.append(
-                        shell_ang_mom_turbo_notation
-                    )
-                    self.__atom_label.append(atom_label)
-
-                    # logger.debug(f"multi= {multiplicity.v}")
-                    # logger.debug(f"param_num = {param_num.v}")
-                    # logger.debug(
-                    #    f"orb_type_num = {shell_ang_mom_turbo_notation.v}"
-                    # )
-                    # logger.debug(f"atom_label = {atom_label.v}")
-                    contraction_flag = return_contraction_flag(
-                        shell_ang_mom_turbo_notation.v
-                    )
+            self.read_flag = True
 
-                    if contraction_flag:
-                        num = int(param_num.v / 2)
-
-                        if not self.complex_flag:  # real case
-                            for n in p[4 : 4 + num]:
-                                n.type(float)
-                                self.__exponent.append(n)
-                                self.__shell_index.append(shell_index)
-                            for n in p[4 + num : 4 + param_num.v]:
-                                n.type(float)
-                                self.__coefficient.append(n)
-                        else:  # complex case
-                            for n in p[4 : 4 + num]:
-                                n.type(float)
-                                self.__exponent.append(n)
-                                self.__shell_index.append(shell_index)
-                            for i, n in enumerate(
-                                p[4 + num : 4 + int(param_num.v * 3.0 / 2.0)]
-                            ):
-                                if i % 2 == 0:
-                                    n.type(float)
-                                    self.__coefficient.append(n)
-                                else:
-                                    n.type(float)
-                                    self.__coefficient_imag.append(n)
-                    else:
-                        p[4].type(float)
-                        self.__exponent.append(p[4])
-                        self.__shell_index.append(shell_index)
-                        self.__coefficient.append(Value())
+    def located_values(self) -> tuple:
+        if not self.read_flag:
+            return [], [], []
+        # the primitive indices of the molecular and hybrid orbitals are integers
+        params = self.__params.tolist()
+        for prim_index in self.__prim_indices(self.molecular_orbital) + (
+            self.__prim_indices(self.hybrid_orbital)
+        ):
+            for i in prim_index.tolist():
+                params[i] = int(params[i])
+        return (
+            self.__shell_locator[..., 0].ravel().tolist()
+            + self.__param_locator[:, 0].tolist(),
+            self.__shell_locator[..., 1].ravel().tolist()
+            + self.__param_locator[:, 1].tolist(),
+            self.__shell.ravel().tolist() + params,
+        )
 
-                if not self.complex_flag:  # real case
-                    p = p[4 + param_num.v :]
-                else:  # complex case
-                    p = p[4 + int(param_num.v * 3.0 / 2.0) :]
+    def __shells(self, kind: int) -> np.ndarray:
+        return np.flatnonzero(self.__orbital_kind == kind)
 
-            self.read_flag = True
+    def __prim_indices(self, kind: int) -> list:
+        # indices in params of the primitive indices of each MO (or hybrid orbital)
+        return [
+            np.arange(
+                self.__param_start[s], self.__param_start[s] + self.__shell[s, 1] // 2
+            )
+            for s in self.__shells(kind).tolist()
+        ]
+
+    def __coefficient_indices(self, kind: int, imag: bool = False) -> list:
+        # indices in params of the coefficients of each MO (or hybrid orbital)
+        indices = []
+        for s in self.__shells(kind).tolist():
+            start = self.__param_start[s] + self.__shell[s, 1] // 2
+            stop = self.__param_start[s + 1]
+            if self.complex_flag:
+                indices.append(np.arange(start + int(imag), stop, 2))
+            elif imag:
+                indices.append(np.empty(0, dtype=np.int64))
+            else:
+                indices.append(np.arange(start, stop))
+        return indices
+
+    def __get_coefficients(self, kind: int, imag: bool = False) -> list:
+        return [
+            self.__params[i].tolist() for i in self.__coefficient_indices(kind, imag)
+        ]
 
-    def write(self):
-        raise NotImplementedError
+    def __set_coefficients(
+        self, kind: int, new_coefficient: list, imag: bool = False
+    ) -> None:
+        indices = self.__coefficient_indices(kind, imag)
+        assert len(new_coefficient) == len(indices)
+        for i, new_coeff in zip(indices, new_coefficient):
+            if len(i) != len(new_coeff):
+                logger.error(
+                    f"len(old_mo_coeff):{len(i)} != len(new_mo_coeff):{len(new_coeff)}"
+                )
+                raise ValueError
+        index = np.concatenate([np.empty(0, dtype=np.int64)] + indices)
+        values = np.array(
+            [c for new_coeff in new_coefficient for c in new_coeff], dtype=np.float64
+        )
+        logger.debug(f"Total num sed = {len(index)}")
+        if self.in_place:
+            """with gnu-sed (very slow after improvement!!)
+            logger.debug("replace by gnu-sed")
+            self.replace_mo_coeff_with_sed(self.__param_locator[index], values)
+            """
+            # """ with readlines
+            logger.debug("replace by sed-python")
+            self.replace_mo_coeff_pure_python(self.__param_locator[index], values)
+            # """
+        self.__params[index] = values
 
     @property
     def det_basis_sets(self):
         self.read()
+        atomic = self.__shell[self.__shells(self.atomic_orbital)]
+        hyb = self.__shell[self.__shells(self.hybrid_orbital)]
         return Det_Basis_sets(
             # det basis
-            nucleus_index=[a.v - 1 for a in self.__atom_label],
-            shell_ang_mom=[int((a.v - 1) / 2) for a in self.__shell_multiplicity],
-            shell_ang_mom_turbo_notation=[
-                a.v for a in self.__shell_ang_mom_turbo_notation
-            ],
-            shell_factor=[1.0] * len(self.__atom_label),
-            shell_index=[a for a in self.__shell_index],
-            exponent=[a.v for a in self.__exponent],
-            coefficient=[a.v if a.v is not None else 1.0 for a in self.__coefficient],
-            coefficient_imag=[a.v for a in self.__coefficient_imag],
-            prim_factor=[1.0] * len(self.__exponent),
+            nucleus_index=(atomic[:, 3] - 1).tolist(),
+            shell_ang_mom=((atomic[:, 0] - 1) // 2).tolist(),
+            shell_ang_mom_turbo_notation=atomic[:, 2].tolist(),
+            shell_factor=[1.0] * len(atomic),
+            shell_index=self.__shell_index.tolist(),
+            exponent=self.exponent,
+            coefficient=[a if a is not None else 1.0 for a in self.coefficient],
+            coefficient_imag=self.coefficient_imag,
+            prim_factor=[1.0] * len(self.__exponent_index),
             # hybrid
-            hyb_nucleus_index=[a.v - 1 for a in self.__hyb_atom_label],
-            hyb_param_num=[a.v for a in self.__hyb_param_num],
-            hyb_shell_ang_mom=[0 for a in self.__hyb_shell_multiplicity],
-            hyb_shell_ang_mom_turbo_notation=[
-                a.v for a in self.__hyb_shell_ang_mom_turbo_notation
-            ],
+            hyb_nucleus_index=(hyb[:, 3] - 1).tolist(),
+            hyb_param_num=hyb[:, 1].tolist(),
+            hyb_shell_ang_mom=[0] * len(hyb),
+            hyb_shell_ang_mom_turbo_notation=hyb[:, 2].tolist(),
             hyb_prim_index=[
-                [a.v - 1 for a in hyb_prim_list]
-                for hyb_prim_list in self.__hyb_prim_index
-            ],
-            hyb_coefficient=[
-                [a.v for a in hyb_coeff_list]
-                for hyb_coeff_list in self.__hyb_coefficient
-            ],
-            hyb_coefficient_imag=[
-                [a.v for a in hyb_coeff_imag_list]
-                for hyb_coeff_imag_list in self.__hyb_coefficient_imag
+                [a - 1 for a in hyb_prim_list] for hyb_prim_list in self.hyb_prim_index
             ],
+            hyb_coefficient=self.hyb_coefficient,
+            hyb_coefficient_imag=self.hyb_coefficient_imag,
         )
 
     @property
     def shell_index(self):
         self.read()
-        return self.__shell_index
-        # self.read(); return [[i.v for i in j] for j in self.__shell_index]
+        return self.__shell_index.tolist()
 
     @property
     def has_mo(self):
         self.read()
-        if len(self.__mo_atom_label) > 0:
+        if len(self.__shells(self.molecular_orbital)) > 0:
             return True
         else:
             return False
@@ -1600,138 +2576,51 @@ class F10detbasissets:
     @property
     def num_mo(self):
         self.read()
-        return len(self.__mo_atom_label)
+        return len(self.__shells(self.molecular_orbital))
 
     @property
     def mo_coefficient(self):
         self.read()
-        return [[i.v for i in j] for j in self.__mo_coefficient]
+        return self.__get_coefficients(self.molecular_orbital)
 
     @property
     def mo_coefficient_imag(self):
         self.read()
-        return [[i.v for i in j] for j in self.__mo_coefficient_imag]
+        return self.__get_coefficients(self.molecular_orbital, imag=True)
 
     @property
     def hyb_coefficient(self):
         self.read()
-        return [[i.v for i in j] for j in self.__hyb_coefficient]
+        return self.__get_coefficients(self.hybrid_orbital)
 
     @property
     def hyb_coefficient_imag(self):
         self.read()
-        return [[i.v for i in j] for j in self.__hyb_coefficient_imag]
+        return self.__get_coefficients(self.hybrid_orbital, imag=True)
 
     @mo_coefficient.setter
     def mo_coefficient(self, new_mo_coefficient):
         self.read()
-        # logger.debug(len(new_mo_coefficient))
-        # logger.debug(len(self.__mo_coefficient))
-        # logger.debug(new_mo_coefficient[0][-1])
-        assert len(new_mo_coefficient) == len(self.__mo_coefficient)
-        total_num_sed = len(new_mo_coefficient) * len(new_mo_coefficient[0])
-        logger.debug(f"Total num sed = {total_num_sed}")
-        if self.in_place:
-            """with gnu-sed (very slow after improvement!!)
-            logger.debug("replace by gnu-sed")
-            self.replace_mo_coeff_with_sed(
-                self.__mo_coefficient, new_mo_coefficient
-            )
-            """
-            # """ with readlines
-            logger.debug("replace by sed-python (real part)")
-            self.replace_mo_coeff_pure_python(self.__mo_coefficient, new_mo_coefficient)
-            # """
-        # todo, self.__mo_coefficient itself should be replaced
-        # with new_mo_coefficient!! at present, fort.10 is not updated.
+        self.__set_coefficients(self.molecular_orbital, new_mo_coefficient)
 
     @mo_coefficient_imag.setter
     def mo_coefficient_imag(self, new_mo_coefficient_imag):
         self.read()
-        # logger.debug(len(new_mo_coefficient))
-        # logger.debug(len(self.__mo_coefficient_imag))
-        # logger.debug(new_mo_coefficient[0][-1])
-        assert len(new_mo_coefficient_imag) == len(self.__mo_coefficient_imag)
-        total_num_sed = len(new_mo_coefficient_imag) * len(new_mo_coefficient_imag[0])
-        logger.debug(f"Total num sed = {total_num_sed}")
-        if self.in_place:
-            """with gnu-sed (very slow after improvement!!)
-            logger.debug("replace by gnu-sed")
-            self.replace_mo_coeff_with_sed(
-                self.__mo_coefficient_imag, new_mo_coefficient_imag
-            )
-            """
-            # """ with readlines
-            logger.debug("replace by sed-python (img. part)")
-            self.replace_mo_coeff_pure_python(
-                self.__mo_coefficient_imag, new_mo_coefficient_imag
-            )
-            # """
-        # todo, self.__mo_coefficient_imag itself should be replaced
-        # with new_mo_coefficient!! at present, fort.10 is not updated.
+        self.__set_coefficients(
+            self.molecular_orbital, new_mo_coefficient_imag, imag=True
+        )
 
-    def replace_mo_coeff_with_sed(self, old_mo_coefficient, new_mo_coefficient):
+    def replace_mo_coeff_with_sed(self, locator, new_mo_coefficient):
         start_sed = time.time()
-        file_list = []
-        lineno_list = []
-        value_list = []
-        index_list = []
-        for mo_coeff, new_mo_coeff in zip(old_mo_coefficient, new_mo_coefficient):
-            assert len(mo_coeff) == len(new_mo_coeff)
-            lineno = -1
-            files = []
-            index_same_lineno = []
-            new_coeff_same_lineno = []
-            # logger.debug(mo_coeff)
-            # logger.debug(new_mo_coeff)
-            for coeff, new_coeff in zip(mo_coeff, new_mo_coeff):
-                l = coeff.l
-                # v = coeff.v
-                i = coeff.i
-                f = coeff.f
-
-                if lineno == -1:
-                    lineno = l
-                    files.append(f)
-                    index_same_lineno.append(i)
-                    new_coeff_same_lineno.append(new_coeff)
-
-                else:
-                    if lineno == l:
-                        files.append(f)
-                        index_same_lineno.append(i)
-                        new_coeff_same_lineno.append(new_coeff)
-
-                    else:
-                        assert len(set(files)) == 1
-                        file = files[0]
-
-                        file_list.append(file)
-                        lineno_list.append(lineno)
-                        value_list.append(new_coeff_same_lineno)
-                        index_list.append(index_same_lineno)
-
-                        files = []
-                        index_same_lineno = []
-                        new_coeff_same_lineno = []
-
-                        lineno = l
-                        files.append(f)
-                        index_same_lineno.append(i)
-                        new_coeff_same_lineno.append(new_coeff)
-
-            if len(files) != 0:
-                assert len(set(files)) == 1
-                file = files[0]
-                file_list.append(file)
-                lineno_list.append(lineno)
-                value_list.append(new_coeff_same_lineno)
-                index_list.append(index_same_lineno)
-
-        assert len(set(file_list)) == 1
-        file = file_list[0]
-        pysed_replace_lines(
-            file=file,
+        locator = np.asarray(locator)
+        new_mo_coefficient = np.asarray(new_mo_coefficient)
+        # the coefficients in the same line are replaced at once
+        split = np.flatnonzero(np.diff(locator[:, 0])) + 1
+        lineno_list = [int(line[0]) for line in np.split(locator[:, 0], split)]
+        index_list = [i.tolist() for i in np.split(locator[:, 1], split)]
+        value_list = [v.tolist() for v in np.split(new_mo_coefficient, split)]
+        replace_lines(
+            file=self.fort10,
             lineno_list=lineno_list,
             value_list=value_list,
             index_list=index_list,
@@ -1739,162 +2628,93 @@ class F10detbasissets:
         end_sed = time.time()
         logger.info("elapsed time for sed:{:f}".format(end_sed - start_sed) + "[sec]")
 
-    def replace_mo_coeff_pure_python(self, old_mo_coefficient, new_mo_coefficient):
-        line_no_list = []
-        index_list = []
-        w_mo_coeff_list = []
-        for old_mo_coeff, new_mo_coeff in zip(old_mo_coefficient, new_mo_coefficient):
-            if len(old_mo_coeff) != len(new_mo_coeff):
-                logger.error(
-                    f"len(old_mo_coeff):{len(old_mo_coeff)} != len(new_mo_coeff):{len(new_mo_coeff)}"
-                )
-                raise ValueError
-            line_no_list += [coeff.l for coeff in old_mo_coeff]
-            index_list += [coeff.i for coeff in old_mo_coeff]
-            w_mo_coeff_list += new_mo_coeff
-
-        available_memory = psutil.virtual_memory().available  # Byte
-        size_of_fort10 = os.path.getsize(self.fort10)  # Byte
-        logger.debug(f"available memory = {available_memory >> 20} MiB")
-        logger.debug(f"fort10 size = {size_of_fort10 >> 20} MiB")
-
-        if available_memory * 0.90 > size_of_fort10:
-            logger.debug("available memory > fort10 size")
-            # version with readlines (more memory, but faster)
-            with open(self.fort10, "r") as f:
-                lines = f.readlines()
-
-            # """ straightforward, but established way
-            tqdm_out = TqdmToLogger(logger, level=logging.INFO)
-
-            # new way!! a big loop (line_no_list) is iterated only once!!
-            line_no_index_list_dict = {line_no: [] for line_no in line_no_list}
-            for i, line_no in enumerate(line_no_list):
-                line_no_index_list_dict[line_no].append(i)
-
-            for line_no in tqdm(
-                list(set(line_no_list)),
-                file=tqdm_out,
-                miniters=int(len(list(set(line_no_list))) / 10),
-                maxinterval=1.0e5,
-            ):
-                # old way, very slow!! because
-                # a big loop (line_no_list) is iterated twice!!
-                """
-                line_no_index_list = [
-                    i for i, x in enumerate(line_no_list) if x == line_no
-                ]
-                """
-                # new way
-                line_no_index_list = line_no_index_list_dict[line_no]
-
-                r_index_list = [index_list[i] for i in line_no_index_list]
-
-                r_new_mo_coeff_list = [w_mo_coeff_list[i] for i in line_no_index_list]
-
-                if len(r_index_list) != len(set(r_index_list)):
-                    logger.error("Duplicated r_index!! It should not happen.")
-                    raise ValueError
-                line = lines[line_no].split()
-
-                # old way (explicit for loop)
-                """
-                for r_index, r_new_mo_coeff in zip(
-                    r_index_list, r_new_mo_coeff_list
-                ):
-                    line[r_index] = r_new_mo_coeff
-                """
-                # new way (implicit for loop)
-                line = [
-                    r_new_mo_coeff_list[r_index_list.index(i)]
-                    if i in r_index_list
-                    else l
-                    for i, l in enumerate(line)
-                ]
-                lines[line_no] = " ".join(list(map(str, line))) + "\n"
-
-            # """
+    def replace_mo_coeff_pure_python(self, locator, new_mo_coefficient):
+        """
+        Replace MO coefficients in fort.10, in a single streaming pass over the file
+        (see pyreplace_values). At most self.memory_budget bytes of fort.10 are held
+        in memory at once. If a transaction of fort.10 is open, the edits are
+        recorded in it instead.
 
-            with open(self.fort10, "w") as f:
-                f.writelines(lines)
+        Args:
+            locator (np.ndarray): (line No., index) of the MO coefficients,
+                dimension (num, 2)
+            new_mo_coefficient (np.ndarray): new values of the MO coefficients
+        """
+        line_no_list = np.asarray(locator)[:, 0].tolist()
+        index_list = np.asarray(locator)[:, 1].tolist()
+        w_mo_coeff_list = np.asarray(new_mo_coefficient).tolist()
+        if len(line_no_list) != len(w_mo_coeff_list):
+            logger.error(
+                f"len(locator):{len(line_no_list)} != len(new_mo_coeff):{len(w_mo_coeff_list)}"
+            )
+            raise ValueError
 
+        transaction = F10transaction.get(self.fort10)
+        if transaction is not None:
+            for line_no, index, value in zip(line_no_list, index_list, w_mo_coeff_list):
+                transaction.record(line_no, index, value)
         else:
-            logger.debug("available memory < fort10 size")
-
-            # version with readline (less memory, but super slow!!)
-            sed_fort10 = self.fort10 + "_sed_tmp"
-            with open(self.fort10, "r") as f:
-                with open(sed_fort10, "w") as fw:
-                    line = f.readline()
-                    cnt = 0
-                    while line:
-                        if cnt % 1000 == 0:
-                            logger.debug(f"cnt={cnt}")
-                        line_no_index_list = [
-                            i for i, x in enumerate(line_no_list) if x == cnt
-                        ]
-                        r_index_list = [index_list[i] for i in line_no_index_list]
-                        r_new_mo_coeff_list = [
-                            w_mo_coeff_list[i] for i in line_no_index_list
-                        ]
-                        line = line.split()
-                        for r_index, r_new_mo_coeff in zip(
-                            r_index_list, r_new_mo_coeff_list
-                        ):
-                            line[r_index] = r_new_mo_coeff
-                        line = list(map(str, line))
-                        line = " ".join(line) + "\n"
-                        fw.write(line)
-                        line = f.readline()
-                        cnt += 1
-            os.remove(self.fort10)
-            shutil.copy(sed_fort10, self.fort10)
-            os.rename(sed_fort10, self.fort10)
+            start = time.time()
+            pyreplace_values(
+                file=self.fort10,
+                lineno=line_no_list,
+                index=index_list,
+                values=w_mo_coeff_list,
+                memory_budget=self.memory_budget,
+            )
+            end = time.time()
+            logger.debug(f"elapsed time for the replacement:{end - start:f}[sec]")
 
     @property
     def coefficient(self):
         self.read()
-        return [i.v for i in self.__coefficient]
+        params = self.__params.tolist()
+        return [
+            params[i] if i >= 0 else None for i in self.__coefficient_index.tolist()
+        ]
 
     @property
     def coefficient_imag(self):
         self.read()
-        return [i.v for i in self.__coefficient_imag]
+        return self.__params[self.__coefficient_imag_index].tolist()
 
     @property
     def exponent(self):
         self.read()
-        return [i.v for i in self.__exponent]
+        return self.__params[self.__exponent_index].tolist()
 
     @property
     def shell_multiplicity(self):
         self.read()
-        return [i.v for i in self.__shell_multiplicity]
+        return self.__shell[self.__shells(self.atomic_orbital), 0].tolist()
 
     @property
     def hyb_atom_label(self):
         self.read()
-        return [i.v for i in self.__hyb_atom_label]
+        return self.__shell[self.__shells(self.hybrid_orbital), 3].tolist()
 
     @property
     def hyb_param_num(self):
         self.read()
-        return [i.v for i in self.__hyb_param_num]
+        return self.__shell[self.__shells(self.hybrid_orbital), 1].tolist()
 
     @property
     def hyb_shell_multiplicity(self):
         self.read()
-        return [i.v for i in self.__hyb_shell_multiplicity]
+        return self.__shell[self.__shells(self.hybrid_orbital), 0].tolist()
 
     @property
     def hyb_shell_ang_mom_turbo_notation(self):
         self.read()
-        return [i.v for i in self.__hyb_shell_ang_mom_turbo_notation]
+        return self.__shell[self.__shells(self.hybrid_orbital), 2].tolist()
 
     @property
     def hyb_prim_index(self):
         self.read()
-        return [i.v for i in self.__hyb_prim_index]
+        return [
+            self.__params[i].astype(np.int64).tolist()
+            for i in self.__prim_indices(self.hybrid_orbital)
+        ]
 
     """ to be deleted
     @property
@@ -1908,16 +2728,8 @@ class F10detbasissets:
         return [i.v for i in self.__hyb_coefficient_imag]
     """
 
-    @property
-    def start_lineno(self):
-        return pygrep_lineno(self.fort10, self.start_keyword) + 1
-
-    @property
-    def end_lineno(self):
-        return pygrep_lineno(self.fort10, self.end_keyword) - 1
-
 
-class F10jasbasissets:
+class F10jasbasissets(F10section):
     def __init__(
         self,
         fort10: str,
@@ -1933,142 +2745,119 @@ class F10jasbasissets:
         self.shell_jas = shell_jas
         self.in_place = in_place
 
-        # Values()
-        self.__atom_label = []  # starting from 1!
-        self.__param_num = []
-        self.__shell_multiplicity = []
-        self.__shell_ang_mom_turbo_notation = []
-        self.__exponent = []
-        self.__coefficient = []
-
-        # auxiliary values
-        self.__shell_index = []
+        # np.arrays of all the shells in the order of fort.10
+        # multiplicity, param_num, ang. mom. (turbo notation), atom label (from 1!)
+        # dimension (shell, 4)
+        self.__shell = np.empty((0, 4), dtype=np.int32)
+        # (line No., index) of the shell values, dimension (shell, 4, 2)
+        self.__shell_locator = np.empty((0, 4, 2), dtype=np.int32)
+        # the parameters of all the shells one after another, i.e., those of the
+        # n-th shell are params[param_start[n] : param_start[n + 1]]
+        self.__params = np.empty(0, dtype=np.float64)
+        self.__param_start = np.zeros(1, dtype=np.int64)
+        # (line No., index) of the parameters, dimension (params, 2)
+        self.__param_locator = np.empty((0, 2), dtype=np.int32)
+
+        # auxiliary values: the indices of the exponents and the coefficients in
+        # params (-1: none, e.g., the coefficient of an uncontracted orbital),
+        # and the index of the shell of each exponent
+        self.__exponent_index = np.empty(0, dtype=np.int64)
+        self.__coefficient_index = np.empty(0, dtype=np.int64)
+        self.__shell_index = np.empty(0, dtype=np.int64)
 
     def read(self):
         if not self.read_flag:
-            # read jas basis sets, molecular orbitals, and hybrid orbitals
-            lines = [
-                pygetline(filename=self.fort10, lineno=lineno, clearcache=False)
-                for lineno in range(self.start_lineno, self.end_lineno + 1)
-            ]  # clearcache should be False, otherwise very slow
-            # a manual clearcache is better to avoid unexpected behavior
-            linecache.clearcache()
-            # print(lines)
-            lineno = self.start_lineno
-            p = []
-            for line in lines:
-                for i, value in enumerate(line.split()):
-                    p.append(
-                        Value(
-                            value=value,
-                            lineno=lineno,
-                            index=i,
-                            file=self.fort10,
-                        )
-                    )
-                lineno += 1
-
-            for num in range(abs(self.shell_jas)):
-                p[0].type(int)
-                multiplicity = p[0]
-                p[1].type(int)
-                param_num = p[1]
-                p[2].type(int)
-                shell_ang_mom_turbo_notation = p[2]
-                p[3].type(int)
-                atom_label = p[3]
-
-                shell_index = len(self.__shell_multiplicity)
-                self.__shell_multiplicity.append(multiplicity)
-                self.__param_num.append(param_num)
-                self.__shell_ang_mom_turbo_notation.append(shell_ang_mom_turbo_notation)
-                self.__atom_label.append(atom_label)
-
-                # logger.debug(f"multi= {multiplicity.v}")
-                # logger.debug(f"param_num = {param_num.v}")
-                # logger.debug(
-                #    f"orb_type_num = {shell_ang_mom_turbo_notation.v}"
-                # )
-                # logger.debug(f"atom_label = {atom_label.v}")
-
-                orb_type_chr = str(return_orb_type_chr(shell_ang_mom_turbo_notation.v))
+            # read jas basis sets
+            (
+                self.__shell,
+                self.__shell_locator,
+                self.__params,
+                self.__param_locator,
+                self.__param_start,
+            ) = split_shells(self, abs(self.shell_jas))
+
+            exponent_index = []
+            coefficient_index = []
+            shell_index = []
+            for s, code in enumerate(self.__shell[:, 2].tolist()):
+                start = int(self.__param_start[s])
+                orb_type_chr = str(return_orb_type_chr(code))
 
                 if orb_type_chr in {"s", "p", "d", "f", "g", "h", "i"}:
-                    contraction_flag = return_contraction_flag(
-                        shell_ang_mom_turbo_notation.v
-                    )
-
-                    if contraction_flag:
-                        num = int(param_num.v / 2)
-                        for n in p[4 : 4 + num]:
-                            n.type(float)
-                            self.__exponent.append(n)
-                            self.__shell_index.append(shell_index)
-                        for n in p[4 + num : 4 + param_num.v]:
-                            n.type(float)
-                            self.__coefficient.append(n)
+                    if return_contraction_flag(code):
+                        num = int(self.__shell[s, 1] / 2)
+                        exponent_index.append(np.arange(start, start + num))
+                        coefficient_index.append(
+                            np.arange(start + num, self.__param_start[s + 1])
+                        )
+                        shell_index.append(np.full(num, s))
 
                     else:
-                        p[4].type(float)
-                        self.__exponent.append(p[4])
-                        self.__shell_index.append(shell_index)
-                        self.__coefficient.append(Value())
+                        exponent_index.append(np.array([start]))
+                        coefficient_index.append(np.array([-1]))
+                        shell_index.append(np.array([s]))
 
                 elif orb_type_chr in {"jas_const"}:
-                    self.__shell_index.append(shell_index)
-                    self.__exponent.append(Value())
-                    self.__coefficient.append(Value())
+                    shell_index.append(np.array([s]))
+                    exponent_index.append(np.array([-1]))
+                    coefficient_index.append(np.array([-1]))
 
-                p = p[4 + param_num.v :]
+            empty = [np.empty(0, dtype=np.int64)]
+            self.__exponent_index = np.concatenate(empty + exponent_index)
+            self.__coefficient_index = np.concatenate(empty + coefficient_index)
+            self.__shell_index = np.concatenate(empty + shell_index)
 
             self.read_flag = True
 
-    def write(self):
-        raise NotImplementedError
+    def located_values(self) -> tuple:
+        if not self.read_flag:
+            return [], [], []
+        return (
+            self.__shell_locator[..., 0].ravel().tolist()
+            + self.__param_locator[:, 0].tolist(),
+            self.__shell_locator[..., 1].ravel().tolist()
+            + self.__param_locator[:, 1].tolist(),
+            self.__shell.ravel().tolist() + self.__params.tolist(),
+        )
+
+    def __get(self, index: np.ndarray) -> list:
+        params = self.__params.tolist()
+        return [params[i] if i >= 0 else None for i in index.tolist()]
 
     @property
     def jas_basis_sets(self):
         self.read()
         return Jas_Basis_sets(
-            nucleus_index=[a.v - 1 for a in self.__atom_label[:-1]],
-            shell_ang_mom=[int((a.v - 1) / 2) for a in self.__shell_multiplicity[:-1]],
-            shell_ang_mom_turbo_notation=[
-                a.v for a in self.__shell_ang_mom_turbo_notation[:-1]
-            ],
-            shell_factor=[1.0] * len(self.__atom_label[:-1]),
-            shell_index=[a for a in self.__shell_index[:-1]],
-            exponent=[a.v for a in self.__exponent[:-1]],
+            nucleus_index=(self.__shell[:-1, 3] - 1).tolist(),
+            shell_ang_mom=((self.__shell[:-1, 0] - 1) // 2).tolist(),
+            shell_ang_mom_turbo_notation=self.__shell[:-1, 2].tolist(),
+            shell_factor=[1.0] * len(self.__shell[:-1]),
+            shell_index=self.__shell_index[:-1].tolist(),
+            exponent=self.__get(self.__exponent_index[:-1]),
             coefficient=[
-                a.v if a.v is not None else 1.0 for a in self.__coefficient[:-1]
+                a if a is not None else 1.0
+                for a in self.__get(self.__coefficient_index[:-1])
             ],
-            prim_factor=[1.0] * len(self.__atom_label[:-1]),
+            prim_factor=[1.0] * len(self.__shell[:-1]),
         )
 
     @property
     def coefficient(self):
         self.read()
-        return [i.v for i in self.__coefficient]
+        return self.__get(self.__coefficient_index)
 
     @property
     def exponent(self):
         self.read()
-        return [i.v for i in self.__exponent]
+        return self.__get(self.__exponent_index)
 
     @property
     def shell_multiplicity(self):
         self.read()
-        return [i.v for i in self.__shell_multiplicity]
-
-    @property
-    def start_lineno(self):
-        return pygrep_lineno(self.fort10, self.start_keyword) + 1
-
-    @property
-    def end_lineno(self):
-        return pygrep_lineno(self.fort10, self.end_keyword) - 1
+        return self.__shell[:, 0].tolist()
 
 
-class F10occ:
+class F10occ(F10section):
     def __init__(
         self,
         fort10: str,
@@ -2090,13 +2879,7 @@ class F10occ:
     def read(self):
         if not self.read_flag:
             # read det basis sets, molecular orbitals, and hybrid orbitals
-            lines = [
-                pygetline(filename=self.fort10, lineno=lineno, clearcache=False)
-                for lineno in range(self.start_lineno, self.end_lineno + 1)
-            ]  # clearcache should be false, otherwise very slow.
-            # a manual clearcache is better to avoid
-            # unexpected behaviour of pygetline
-            linecache.clearcache()
+            lines = self.read_lines()
             # print(lines)
             # assert len(lines) == abs(np.sum(self.shell_multiplicity))
             lineno = self.start_lineno
@@ -2122,24 +2905,13 @@ class F10occ:
 
             self.read_flag = True
 
-    def write(self):
-        raise NotImplementedError
-
     @property
     def occ(self):
         self.read()
         return [i.v for i in self.__occupation]
 
-    @property
-    def start_lineno(self):
-        return pygrep_lineno(self.fort10, self.start_keyword) + 1
-
-    @property
-    def end_lineno(self):
-        return pygrep_lineno(self.fort10, self.end_keyword) - 1
-
 
-class F10detmat:
+class F10detmat(F10section):
     def __init__(
         self,
         fort10: str,
@@ -2157,131 +2929,150 @@ class F10detmat:
         self.detmat = detmat
         self.complex_flag = complex_flag
 
-        # Values()
-        self.__row = []
-        self.__col = []
-        self.__coeff_real = []
-        self.__coeff_imag = []  # to be implemented.
+        # np.arrays
+        self.__row = np.empty(0, dtype=np.int32)
+        self.__col = np.empty(0, dtype=np.int32)
+        self.__coeff_real = np.empty(0, dtype=np.float64)
+        self.__coeff_imag = np.empty(0, dtype=np.float64)
+        # (line No., index) of row, col, coeff_real (, coeff_imag)
+        # dimension (detmat, 3 or 4, 2)
+        self.__locator = np.empty((0, 4, 2), dtype=np.int32)
 
     def read(self):
         if not self.read_flag:
-            # read det basis sets, molecular orbitals, and hybrid orbitals
-            lines = [
-                pygetline(filename=self.fort10, lineno=lineno, clearcache=False)
-                for lineno in range(self.start_lineno, self.end_lineno + 1)
-            ]  # clearcache should be False otherwise very slow
-            # a manual clearcache is better to avoid
-            # unexpected behaviour of pygetline
-            linecache.clearcache()
-            lineno = self.start_lineno
-            p = []
-            for line in lines:
-                for i, value in enumerate(line.split()):
-                    p.append(
-                        Value(
-                            value=value,
-                            lineno=lineno,
-                            index=i,
-                            file=self.fort10,
-                        )
-                    )
-                lineno += 1
-
-            c_index = 0
-            for num in range(abs(self.detmat)):
-                p[c_index + 0].type(int)
-                row = p[c_index + 0]
-                p[c_index + 1].type(int)
-                col = p[c_index + 1]
-                p[c_index + 2].type(float)
-                coeff_real = p[c_index + 2]
-                if self.complex_flag:
-                    p[c_index + 3].type(float)
-                    coeff_imag = p[c_index + 3]
-
-                if not self.complex_flag:
-                    self.__row.append(row)
-                    self.__col.append(col)
-                    self.__coeff_real.append(coeff_real)
-                    c_index += 3
-                else:  # complex
-                    self.__row.append(row)
-                    self.__col.append(col)
-                    self.__coeff_real.append(coeff_real)
-                    self.__coeff_imag.append(coeff_imag)
-                    c_index += 4
+            num_column = 4 if self.complex_flag else 3
+            num = abs(self.detmat) * num_column
+            values, lineno, index = tokenize(self.read_bytes(), count=num)
+            if len(values) < num:
+                logger.error(f"{len(values)} values are found for {num} elements.")
+                raise ValueError
+            values = values[:num].reshape(-1, num_column)
+            self.__row = values[:, 0].astype(np.int32)
+            self.__col = values[:, 1].astype(np.int32)
+            self.__coeff_real = values[:, 2].copy()
+            if self.complex_flag:
+                self.__coeff_imag = values[:, 3].copy()
+            self.__locator = np.stack(
+                [lineno[:num] + self.start_lineno, index[:num]], axis=-1
+            ).reshape(-1, num_column, 2)
 
             self.read_flag = True
 
-    def write(self):
-        raise NotImplementedError
+    def located_values(self) -> tuple:
+        if not self.read_flag:
+            return [], [], []
+        columns = [self.__row, self.__col, self.__coeff_real]
+        if self.complex_flag:
+            columns.append(self.__coeff_imag)
+        values = [None] * (len(self.__row) * len(columns))
+        for n, column in enumerate(columns):
+            values[n :: len(columns)] = column.tolist()
+        return (
+            self.__locator[..., 0].ravel().tolist(),
+            self.__locator[..., 1].ravel().tolist(),
+            values,
+        )
+
+    def __replace(self, old, value_list, column):
+        new = np.array(value_list, dtype=old.dtype)
+        if new.shape != old.shape:
+            raise ValueError
+        if self.in_place:
+            changed = np.flatnonzero(new != old)
+            replace_values(
+                file=self.fort10,
+                lineno=self.__locator[changed, column, 0],
+                index=self.__locator[changed, column, 1],
+                values=new[changed],
+            )
+        return new
 
     @property
     def row(self):
         self.read()
-        return [i.v for i in self.__row]
+        return self.__row.copy()
 
     @row.setter
     def row(self, value_list):
         self.read()
-        if len(self.__row) != len(value_list):
-            raise ValueError
-        for row, value in zip(self.__row, value_list):
-            if row.v != value:
-                row.replace(value=value, in_place=self.in_place)
+        self.__row = self.__replace(self.__row, value_list, 0)
 
     @property
     def col(self):
         self.read()
-        return [i.v for i in self.__col]
+        return self.__col.copy()
 
     @col.setter
     def col(self, value_list):
         self.read()
-        if len(self.__col) != len(value_list):
-            raise ValueError
-        for col, value in zip(self.__col, value_list):
-            if col.v != value:
-                col.replace(value=value, in_place=self.in_place)
+        self.__col = self.__replace(self.__col, value_list, 1)
 
     @property
     def coeff_real(self):
         self.read()
-        return [i.v for i in self.__coeff_real]
+        return self.__coeff_real.copy()
 
     @coeff_real.setter
     def coeff_real(self, value_list):
         self.read()
-        if len(self.__coeff_real) != len(value_list):
-            raise ValueError
-        for coeff_real, value in zip(self.__coeff_real, value_list):
-            if coeff_real.v != value:
-                coeff_real.replace(value=value, in_place=self.in_place)
+        self.__coeff_real = self.__replace(self.__coeff_real, value_list, 2)
 
     @property
     def coeff_imag(self):
         self.read()
-        return [i.v for i in self.__coeff_imag]
+        return self.__coeff_imag.copy()
 
     @coeff_imag.setter
     def coeff_imag(self, value_list):
         self.read()
-        if len(self.__coeff_imag) != len(value_list):
-            raise ValueError
-        for coeff_imag, value in zip(self.__coeff_imag, value_list):
-            if coeff_imag.v != value:
-                coeff_imag.replace(value=value, in_place=self.in_place)
+        self.__coeff_imag = self.__replace(self.__coeff_imag, value_list, 3)
 
     @property
-    def start_lineno(self):
-        return pygrep_lineno(self.fort10, self.start_keyword) + 1
+    def locator(self):
+        self.read()
+        return self.__locator.copy()
 
-    @property
-    def end_lineno(self):
-        return pygrep_lineno(self.fort10, self.end_keyword) - 1
+    def to_sparse(self, shape: Optional[tuple] = None) -> coo_matrix:
+        """
+        Return detmat as a sparse matrix, as stored in fort.10 (no symmetrization)
+
+        Args:
+            shape (tuple): shape of the matrix. Default: (max(row), max(col))
+        Returns:
+            scipy.sparse.coo_matrix: detmat (complex if complex_flag)
+        """
+        self.read()
+        if self.complex_flag:
+            data = self.__coeff_real + 1j * self.__coeff_imag
+        else:
+            data = self.__coeff_real.copy()
+        if shape is None and len(data) > 0:
+            shape = (self.__row.max(), self.__col.max())
+        elif shape is None:
+            shape = (0, 0)
+        return coo_matrix((data, (self.__row - 1, self.__col - 1)), shape=shape)
+
+    def from_sparse(self, matrix) -> None:
+        """
+        Set the coefficients of detmat from a (sparse) matrix. Only the elements
+        already stored in fort.10 can be set, and the changed coefficients are
+        written at once.
+
+        Args:
+            matrix (scipy.sparse matrix or array_like): detmat
+        """
+        self.read()
+        values = sparse_pattern_values(matrix, self.__row, self.__col)
+        if not self.complex_flag and np.any(np.imag(values) != 0):
+            logger.error("A complex matrix is given for a real detmat.")
+            raise ValueError
+        with F10transaction.open(self.fort10):
+            self.coeff_real = np.real(values)
+            if self.complex_flag:
+                self.coeff_imag = np.imag(values)
 
 
-class F10jasmat:
+class F10jasmat(F10section):
     def __init__(
         self,
         fort10: str,
@@ -2297,104 +3088,128 @@ class F10jasmat:
         self.read_flag = False
         self.jasmat = jasmat
 
-        # Values()
-        self.__row = []
-        self.__col = []
-        self.__coeff = []
+        # np.arrays
+        self.__row = np.empty(0, dtype=np.int32)
+        self.__col = np.empty(0, dtype=np.int32)
+        self.__coeff = np.empty(0, dtype=np.float64)
+        # (line No., index) of row, col, and coeff, dimension (jasmat, 3, 2)
+        self.__locator = np.empty((0, 3, 2), dtype=np.int32)
 
     def read(self):
         if not self.read_flag:
-            # read det basis sets, molecular orbitals, and hybrid orbitals
-            lines = [
-                pygetline(filename=self.fort10, lineno=lineno, clearcache=False)
-                for lineno in range(self.start_lineno, self.end_lineno + 1)
-            ]  # clearcache should be false, otherwise very slow.
-            # a manual clearcache is better to avoid
-            # unexpected behaviour of pygetline
-            linecache.clearcache()
-            lineno = self.start_lineno
-            p = []
-            for line in lines:
-                for i, value in enumerate(line.split()):
-                    p.append(
-                        Value(
-                            value=value,
-                            lineno=lineno,
-                            index=i,
-                            file=self.fort10,
-                        )
-                    )
-                lineno += 1
-
-            c_index = 0
-            for num in range(abs(self.jasmat)):
-                p[c_index + 0].type(int)
-                row = p[c_index + 0]
-                p[c_index + 1].type(int)
-                col = p[c_index + 1]
-                p[c_index + 2].type(float)
-                coeff_real = p[c_index + 2]
-
-                self.__row.append(row)
-                self.__col.append(col)
-                self.__coeff.append(coeff_real)
-
-                c_index += 3
+            num = abs(self.jasmat) * 3
+            values, lineno, index = tokenize(self.read_bytes(), count=num)
+            if len(values) < num:
+                logger.error(f"{len(values)} values are found for {num} elements.")
+                raise ValueError
+            values = values[:num].reshape(-1, 3)
+            self.__row = values[:, 0].astype(np.int32)
+            self.__col = values[:, 1].astype(np.int32)
+            self.__coeff = values[:, 2].copy()
+            self.__locator = np.stack(
+                [lineno[:num] + self.start_lineno, index[:num]], axis=-1
+            ).reshape(-1, 3, 2)
 
             self.read_flag = True
 
-    def write(self):
-        raise NotImplementedError
+    def located_values(self) -> tuple:
+        if not self.read_flag:
+            return [], [], []
+        values = [None] * (len(self.__row) * 3)
+        for n, column in enumerate([self.__row, self.__col, self.__coeff]):
+            values[n::3] = column.tolist()
+        return (
+            self.__locator[..., 0].ravel().tolist(),
+            self.__locator[..., 1].ravel().tolist(),
+            values,
+        )
+
+    def __replace(self, old, value_list, column):
+        new = np.array(value_list, dtype=old.dtype)
+        if new.shape != old.shape:
+            raise ValueError
+        if self.in_place:
+            changed = np.flatnonzero(new != old)
+            replace_values(
+                file=self.fort10,
+                lineno=self.__locator[changed, column, 0],
+                index=self.__locator[changed, column, 1],
+                values=new[changed],
+            )
+        return new
 
     @property
     def row(self):
         self.read()
-        return [i.v for i in self.__row]
+        return self.__row.copy()
 
     @row.setter
     def row(self, value_list):
-        assert len(self.__row) == len(value_list)
         self.read()
-        for row, value in zip(self.__row, value_list):
-            if row.v != value:
-                row.replace(value=value, in_place=self.in_place)
+        self.__row = self.__replace(self.__row, value_list, 0)
 
     @property
     def col(self):
         self.read()
-        return [i.v for i in self.__col]
+        return self.__col.copy()
 
     @col.setter
     def col(self, value_list):
-        assert len(self.__col) == len(value_list)
         self.read()
-        for col, value in zip(self.__col, value_list):
-            if col.v != value:
-                col.replace(value=value, in_place=self.in_place)
+        self.__col = self.__replace(self.__col, value_list, 1)
 
     @property
     def coeff(self):
         self.read()
-        return [i.v for i in self.__coeff]
+        return self.__coeff.copy()
 
     @coeff.setter
     def coeff(self, value_list):
-        assert len(self.__coeff) == len(value_list)
         self.read()
-        for coeff, value in zip(self.__coeff, value_list):
-            if coeff.v != value:
-                coeff.replace(value=value, in_place=self.in_place)
+        self.__coeff = self.__replace(self.__coeff, value_list, 2)
 
     @property
-    def start_lineno(self):
-        return pygrep_lineno(self.fort10, self.start_keyword) + 1
+    def locator(self):
+        self.read()
+        return self.__locator.copy()
 
-    @property
-    def end_lineno(self):
-        return pygrep_lineno(self.fort10, self.end_keyword) - 1
+    def to_sparse(self, shape: Optional[tuple] = None) -> coo_matrix:
+        """
+        Return jasmat as a sparse matrix, as stored in fort.10 (no symmetrization)
+
+        Args:
+            shape (tuple): shape of the matrix. Default: (max(row), max(col))
+        Returns:
+            scipy.sparse.coo_matrix: jasmat
+        """
+        self.read()
+        if shape is None and len(self.__row) > 0:
+            shape = (self.__row.max(), self.__col.max())
+        elif shape is None:
+            shape = (0, 0)
+        return coo_matrix(
+            (self.__coeff.copy(), (self.__row - 1, self.__col - 1)), shape=shape
+        )
+
+    def from_sparse(self, matrix) -> None:
+        """
+        Set the coefficients of jasmat from a (sparse) matrix. Only the elements
+        already stored in fort.10 can be set, and the changed coefficients are
+        written at once.
+
+        Args:
+            matrix (scipy.sparse matrix or array_like): jasmat
+        """
+        self.read()
+        values = sparse_pattern_values(matrix, self.__row, self.__col)
+        if np.any(np.imag(values) != 0):
+            logger.error("A complex matrix is given for jasmat.")
+            raise ValueError
+        with F10transaction.open(self.fort10):
+            self.coeff = np.real(values)
 
 
-class F10matsymmetry:
+class F10matsymmetry(F10section):
     def __init__(
         self,
         fort10: str,
@@ -2423,13 +3238,7 @@ class F10matsymmetry:
             self.__row = []
             self.__column = []
 
-            lines = [
-                pygetline(filename=self.fort10, lineno=lineno, clearcache=False)
-                for lineno in range(self.start_lineno, self.end_lineno + 1)
-            ]  # clearcache should be false otherwise very slow.
-            # a manual clearcache is better to avoid
-            # unexpected behaviour of pygetline
-            linecache.clearcache()
+            lines = self.read_lines()
             lineno = self.start_lineno
             p = []
             for line in lines:
@@ -2463,8 +3272,46 @@ class F10matsymmetry:
 
             self.read_flag = True
 
-    def write(self):
-        raise NotImplementedError
+    def scatter(self, values) -> tuple:
+        """
+        Assign the parameters of the symmetry groups to their matrix elements.
+
+        Each value is assigned to all the (row, column) pairs of its group. In
+        the symmetry sections of fort.10, the sign is carried by the first
+        (row) index of a pair: a negative row means that the matrix element is
+        the opposite of the parameter of the group (as the negative atom labels
+        of the force constraints), while the second (column) index is always
+        positive. The groups with a negative number of pairs (i.e., fixed
+        parameters) are skipped.
+
+        Args:
+            values (array_like): one value per group (num_component values)
+        Returns:
+            tuple: (rows, columns, values) of the matrix elements, the indices
+            starting from 1
+        Raises:
+            ValueError: if a column index is negative (an unknown convention)
+        """
+        self.read()
+        values = np.asarray(values, dtype=float)
+        if values.shape != (self.num_component,):
+            logger.error(
+                f"{values.shape} values are given for {self.num_component} groups."
+            )
+            raise ValueError
+        constraint_num = np.array(self.constraint_num, dtype=int)
+        component = np.array(self.constraint_index, dtype=int)
+        row = np.array(self.row, dtype=int)
+        column = np.array(self.column, dtype=int)
+        if np.any(column < 0):
+            logger.error(
+                f"{self.start_keyword} has negative column indices, whose sign"
+                " convention is not supported."
+            )
+            raise ValueError
+        free = constraint_num[component] > 0
+        component, row, column = component[free], row[free], column[free]
+        return np.abs(row), column, values[component] * np.sign(row)
 
     @property
     def constraint_num(self):
@@ -2510,16 +3357,8 @@ class F10matsymmetry:
             if column.v != value:
                 column.replace(value=value, in_place=self.in_place)
 
-    @property
-    def start_lineno(self):
-        return pygrep_lineno(self.fort10, self.start_keyword) + 1
-
-    @property
-    def end_lineno(self):
-        return pygrep_lineno(self.fort10, self.end_keyword) - 1
-
 
-class F10basissymmetry:
+class F10basissymmetry(F10section):
     def __init__(
         self,
         fort10: str,
@@ -2546,13 +3385,7 @@ class F10basissymmetry:
             self.__constraint_index = []
             self.__basis_index = []
 
-            lines = [
-                pygetline(filename=self.fort10, lineno=lineno, clearcache=False)
-                for lineno in range(self.start_lineno, self.end_lineno + 1)
-            ]  # clear cache should be false otherwise very slow.
-            # a manual clearcache is better to avoid
-            # unexpected behaviour of pygetline
-            linecache.clearcache()
+            lines = self.read_lines()
             lineno = self.start_lineno
             p = []
             for line in lines:
@@ -2581,9 +3414,6 @@ class F10basissymmetry:
 
             self.read_flag = True
 
-    def write(self):
-        raise NotImplementedError
-
     @property
     def constraint_num(self):
         self.read()
@@ -2599,14 +3429,6 @@ class F10basissymmetry:
         self.read()
         return [i.v for i in self.__basis_index]
 
-    @property
-    def start_lineno(self):
-        return pygrep_lineno(self.fort10, self.start_keyword) + 1
-
-    @property
-    def end_lineno(self):
-        return pygrep_lineno(self.fort10, self.end_keyword) - 1
-
 
 if __name__ == "__main__":
     from logging import getLogger
@@ -0,0 +1,546 @@
+# python
+# -*- coding: utf-8 -*-
+"""
+pyturbo: io_fort12 related classes and methods
+"""
+
+# python modules
+import os
+import numpy as np
+from typing import Callable, Optional, Union
+
+# set logger
+from logging import getLogger, StreamHandler, Formatter
+
+# set logger
+logger = getLogger("pyturbo").getChild(__name__)
+
+
+def autocorrelation_time(series, c: float = 5.0) -> float:
+    """
+    Return the integrated autocorrelation time of a series, with the automatic
+    window of Sokal (the smallest window M such that M >= c * tau(M)).
+
+    Args:
+        series (array_like): the series (e.g., local energies)
+        c (float): the window parameter
+    Returns:
+        float: the integrated autocorrelation time, tau = 1 + 2 sum_t rho(t),
+        in units of the records. 1.0 for uncorrelated series.
+    """
+    x = np.asarray(series, dtype=float)
+    x = x - np.mean(x)
+    n = len(x)
+    if n < 2 or not np.any(x):
+        return 1.0
+    # autocorrelation function via FFT (zero-padded, i.e., not circular)
+    f = np.fft.rfft(x, n=2 * n)
+    acf = np.fft.irfft(f * np.conjugate(f), n=2 * n)[:n]
+    acf /= acf[0]
+    taus = 2.0 * np.cumsum(acf) - 1.0
+    window = np.arange(n) < c * taus
+    m = np.argmin(window) if not np.all(window) else n - 1
+    return float(max(taus[m], 1.0))
+
+
+def blocking_curve(series) -> tuple:
+    """
+    Return the Flyvbjerg-Petersen blocking curve of a series, i.e., the error
+    bars of its mean estimated from blocks of 1, 2, 4, ... records. The error
+    bars increase with the block size and level off once the blocks become
+    uncorrelated.
+
+    Args:
+        series (array_like): the series (e.g., local energies)
+    Returns:
+        tuple: (block sizes, error bars, error bars of the error bars)
+    """
+    x = np.asarray(series, dtype=float)
+    sizes = []
+    errors = []
+    errors_error = []
+    size = 1
+    while len(x) >= 2:
+        n = len(x)
+        error = np.sqrt(np.var(x) / (n - 1))
+        sizes.append(size)
+        errors.append(error)
+        errors_error.append(error / np.sqrt(2.0 * (n - 1)))
+        x = 0.5 * (x[0 : n - n % 2 : 2] + x[1 : n - n % 2 : 2])
+        size *= 2
+    return np.array(sizes), np.array(errors), np.array(errors_error)
+
+
+def mser(series, batch: int = 5) -> int:
+    """
+    Return the length of the initial transient of a series by the MSER
+    (marginal standard error rule) method: the truncation d minimizing
+    var(x[d:]) / (n - d), searched in the first half of the series.
+
+    Args:
+        series (array_like): the series (e.g., local energies)
+        batch (int): the series is averaged over batches of this size
+            beforehand (MSER-5 by default)
+    Returns:
+        int: the number of initial records to be disregarded
+    """
+    x = np.asarray(series, dtype=float)
+    n = len(x) // batch
+    if n < 2:
+        return 0
+    x = np.mean(x[: n * batch].reshape(n, batch), axis=1)
+    # sums over the tails x[d:], for all d at once
+    s1 = np.cumsum(x[::-1])[::-1]
+    s2 = np.cumsum(x[::-1] ** 2)[::-1]
+    length = np.arange(n, 0, -1)
+    variance = s2 / length - (s1 / length) ** 2
+    statistic = variance[: n // 2 + 1] / length[: n // 2 + 1]
+    return int(np.argmin(statistic)) * batch
+
+
+def _jackknife_error(jk_estimates) -> np.ndarray:
+    # error bar from the estimates without each bin
+    num_bins = len(jk_estimates)
+    deviations = jk_estimates - np.mean(jk_estimates, axis=0)
+    return np.sqrt((num_bins - 1) * np.mean(deviations**2, axis=0))
+
+
+def jackknife_bins(averages, bin_weights, estimator: Callable) -> tuple:
+    """
+    Return an estimate and its error bar by the jackknife method, from the
+    weighted averages over the bins (see IO_fort12.bin_averages)
+
+    Args:
+        averages (array_like): the (num_bins, num_columns) averages of the bins
+        bin_weights (array_like): the (num_bins,) total weights of the bins
+        estimator (Callable): function of the (..., num_columns) weighted
+            averages, e.g., lambda a: a[..., 1] - a[..., 0] ** 2
+    Returns:
+        tuple: (estimate, error bar, the estimates without each bin)
+    """
+    averages = np.asarray(averages, dtype=float)
+    bin_weights = np.asarray(bin_weights, dtype=float)
+    sums = averages * bin_weights[:, None]
+    total_weight = np.sum(bin_weights)
+    total = np.sum(sums, axis=0)
+    # the averages without each bin
+    jk_averages = (total[None, :] - sums) / (total_weight - bin_weights)[:, None]
+    jk_estimates = np.asarray(estimator(jk_averages))
+    estimate = estimator(total / total_weight)
+    return estimate, _jackknife_error(jk_estimates), jk_estimates
+
+
+class IO_fort12:
+    """
+
+    This class is a reader of fort.12, and a reblocking engine of its columns.
+
+    fort.12 is a Fortran unformatted sequential file, whose records (one per
+    measurement) are a fixed number of float64 values surrounded by 4-byte
+    record markers. The file is memory-mapped as a structured array, so that
+    only the columns needed by an estimate are read.
+
+    The estimates are averages over bins of consecutive records, weighted by
+    the weight column, and their error bars are computed by the jackknife
+    method over the bins. For LRDMC, the weight of a record can be corrected
+    by the product of the weights of the last (correct) records.
+
+    Attributes:
+         fort12 (str): File name (typically, fort.12)
+         weight_column (int): column of the weights
+         energy_column (int): column of the local energies
+         energy2_column (int): column of the squared local energies
+
+    """
+
+    # layout of the columns written by TurboRVB
+    weight_column = 0
+    energy_column = 1
+    energy2_column = 2
+
+    def __init__(self, fort12: str = "fort.12"):
+        self.fort12 = fort12
+        self.__stamp = None
+        self.__records = None
+
+    @property
+    def records(self) -> np.ndarray:
+        """
+        Return the records as a memory-mapped (num_records, num_columns) array
+        """
+        stat = os.stat(self.fort12)
+        stamp = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+        if stamp != self.__stamp:
+            self.__records = self.__map()
+            self.__stamp = stamp
+        return self.__records
+
+    def __map(self) -> np.ndarray:
+        size = os.path.getsize(self.fort12)
+        if size == 0:
+            return np.zeros((0, 0))
+        record_length = int(np.fromfile(self.fort12, dtype="<i4", count=1)[0])
+        if record_length <= 0 or record_length % 8 != 0:
+            logger.error(f"{self.fort12} is not a fort.12 file of float64 records.")
+            raise ValueError
+        num_columns = record_length // 8
+        dtype = np.dtype(
+            [("head", "<i4"), ("a", "<{}f8".format(num_columns)), ("tail", "<i4")]
+        )
+        # a record being written at the end of the file is disregarded
+        num_records = size // dtype.itemsize
+        if num_records == 0:
+            return np.zeros((0, num_columns))
+        mm = np.memmap(self.fort12, dtype=dtype, mode="r", shape=(num_records,))
+        # the markers of the first and the last records are checked
+        for marker in (mm["head"][[0, -1]], mm["tail"][[0, -1]]):
+            if np.any(marker != record_length):
+                logger.error(f"The records of {self.fort12} have different lengths.")
+                raise ValueError
+        return mm["a"]
+
+    @property
+    def num_records(self) -> int:
+        """
+        Return the number of records (measurements)
+        """
+        return self.records.shape[0]
+
+    @property
+    def num_columns(self) -> int:
+        """
+        Return the number of columns of each record
+        """
+        return self.records.shape[1]
+
+    def weights(self, correct: int = 1) -> np.ndarray:
+        """
+        Return the weights of the records.
+
+        Args:
+            correct (int): the number of the last records whose weights are
+                multiplied (the correcting factor of LRDMC). 1 -> no correction.
+        Returns:
+            np.ndarray: weights
+        """
+        weights = np.asarray(self.records[:, self.weight_column], dtype=float)
+        if correct <= 1:
+            return weights
+        # the products of the last (correct) weights, via the cumulative sums
+        # of their logarithms
+        log_sum = np.concatenate([[0.0], np.cumsum(np.log(weights))])
+        start = np.maximum(np.arange(1, len(weights) + 1) - correct, 0)
+        return np.exp(log_sum[1:] - log_sum[start])
+
+    def bin_averages(
+        self,
+        columns: Union[int, list],
+        bin: int = 10,
+        init: int = 10,
+        correct: int = 1,
+    ) -> tuple:
+        """
+        Return the weighted averages of columns over each bin
+
+        Args:
+            columns (int or list): column(s)
+            bin (int): the number of records in a bin
+            init (int): the number of initial records disregarded
+            correct (int): see weights()
+        Returns:
+            tuple: (averages, weights), the (num_bins, len(columns)) averages,
+            and the (num_bins,) total weights of the bins
+        """
+        columns = np.atleast_1d(columns)
+        if bin < 1 or init < 0:
+            logger.error(f"bin={bin} should be positive and init={init} non-negative.")
+            raise ValueError
+        num_bins = (self.num_records - init) // bin
+        if num_bins < 2:
+            logger.error(
+                f"{self.fort12} has {self.num_records} records, which are not"
+                f" enough for bin={bin} and init={init}."
+            )
+            raise ValueError
+        stop = init + num_bins * bin
+        weights = self.weights(correct=correct)[init:stop].reshape(num_bins, bin)
+        values = np.asarray(self.records[init:stop, columns], dtype=float)
+        values = values.reshape(num_bins, bin, len(columns))
+        bin_weights = np.sum(weights, axis=1)
+        averages = np.einsum("ij,ijk->ik", weights, values) / bin_weights[:, None]
+        return averages, bin_weights
+
+    def jackknife(
+        self,
+        estimator: Callable,
+        columns: Union[int, list],
+        bin: int = 10,
+        init: int = 10,
+        correct: int = 1,
+    ) -> tuple:
+        """
+        Return an estimate and its error bar by the jackknife method over the bins
+
+        Args:
+            estimator (Callable): function of the (..., len(columns)) weighted
+                averages of columns, e.g., lambda a: a[..., 1] - a[..., 0] ** 2
+            columns (int or list): column(s)
+            bin (int): the number of records in a bin
+            init (int): the number of initial records disregarded
+            correct (int): see weights()
+        Returns:
+            tuple: (estimate, error bar)
+        """
+        averages, bin_weights = self.bin_averages(
+            columns, bin=bin, init=init, correct=correct
+        )
+        estimate, error, _ = jackknife_bins(averages, bin_weights, estimator)
+        return estimate, error
+
+    def average(
+        self, column: int, bin: int = 10, init: int = 10, correct: int = 1
+    ) -> tuple:
+        """
+        Return the weighted average of a column and its error bar
+
+        Args:
+            column (int): column
+            bin (int): the number of records in a bin
+            init (int): the number of initial records disregarded
+            correct (int): see weights()
+        Returns:
+            tuple: (average, error bar)
+        """
+        average, error = self.jackknife(
+            lambda a: a[..., 0], column, bin=bin, init=init, correct=correct
+        )
+        return float(average), float(error)
+
+    def auto_binning(
+        self, column: Optional[int] = None, factor: float = 2.0, batch: int = 5
+    ) -> dict:
+        """
+        Choose the binning length and the warm-up from a column (the local
+        energies by default): the warm-up is detected by MSER (see mser()), and
+        the bins are made (factor) times longer than the integrated
+        autocorrelation time of the rest of the series, so that they are
+        nearly uncorrelated.
+
+        Args:
+            column (int): column, energy_column if None
+            factor (float): the binning length in units of the autocorrelation time
+            batch (int): see mser()
+        Returns:
+            dict: bin (binning length), init (the number of disregarded bins),
+            warmup (the number of disregarded records), and
+            autocorrelation_time (in units of the records)
+        """
+        if column is None:
+            column = self.energy_column
+        series = np.asarray(self.records[:, column], dtype=float)
+        warmup = mser(series, batch=batch)
+        tau = autocorrelation_time(series[warmup:])
+        bin = max(int(np.ceil(factor * tau)), 1)
+        init = int(np.ceil(warmup / bin))
+        if (self.num_records - init * bin) // bin < 2:
+            logger.warning(
+                f"{self.fort12} is too short for bin={bin} and init={init} (bins)."
+            )
+        logger.info(
+            f"autocorrelation time = {tau:.2f}, warm-up = {warmup} records"
+            f" -> bin = {bin}, init = {init} bins"
+        )
+        return {
+            "bin": bin,
+            "init": init,
+            "warmup": warmup,
+            "autocorrelation_time": tau,
+        }
+
+    def energy(self, bin: int = 10, init: int = 10, correct: int = 1) -> tuple:
+        """
+        Return the energy and its error bar
+
+        Args:
+            bin (int): the number of records in a bin
+            init (int): the number of initial records disregarded
+            correct (int): see weights()
+        Returns:
+            tuple: (energy, error bar)
+        """
+        return self.average(self.energy_column, bin=bin, init=init, correct=correct)
+
+    def variance(self, bin: int = 10, init: int = 10, correct: int = 1) -> tuple:
+        """
+        Return the variance of the local energy and its error bar
+
+        Args:
+            bin (int): the number of records in a bin
+            init (int): the number of initial records disregarded
+            correct (int): see weights()
+        Returns:
+            tuple: (variance, error bar)
+        """
+        variance, error = self.jackknife(
+            lambda a: a[..., 1] - a[..., 0] ** 2,
+            [self.energy_column, self.energy2_column],
+            bin=bin,
+            init=init,
+            correct=correct,
+        )
+        return float(variance), float(error)
+
+    def parameters(
+        self, first_column: int = 0, num_parameters: Optional[int] = None
+    ) -> np.ndarray:
+        """
+        Return the history of the variational parameters written in fort.12
+        by an optimization (one record per iteration), i.e., the data of
+        story.d made by readalles.x without its iteration column. The layout
+        can be checked against story.d with check_story().
+
+        Args:
+            first_column (int): the column of the first parameter
+            num_parameters (int): the number of parameters, all the columns
+                from first_column if None
+        Returns:
+            np.ndarray: memory-mapped (num_iterations, num_parameters) array
+        """
+        if num_parameters is None:
+            num_parameters = self.num_columns - first_column
+        if first_column < 0 or first_column + num_parameters > self.num_columns:
+            logger.error(
+                f"The columns {first_column}:{first_column + num_parameters} are"
+                f" out of the {self.num_columns} columns of {self.fort12}."
+            )
+            raise ValueError
+        return self.records[:, first_column : first_column + num_parameters]
+
+    def check_story(
+        self,
+        story: str = "story.d",
+        first_column: int = 0,
+        num_parameters: Optional[int] = None,
+        rtol: float = 1.0e-5,
+        atol: float = 1.0e-8,
+    ) -> None:
+        """
+        Check parameters() against story.d written by readalles.x with the
+        binning length 1, i.e., a line per iteration with the iteration
+        (starting from 1) followed by the parameters.
+
+        Args:
+            story (str): story.d
+            first_column (int): see parameters()
+            num_parameters (int): see parameters()
+            rtol (float): relative tolerance (story.d is formatted)
+            atol (float): absolute tolerance
+        Raises:
+            ValueError: if the columns or the values do not match
+        """
+        iterations, values = read_story(story)
+        iterations = iterations - 1
+        parameters = self.parameters(
+            first_column=first_column, num_parameters=num_parameters
+        )
+        if values.shape[1] != parameters.shape[1]:
+            logger.error(
+                f"{story} has {values.shape[1]} parameters, while {self.fort12}"
+                f" has {parameters.shape[1]} columns from {first_column}."
+            )
+            raise ValueError
+        if iterations.min() < 0 or iterations.max() >= parameters.shape[0]:
+            logger.error(
+                f"The iterations of {story} are out of the"
+                f" {parameters.shape[0]} iterations of {self.fort12}."
+            )
+            raise ValueError
+        expected = np.asarray(parameters[iterations], dtype=float)
+        mismatch = ~np.isclose(values, expected, rtol=rtol, atol=atol)
+        if np.any(mismatch):
+            row, column = np.argwhere(mismatch)[0]
+            logger.error(
+                f"The parameter {column + 1} of the iteration {iterations[row] + 1}"
+                f" is {values[row, column]} in {story}, but"
+                f" {expected[row, column]} in {self.fort12}."
+            )
+            raise ValueError
+
+    def average_parameters(
+        self,
+        start: int = 0,
+        stop: Optional[int] = None,
+        first_column: int = 0,
+        num_parameters: Optional[int] = None,
+    ) -> tuple:
+        """
+        Return the averages of the variational parameters over the iterations
+        start, ..., stop - 1 and their error bars (see parameters()).
+
+        Args:
+            start (int): the first iteration (starting from 0) averaged,
+                i.e., the number of disregarded iterations
+            stop (int): the iteration after the last one averaged,
+                the last iteration if None
+            first_column (int): see parameters()
+            num_parameters (int): see parameters()
+        Returns:
+            tuple: (averages, error bars), (num_parameters,) arrays
+        """
+        parameters = self.parameters(
+            first_column=first_column, num_parameters=num_parameters
+        )
+        window = np.asarray(parameters[start:stop], dtype=float)
+        num_iterations = window.shape[0]
+        if num_iterations < 1:
+            logger.error(
+                f"No iterations in the window {start}:{stop} of {self.fort12},"
+                f" which has {parameters.shape[0]} iterations."
+            )
+            raise ValueError
+        averages = np.mean(window, axis=0)
+        if num_iterations < 2:
+            return averages, np.zeros_like(averages)
+        errors = np.std(window, axis=0, ddof=1) / np.sqrt(num_iterations)
+        return averages, errors
+
+
+def read_story(story: str = "story.d") -> tuple:
+    """
+    Return the history of the variational parameters written in story.d by
+    readalles.x with the binning length 1, i.e., a line per iteration with the
+    iteration (starting from 1) followed by the parameters.
+
+    Args:
+        story (str): story.d
+    Returns:
+        tuple: (iterations, parameters), the (num_iterations,) iterations and
+        the (num_iterations, num_parameters) parameters
+    """
+    data = np.atleast_2d(np.loadtxt(story, dtype=float))
+    return data[:, 0].astype(int), data[:, 1:]
+
+
+def auto_binning_blocks(fort12: str = "fort.12") -> tuple:
+    """
+    Choose the binning length and the number of disregarded blocks from the
+    local energies in fort.12 (see IO_fort12.auto_binning), i.e., bin_block
+    and warmupblocks of VMC_genius and LRDMC_genius.
+
+    Args:
+        fort12 (str): fort.12 file
+    Returns:
+        tuple: (bin_block, warmupblocks)
+    """
+    binning = IO_fort12(fort12).auto_binning()
+    return binning["bin"], binning["init"]
+
+
+if __name__ == "__main__":
+    logger = getLogger("pyturbo")
+    logger.setLevel("DEBUG")
+    stream_handler = StreamHandler()
+    stream_handler.setLevel("DEBUG")
+    handler_format = Formatter("%(name)s - %(levelname)s - %(lineno)d - %(message)s")
+    stream_handler.setFormatter(handler_format)
+    logger.addHandler(stream_handler)
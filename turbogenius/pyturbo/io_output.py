@@ -0,0 +1,215 @@
+# python
+# -*- coding: utf-8 -*-
+"""
+pyturbo: io_output related classes and methods
+"""
+
+# python modules
+import os
+import re
+import time
+from typing import Iterator, Optional
+
+# set logger
+from logging import getLogger, StreamHandler, Formatter
+
+# set logger
+logger = getLogger("pyturbo").getChild(__name__)
+
+
+class IO_output:
+    """
+
+    This class is a parser of the standard outputs of TurboRVB
+    (e.g., out_min, out_vmc, out_fn).
+
+    All the lines of interest (see patterns) are extracted in a single pass over
+    the file, with a single compiled regular expression, and stored as their
+    whitespace-separated fields. The result is shared by all the instances
+    reading the same file. The byte offset of the parsed data is remembered, so
+    that only the data appended to a growing file (e.g., during an optimization)
+    are parsed at the next access.
+
+    Attributes:
+         output (str): File name (e.g., out_min)
+
+    """
+
+    # key -> regular expression of the lines
+    patterns = {
+        "energy": r"New.*Energy",
+        "devmax": r"devmax.*par.*Normal",
+        "time": r"Average.*time.*for.*1000.*generations",
+        "final": r"Final.*tstep.*found",
+        "profiling": r"TurboRVB.*profiling",
+    }
+    __regex = re.compile(
+        "|".join(f"(?P<{key}>{pattern})" for key, pattern in patterns.items())
+    )
+
+    # shared instances, {abspath: IO_output}
+    __instances = {}
+
+    def __init__(self, output: str):
+        self.output = output
+        self.__stamp = None
+        self.__reset()
+
+    def __reset(self) -> None:
+        self.__ino = None
+        self.__offset = 0  # bytes parsed, up to the end of the last complete line
+        self.__fields = {key: [] for key in self.patterns}
+        # fields of the last line, not terminated by a newline yet
+        self.__pending = {key: [] for key in self.patterns}
+
+    @classmethod
+    def get(cls, output: str) -> "IO_output":
+        """
+        Return the parser shared by all the instances reading output
+
+        Args:
+            output (str): File name (e.g., out_min)
+        Returns:
+            IO_output: the shared parser
+        """
+        key = os.path.abspath(output)
+        if key not in cls.__instances:
+            cls.__instances[key] = cls(output)
+        return cls.__instances[key]
+
+    def update(self) -> None:
+        """
+        Parse the data appended to the file since the last parse. The file is
+        parsed again from the beginning if it has been replaced or truncated.
+        """
+        stat = os.stat(self.output)
+        stamp = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+        if stamp == self.__stamp:
+            return
+        if stat.st_ino != self.__ino or stat.st_size < self.__offset:
+            self.__reset()
+            self.__ino = stat.st_ino
+        self.__parse()
+        self.__stamp = stamp
+
+    def __parse(self) -> None:
+        with open(self.output, "rb") as f:
+            f.seek(self.__offset)
+            data = f.read()
+        stop = data.rfind(b"\n") + 1
+        self.__offset += stop
+        self.__parse_lines(data[:stop], self.__fields)
+        self.__pending = {key: [] for key in self.patterns}
+        self.__parse_lines(data[stop:], self.__pending)
+
+    def __parse_lines(self, data: bytes, fields: dict) -> None:
+        regex = self.__regex
+        for line in data.decode(errors="replace").splitlines():
+            match = regex.search(line)
+            if match is not None:
+                fields[match.lastgroup].append(line.split())
+
+    def fields(self, key: str) -> list:
+        """
+        Return the whitespace-separated fields of the lines matching a pattern
+
+        Args:
+            key (str): key of patterns (e.g., "energy")
+        Returns:
+            list: the fields of each line, in the order of the file
+        """
+        self.update()
+        return self.__fields[key] + self.__pending[key]
+
+    def found(self, key: str) -> bool:
+        """
+        Return True if a line matches a pattern
+
+        Args:
+            key (str): key of patterns (e.g., "final")
+        Returns:
+            bool: True if found
+        """
+        return len(self.fields(key)) > 0
+
+    def records(self, start: int = 0) -> list:
+        """
+        Return the optimization records (iteration, energy, error, devmax), i.e.,
+        the k-th energy line paired with the k-th devmax line, for the iterations
+        completed so far.
+
+        Args:
+            start (int): the first iteration (starting from 0) returned
+        Returns:
+            list: [(iteration, energy, error, devmax), ...]
+        """
+        # only the complete lines
+        self.update()
+        energies = self.__fields["energy"]
+        devmaxes = self.__fields["devmax"]
+        return [
+            (i, float(energies[i][3]), float(energies[i][4]), float(devmaxes[i][4]))
+            for i in range(start, min(len(energies), len(devmaxes)))
+        ]
+
+    def follow(
+        self,
+        interval: float = 10.0,
+        timeout: Optional[float] = None,
+        end_keys: tuple = ("final", "profiling"),
+    ) -> Iterator[tuple]:
+        """
+        Yield the optimization records (see records) as they are appended to
+        the file, polling it every interval seconds. Only the appended data are
+        parsed at each poll.
+
+        Args:
+            interval (float): polling interval (sec.)
+            timeout (float): stop after timeout seconds without new records.
+                None -> no limit.
+            end_keys (tuple): stop once a line matching one of these patterns
+                (the completion markers) is found
+        Yields:
+            tuple: (iteration, energy, error, devmax)
+        """
+        start = 0
+        last = time.monotonic()
+        while True:
+            if os.path.isfile(self.output):
+                records = self.records(start=start)
+                yield from records
+                start += len(records)
+                if len(records) > 0:
+                    last = time.monotonic()
+                if any(self.found(key) for key in end_keys):
+                    return
+            if timeout is not None and time.monotonic() - last > timeout:
+                return
+            time.sleep(interval)
+
+
+def output_fields(output_names: list, key: str) -> list:
+    """
+    Return the fields of the lines matching a pattern of IO_output, in the
+    outputs concatenated in order.
+
+    Args:
+        output_names (list): a list of output file names
+        key (str): key of IO_output.patterns (e.g., "energy")
+    Returns:
+        list: the fields of each line
+    """
+    fields = []
+    for output_name in output_names:
+        fields += IO_output.get(output_name).fields(key)
+    return fields
+
+
+if __name__ == "__main__":
+    logger = getLogger("pyturbo")
+    logger.setLevel("DEBUG")
+    stream_handler = StreamHandler()
+    stream_handler.setLevel("DEBUG")
+    handler_format = Formatter("%(name)s - %(levelname)s - %(lineno)d - %(message)s")
+    stream_handler.setFormatter(handler_format)
+    logger.addHandler(stream_handler)
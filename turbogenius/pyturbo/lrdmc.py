@@ -19,7 +19,9 @@ from logging import getLogger, StreamHandler, Formatter
 # turbo-genius modules
 from turbogenius.pyturbo.namelist import Namelist
 from turbogenius.pyturbo.fortranIO import FortranIO
-from turbogenius.pyturbo.io_fort10 import IO_fort10
+from turbogenius.pyturbo.io_fort10 import IO_fort10, probe_fort10
+from turbogenius.pyturbo.io_fort12 import IO_fort12
+from turbogenius.pyturbo.io_output import IO_output, output_fields
 from turbogenius.pyturbo.utils.env import (
     turbo_qmc_run_command,
     turbo_forcefn_run_command,
@@ -34,6 +36,7 @@ from turbogenius.pyturbo.utils.utility import (
     remove_file,
 )
 from turbogenius.pyturbo.utils.execute import run
+from turbogenius.pyturbo.utils.watcher import Watcher, run_watched
 
 logger = getLogger("pyturbo").getChild(__name__)
 
@@ -53,7 +56,7 @@ class LRDMC(FortranIO):
         """
         file_check(in_fort10)
         logger.debug("start reading fort.10")
-        if IO_fort10(fort10=in_fort10).pp_flag:
+        if probe_fort10(in_fort10)["pp_flag"]:
             file_check("pseudo.dat")
         logger.debug("end reading fort.10")
         self.in_fort10 = in_fort10
@@ -135,13 +138,29 @@ class LRDMC(FortranIO):
                 f.writelines(lines)
         logger.info(f"{input_name} has been generated.")
 
-    def run(self, input_name="datasfn.input", output_name="out_fn"):
+    def run(
+        self,
+        input_name: str = "datasfn.input",
+        output_name: str = "out_fn",
+        watcher: Optional[Watcher] = None,
+    ):
+        """
+        Run the command.
+
+        Args:
+            input_name (str): input file name
+            output_name (str): output file name
+            watcher (Watcher): if given, it follows the job while it runs,
+                and stops it via stop.dat once converged
+                (e.g., TargetErrorWatcher).
+        """
         remove_file(file="pip0_fn.d")
         remove_file(file="forces_fn.dat")
-        run(
+        run_watched(
             turbo_qmc_run_command,
             input_name=input_name,
             output_name=output_name,
+            watcher=watcher,
         )
 
     def check_results(self, output_names: Optional[list] = None):
@@ -150,33 +169,16 @@ class LRDMC(FortranIO):
         flags = []
         for output_name in output_names:
             file_check(output_name)
-            with open(output_name, "r") as f:
-                lines = f.readlines()
-            if any([re.match(r".*TurboRVB.*profiling.*", line) for line in lines]):
-                flags.append(True)
-            else:
-                flags.append(False)
+            flags.append(IO_output.get(output_name).found("profiling"))
         return flags
 
     def get_estimated_time_for_1_generation(self, output_names: Optional[list] = None):
         if output_names is None:
             output_names = ["out_fn"]
 
-        out_min = []
-        for output_name in output_names:
-            with open(output_name, "r") as f:
-                out_min += f.readlines()
-
-        ave_time_1000_generations = list(
-            map(
-                float,
-                [
-                    i.split()[5]
-                    for i in out_min
-                    if re.match(r".*Average.*time.*for.*1000.*generations.*", i)
-                ],
-            )
-        )
+        ave_time_1000_generations = [
+            float(i[5]) for i in output_fields(output_names, "time")
+        ]
         ave_time_1_generation = np.mean(np.array(ave_time_1000_generations)) / 1000
 
         return ave_time_1_generation  # sec.
@@ -188,7 +190,15 @@ class LRDMC(FortranIO):
         bin: int = 10,
         num_proc: int = -1,
         rerun: bool = False,
+        native: bool = False,
     ):
+        if native:
+            energy, error, _, _ = self.compute_energy_and_forces(
+                init=init, correct=correct, bin=bin, native=True
+            )
+            logger.debug("energy={}, error={}".format(energy, error))
+            return energy, error
+
         force_compute_flag = False
         if rerun:
             force_compute_flag = True
@@ -262,64 +272,40 @@ class LRDMC(FortranIO):
         with open(force_file, "r") as f:
             force_dat = f.readlines()
 
-        # force constant matrix
-        force_matrix = np.zeros((fort10.f10header.natom, 3))
-        force_matrix_error_bar = np.zeros((fort10.f10header.natom, 3))
-
         logger.info(
             f"The number of calculated forces = {fort10.f10forceconstraint.ieskinr}"
         )
 
-        for num_force in range(fort10.f10forceconstraint.ieskinr):
-            constraint_num = fort10.f10forceconstraint.constraint_num[num_force]
-
-            # reading force from force_fn.dat
-            if self.twist_average:  # with k point
-                force_element = float(force_dat[num_force].split()[5])
-                force_element_error_bar = float(force_dat[num_force].split()[7])
-            else:  # gamma point
-                # since the number of intervals depends on compiler...
-                start_index = force_dat.index(
-                    [s for s in force_dat if re.match(".*Force component.*", s)][0]
-                )
-                end_index = force_dat.index(
-                    [s for s in force_dat if re.match(".*<OH>.*-.*<O><H>.*", s)][0]
-                )
-                interval = end_index - start_index + 1
-
-                force_element = float(force_dat[1 + interval * num_force].split()[2])
-                force_element_error_bar = float(
-                    force_dat[1 + interval * num_force].split()[3]
-                )
-
-            # multiplied according to the symmetry
-            # note! They are "correlated", we shoulud divide the error bar by force_constraints_d["num_constraints"]
-            # not by sqrt(force_constraints_d["num_constraints"])... Right?
-            force_element = force_element / constraint_num
-            force_element_error_bar = force_element_error_bar / constraint_num
-
-            # add the result to force_matrix
-            # check if the selected sym element list includes minus signs.
-            nindex_list = [
-                i
-                for i, x in enumerate(fort10.f10forceconstraint.constraint_index)
-                if x == num_force
-            ]
-
-            for nindex in nindex_list:
-                atom_label = fort10.f10forceconstraint.atom_label[nindex]
-                direction = fort10.f10forceconstraint.direction[nindex]
-
-                # caution!! force_element can be opposite? No, no. it is correct.
-                if atom_label < 0:
-                    force_element = -1 * force_element
-                else:
-                    pass
-
-                force_matrix[np.abs(atom_label) - 1, direction - 1] = force_element
-                force_matrix_error_bar[
-                    np.abs(atom_label) - 1, direction - 1
-                ] = force_element_error_bar
+        # reading all the force components from forces_fn.dat at once
+        ieskinr = fort10.f10forceconstraint.ieskinr
+        if self.twist_average:  # with k point
+            rows = force_dat
+            columns = [5, 7]
+        else:  # gamma point
+            # since the number of intervals depends on compiler...
+            start_index = force_dat.index(
+                [s for s in force_dat if re.match(".*Force component.*", s)][0]
+            )
+            end_index = force_dat.index(
+                [s for s in force_dat if re.match(".*<OH>.*-.*<O><H>.*", s)][0]
+            )
+            interval = end_index - start_index + 1
+            rows = force_dat[1::interval]
+            columns = [2, 3]
+        forces = np.array(
+            [[float(row.split()[c]) for c in columns] for row in rows[:ieskinr]]
+        ).reshape(ieskinr, 2)
+
+        # multiplied according to the symmetry
+        # note! They are "correlated", we shoulud divide the error bar by force_constraints_d["num_constraints"]
+        # not by sqrt(force_constraints_d["num_constraints"])... Right?
+        # the sign of a component is flipped for the atoms with negative labels.
+        force_matrix = fort10.f10forceconstraint.force_matrix(
+            forces[:, 0], natom=fort10.f10header.natom
+        )
+        force_matrix_error_bar = fort10.f10forceconstraint.force_matrix(
+            forces[:, 1], natom=fort10.f10header.natom, signed=False
+        )
 
         # unit (Ha/au)
         return force_matrix, force_matrix_error_bar
@@ -331,7 +317,25 @@ class LRDMC(FortranIO):
         bin: int = 10,
         pulay: int = 1,
         num_proc: int = -1,
+        native: bool = False,
     ):
+        if native:
+            # reblocking fort.12 without the external binaries. The energy
+            # and the variance are returned, while the forces (and
+            # pip0_fn.d) are left to forcefn.sh.
+            if self.twist_average:
+                logger.error("native=True is not supported with twist_average.")
+                raise NotImplementedError
+            # init is the number of disregarded bins
+            io_fort12 = IO_fort12("fort.12")
+            energy, error = io_fort12.energy(
+                bin=bin, init=init * bin, correct=correct
+            )
+            variance, variance_error = io_fort12.variance(
+                bin=bin, init=init * bin, correct=correct
+            )
+            return energy, error, variance, variance_error
+
         if self.twist_average:
             if num_proc == -1:
                 logger.warning(
@@ -16,7 +16,6 @@ Todo:
 # python modules
 import os
 import shutil
-import re
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
@@ -26,18 +25,21 @@ from typing import Optional
 # turbo-genius modules
 from turbogenius.pyturbo.namelist import Namelist
 from turbogenius.pyturbo.fortranIO import FortranIO
-from turbogenius.pyturbo.io_fort10 import IO_fort10
+from turbogenius.pyturbo.io_fort10 import IO_fort10, probe_fort10
+from turbogenius.pyturbo.io_output import IO_output, output_fields
 from turbogenius.pyturbo.utils.env import pyturbo_data_dir, turborvb_bin_root
 from turbogenius.pyturbo.utils.env import turbo_qmc_run_command
 from turbogenius.pyturbo.utils.utility import (
     file_check,
     file_check_flag,
-    remove_file,
 )
 from turbogenius.pyturbo.utils.utility import (
     remove_new_parameter_lines_in_fort10,
+    read_parameters_history,
 )
 from turbogenius.pyturbo.utils.execute import run
+from turbogenius.pyturbo.utils.watcher import Watcher, run_watched
+from turbogenius.pyturbo.utils.plotter import plot_parameters_pages
 
 # Logger
 from logging import getLogger, StreamHandler, Formatter
@@ -60,7 +62,7 @@ class LRDMCopt(FortranIO):
         input values
         """
         file_check(in_fort10)
-        if IO_fort10(fort10=in_fort10).pp_flag:
+        if probe_fort10(in_fort10)["pp_flag"]:
             file_check("pseudo.dat")
 
         self.in_fort10 = in_fort10
@@ -86,13 +88,24 @@ class LRDMCopt(FortranIO):
         self,
         input_name: str = "datasfn_opt.input",
         output_name: str = "out_fn_opt",
+        watcher: Optional[Watcher] = None,
     ):
-        run(
+        """
+        Run the command.
+
+        Args:
+            input_name (str): input file name
+            output_name (str): output file name
+            watcher (Watcher): if given, it follows output_name while the job
+                runs, and stops the job via stop.dat once converged
+                (e.g., ConvergenceWatcher).
+        """
+        run_watched(
             turbo_qmc_run_command,
             input_name=input_name,
             output_name=output_name,
+            watcher=watcher,
         )
-        remove_file(file="stop.dat")
 
     def check_results(self, output_names: Optional[list] = None):
         if output_names is None:
@@ -100,15 +113,7 @@ class LRDMCopt(FortranIO):
         flags = []
         for output_name in output_names:
             file_check(output_name)
-            with open(output_name, "r") as f:
-                lines = f.readlines()
-            if any(
-                [re.match(r".*TurboRVB.*profiling.*", line) for line in lines]
-            ):
-                flags.append(True)
-            else:
-                flags.append(False)
-
+            flags.append(IO_output.get(output_name).found("profiling"))
         return flags
 
     def plot_energy_and_devmax(
@@ -119,31 +124,16 @@ class LRDMCopt(FortranIO):
 
         # plot the energies and devmax
         logger.info("Plotting the energies and devmax")
-        out_min = []
-        for output_name in output_names:
-            with open(output_name, "r") as f:
-                out_min += f.readlines()
-
         col = ["dum1", "dum2", "dum3", "Energy", "error"]
-        energy_list = list(
-            map(
-                lambda x: x.split(),
-                [i for i in out_min if re.match(r".*New.*Energy.*", i)],
-            )
-        )
+        energy_list = [
+            i[: len(col)] for i in output_fields(output_names, "energy")
+        ]
         energy_pandas_str = pd.DataFrame(energy_list, columns=col)
 
         col = ["dum1", "dum2", "dum3", "dum4", "devmax", "num", "num2"]
-        devmax_list = list(
-            map(
-                lambda x: x.split(),
-                [
-                    i
-                    for i in out_min
-                    if re.match(r".*devmax.*par.*Normal.*", i)
-                ],
-            )
-        )
+        devmax_list = [
+            i[: len(col)] for i in output_fields(output_names, "devmax")
+        ]
         devmax_pandas_str = pd.DataFrame(devmax_list, columns=col)
 
         plt.rcParams["font.family"] = "sans-serif"
@@ -208,52 +198,19 @@ class LRDMCopt(FortranIO):
         if output_names is None:
             output_names = ["out_fn_opt"]
 
-        out_min = []
-        for output_name in output_names:
-            with open(output_name, "r") as f:
-                out_min += f.readlines()
-
-        energy_list = list(
-            map(
-                float,
-                [
-                    i.split()[3]
-                    for i in out_min
-                    if re.match(r".*New.*Energy.*", i)
-                ],
-            )
-        )
-        error_list = list(
-            map(
-                float,
-                [
-                    i.split()[4]
-                    for i in out_min
-                    if re.match(r".*New.*Energy.*", i)
-                ],
-            )
-        )
+        energy_fields = output_fields(output_names, "energy")
+        energy_list = [float(i[3]) for i in energy_fields]
+        error_list = [float(i[4]) for i in energy_fields]
 
         return energy_list, error_list
 
     def get_devmax(self, output_names: Optional[list] = None):
         if output_names is None:
             output_names = ["out_fn_opt"]
-        out_min = []
-        for output_name in output_names:
-            with open(output_name, "r") as f:
-                out_min += f.readlines()
-
-        devmax_list = list(
-            map(
-                float,
-                [
-                    i.split()[4]
-                    for i in out_min
-                    if re.match(r".*devmax.*par.*Normal.*", i)
-                ],
-            )
-        )
+
+        devmax_list = [
+            float(i[4]) for i in output_fields(output_names, "devmax")
+        ]
 
         return devmax_list
 
@@ -263,34 +220,121 @@ class LRDMCopt(FortranIO):
         if output_names is None:
             output_names = ["out_fn_opt"]
 
-        out_min = []
-        for output_name in output_names:
-            with open(output_name, "r") as f:
-                out_min += f.readlines()
-
-        ave_time_1000_generations = list(
-            map(
-                float,
-                [
-                    i.split()[5]
-                    for i in out_min
-                    if re.match(
-                        r".*Average.*time.*for.*1000.*generations.*", i
-                    )
-                ],
-            )
-        )
+        ave_time_1000_generations = [
+            float(i[5]) for i in output_fields(output_names, "time")
+        ]
         ave_time_1_generation = (
             np.mean(np.array(ave_time_1000_generations)) / 1000
         )
 
         return ave_time_1_generation  # sec.
 
+    def plot_parameters_history(
+        self,
+        interactive: bool = True,
+        mode: str = "single",
+        workers: int = 1,
+        fmt: str = "png",
+        per_page: int = 36,
+        max_points: Optional[int] = 2000,
+        native: bool = False,
+    ):
+        """
+        Plot the history of the optimized variational parameters.
+
+        Args:
+            interactive (bool): flag for an interactive plot (mode="single")
+            mode (str): "single" (a figure per parameter) or "pages"
+                (per_page parameters per page, rendered in parallel,
+                see plot_parameters_pages)
+            workers (int): the number of processes (mode="pages")
+            fmt (str): "png" or "pdf" (mode="pages")
+            per_page (int): the number of parameters per page (mode="pages")
+            max_points (int): decimation of the histories (mode="pages")
+            native (bool): if True, the history is taken from fort.12
+        """
+        current_dir = os.getcwd()
+        if mode == "pages":
+            story = None
+            if not native:
+                story = "all_story.d"
+                read_parameters_history(story=story)
+            plot_parameters_pages(
+                fort12="fort.12",
+                story=story,
+                graph_save_dir=os.path.join(current_dir, "parameters_graphs"),
+                per_page=per_page,
+                workers=workers,
+                fmt=fmt,
+                max_points=max_points,
+            )
+            return
+        if mode != "single":
+            logger.error(f"mode={mode} is not supported. Use single or pages.")
+            raise ValueError
+        # save parameters
+        iterations, parameters = read_parameters_history(native=native)
+
+        graph_save_dir = os.path.join(current_dir, "parameters_graphs")
+        os.makedirs(graph_save_dir, exist_ok=True)
+
+        if interactive:
+            logger.info(
+                "How to stop to show the graphs, please type ctrl+C,"
+                " then close the currently shown graph."
+            )
+
+        for i in range(1, parameters.shape[1] + 1):
+            plt.rcParams["font.family"] = "sans-serif"
+            plt.rcParams["xtick.direction"] = "in"
+            plt.rcParams["ytick.direction"] = "in"
+            plt.rcParams["xtick.major.width"] = 1.0
+            plt.rcParams["ytick.major.width"] = 1.0
+            plt.rcParams["font.size"] = 12
+            plt.rcParams["axes.linewidth"] = 1.5
+            plt.figure(figsize=(10, 8))
+            plt.plot(
+                iterations,
+                parameters[:, i - 1],
+                color="black",
+                marker="o",
+                linestyle="dashed",
+                label="all",
+            )
+            plt.xlabel("Iteration", fontname="Times New Roman", fontsize=14)
+            plt.ylabel("Value", fontname="Times New Roman", fontsize=14)
+            # plt.legend(frameon=True)
+            plt.title("Parameter_No.{}".format(i))
+            plt.legend(frameon=True)
+            plt.gca().get_yaxis().get_major_formatter().set_useOffset(
+                False
+            )  # No offset for y-axis
+            plt.gca().get_xaxis().set_major_locator(
+                ticker.MaxNLocator(integer=True)
+            )  # Interger for x-axis
+            if interactive:
+                try:
+                    plt.waitforbuttonpress()
+                except KeyboardInterrupt:
+                    logger.info("KeyboardInterrupt")
+                    break
+            plt.savefig(
+                os.path.join(
+                    graph_save_dir, "Parameter_No{}_all.png".format(i)
+                ),
+                bbox_inches="tight",
+                pad_inches=0.2,
+            )
+            plt.close()
+
     def average_optimized_parameters(
         self,
         equil_steps: int = 10,
         input_file_used: str = "datasfnopt.input",
         graph_plot: bool = False,
+        native: bool = False,
+        graph_mode: str = "single",
+        workers: int = 1,
     ):
         if self.twist_average:
             raise NotImplementedError
@@ -307,59 +351,73 @@ class LRDMCopt(FortranIO):
 
         # remove previous parameters before average.
         logger.info("Removing previous averaged parameters")
-        remove_new_parameter_lines_in_fort10()  # workaround!! to be refactored in the near future.
-
-        # save parameters
-        if graph_plot:
-            cmd = f"(echo '1 1 0 0'; echo '0'; echo '100000') | {os.path.join(turborvb_bin_root, 'readalles.x')}"
-            run(binary=cmd, output_name="out_readalles_for_plot_all")
-            shutil.copyfile("./story.d", "./all_story.d")
-            all_story_pandas_data = pd.read_csv(
-                "./all_story.d",
-                header=None,
-                delim_whitespace=True,
-                index_col=False,
-            )
+        remove_new_parameter_lines_in_fort10(fort10="fort.10")
+
+        # the parameters which cannot be averaged in Python (see
+        # IO_fort10.check_group_parameters) are left to turborvb-serial.x
+        if native:
+            try:
+                IO_fort10("fort.10").check_group_parameters(
+                    fort12="fort.12", input_name=input_file_used
+                )
+            except (NotImplementedError, ValueError):
+                logger.warning(
+                    "The parameters are averaged by readalles.x and"
+                    " turborvb-serial.x instead."
+                )
+                native = False
 
         # average and show the result
-        logger.info("Averaging parameters using readalles.x")
-        logger.info(
-            f"The first {equil_steps} iterations are disregarded in the average."
-        )
-        cmd = f"(echo '1 {equil_steps + 1} 1 0'; echo '0'; echo '100000') | {os.path.join(turborvb_bin_root, 'readalles.x')}"
-        run(binary=cmd, output_name="out_readalles_for_average")
-
-        if graph_plot:
-            shutil.copyfile("./story.d", "./average_story.d")
-            ave_story_pandas_data = pd.read_csv(
-                "./average_story.d",
-                header=None,
-                delim_whitespace=True,
-                index_col=False,
+        if not native:
+            logger.info("Averaging parameters using readalles.x")
+            logger.info(
+                f"The first {equil_steps} iterations are disregarded"
+                " in the average."
+            )
+            cmd = f"(echo '1 {equil_steps + 1} 1 0'; echo '0'; echo '100000') | {os.path.join(turborvb_bin_root, 'readalles.x')}"
+            run(binary=cmd, output_name="out_readalles_for_average")
+
+        if graph_plot and graph_mode == "pages":
+            story = None
+            if not native:
+                story = "all_story.d"
+                read_parameters_history(story=story)
+            plot_parameters_pages(
+                fort12="fort.12",
+                story=story,
+                graph_save_dir=os.path.join(current_dir, "parameters_graphs"),
+                workers=workers,
+                start=equil_steps,
+            )
+        elif graph_plot:
+            iterations, parameters = read_parameters_history(native=native)
+            window = iterations > equil_steps
+            averages = np.mean(
+                np.asarray(parameters[window], dtype=float), axis=0
             )
 
-        if graph_plot:
             graph_save_dir = os.path.join(current_dir, "parameters_graphs")
             os.makedirs(graph_save_dir, exist_ok=True)
 
-            for i in range(1, len(all_story_pandas_data.columns)):
+            for i in range(1, parameters.shape[1] + 1):
                 plt.figure(figsize=(10, 8))
                 plt.plot(
-                    all_story_pandas_data[0].astype("int"),
-                    all_story_pandas_data[i].astype("float"),
+                    iterations,
+                    parameters[:, i - 1],
                     color="black",
                     marker="o",
                     linestyle="dashed",
                     label="all",
                 )
                 plt.plot(
-                    ave_story_pandas_data[0].astype("int"),
-                    ave_story_pandas_data[i].astype("float"),
+                    iterations[window],
+                    parameters[window, i - 1],
                     color="red",
                     marker="o",
                     linestyle="dashed",
                     label="averaged",
                 )
+                plt.axhline(averages[i - 1], color="red", linestyle="solid")
                 plt.xlabel(
                     "Iteration", fontname="Times New Roman", fontsize=14
                 )
@@ -382,6 +440,26 @@ class LRDMCopt(FortranIO):
                 )
                 plt.close()
 
+        if native:
+            # average the history in fort.12 and write it to fort.10
+            # directly, without readalles.x and turborvb-serial.x
+            logger.info("Averaging parameters in fort.12")
+            logger.info(
+                f"The first {equil_steps} iterations are disregarded"
+                " in the average."
+            )
+            io_fort10 = IO_fort10("fort.10")
+            shutil.copyfile(
+                os.path.join(current_dir, "fort.10"),
+                os.path.join(current_dir, "fort.10_bak"),
+            )
+            io_fort10.average_group_parameters(
+                fort12="fort.12", input_name=input_file_used, start=equil_steps
+            )
+            logger.info("The averaged fort10 is labeled as fort.10")
+            logger.info("The original fort10 is saved as fort.10_bak")
+            return
+
         # update fort10 using the averaged parameters
         logger.info("Update fort10 using the averaged parameters")
         logger.info(f"The input file used for the opt. is {input_file_used}")
@@ -26,7 +26,7 @@ from turbogenius.pyturbo.utils.env import pyturbo_data_dir
 from turbogenius.pyturbo.utils.env import turbo_prep_run_command
 from turbogenius.pyturbo.utils.utility import file_check
 from turbogenius.pyturbo.utils.execute import run
-from turbogenius.pyturbo.io_fort10 import IO_fort10
+from turbogenius.pyturbo.io_fort10 import IO_fort10, probe_fort10
 
 from logging import getLogger, StreamHandler, Formatter
 
@@ -71,7 +71,7 @@ class Prep(FortranIO):
         input values
         """
         file_check(in_fort10)
-        if IO_fort10(fort10=in_fort10).pp_flag:
+        if probe_fort10(in_fort10)["pp_flag"]:
             file_check("pseudo.dat")
 
         self.in_fort10 = in_fort10
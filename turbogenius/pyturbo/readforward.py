@@ -24,7 +24,7 @@ from turbogenius.pyturbo.fortranIO import FortranIO
 from turbogenius.pyturbo.utils.env import turbo_readforward_run_command
 from turbogenius.pyturbo.utils.env import pyturbo_data_dir, pyturbo_root
 from turbogenius.pyturbo.utils.utility import file_check
-from turbogenius.pyturbo.io_fort10 import IO_fort10
+from turbogenius.pyturbo.io_fort10 import probe_fort10
 from turbogenius.pyturbo.utils.execute import run
 
 
@@ -46,7 +46,7 @@ class Readforward(FortranIO):
         input values
         """
         file_check(in_fort10)
-        if IO_fort10(fort10=in_fort10).pp_flag:
+        if probe_fort10(in_fort10)["pp_flag"]:
             file_check("pseudo.dat")
         self.in_fort10 = in_fort10
         self.namelist = namelist
@@ -5,6 +5,11 @@
 
 pyturbo: execute, methods to launch turborvb commands on a local machine
 
+The commands are launched by an asyncio runner (run_async), with explicit
+stdin/stdout file handles, and their standard outputs are streamed to the
+output files while they run. run_many launches many commands concurrently,
+and run is a synchronous wrapper of run_async.
+
 Todo:
     * docstrings are not completed.
 
@@ -16,51 +21,258 @@ from __future__ import print_function
 import os
 import sys
 import re
+import time
+import shlex
+import asyncio
+import threading
 import subprocess
-from typing import Optional
+from typing import Callable, Optional
 
 # set logger
 from logging import getLogger
 
 logger = getLogger("pyturbo").getChild(__name__)
 
+# characters which need a shell (pipes, lists, redirections, subshells, ...)
+_shell_regex = re.compile(r"[|;&<>()$`*?~\n]")
 
-def run(
-    binary: str, input_name: Optional[str] = None, output_name: str = "out.o"
-):
-    sys_env = os.environ.copy()
-    if input_name is None:
-        cmd = f"{binary} > {output_name}"
-    else:
-        cmd = f"{binary} < {input_name} > {output_name}"
-    # p = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, shell=True, check=True, env=my_env)
-    # logger.info(p.stdout.decode())
-    # logger.info(p.stderr.decode())
 
-    logger.info(f"Execute command(s): {cmd}")
+def shell_needed(binary: str) -> bool:
+    """
+    Return True if binary needs a shell, i.e., it is not a plain command with
+    arguments (e.g., "(echo '1 1 0 0'; echo '0') | readalles.x").
 
-    if sys.platform == "darwin":
-        if "LD_LIBRARY_PATH" in sys_env:
+    Args:
+        binary (str): command
+    Returns:
+        bool: True if a shell is needed
+    """
+    try:
+        args = shlex.split(binary)
+    except ValueError:
+        return True
+    if len(args) == 0 or "=" in args[0]:
+        return True
+    return _shell_regex.search(binary) is not None
+
+
+def _darwin_shell_command(cmd: str, sys_env: dict) -> str:
+    # the library paths are not inherited by the shell on macOS (SIP)
+    for variable in ("LD_LIBRARY_PATH", "DYLD_LIBRARY_PATH"):
+        if variable in sys_env:
             if re.match(r".*bash.*", sys_env["SHELL"]) or re.match(
                 r".*zsh.*", sys_env["SHELL"]
             ):
-                cmd = f"export LD_LIBRARY_PATH={sys_env['LD_LIBRARY_PATH']} && {cmd}"
+                cmd = f"export {variable}={sys_env[variable]} && {cmd}"
             elif re.match(r".*csh.*", sys_env["SHELL"]) or re.match(
                 r".*tcsh.*", sys_env["SHELL"]
             ):
-                cmd = f"setenv LD_LIBRARY_PATH {sys_env['LD_LIBRARY_PATH']} && {cmd}"
+                cmd = f"setenv {variable} {sys_env[variable]} && {cmd}"
             else:
                 raise NotImplementedError
-        if "DYLD_LIBRARY_PATH" in sys_env:
-            if re.match(r".*bash.*", sys_env["SHELL"]) or re.match(
-                r".*zsh.*", sys_env["SHELL"]
-            ):
-                cmd = f"export DYLD_LIBRARY_PATH={sys_env['DYLD_LIBRARY_PATH']} && {cmd}"
-            elif re.match(r".*csh.*", sys_env["SHELL"]) or re.match(
-                r".*tcsh.*", sys_env["SHELL"]
-            ):
-                cmd = f"setenv DYLD_LIBRARY_PATH {sys_env['DYLD_LIBRARY_PATH']} && {cmd}"
+    return cmd
+
+
+async def _terminate(process, grace: float = 5.0) -> None:
+    # terminate the process, and kill it if it does not exit in grace seconds
+    if process.returncode is not None:
+        return
+    try:
+        process.terminate()
+        await asyncio.wait_for(process.wait(), grace)
+    except ProcessLookupError:
+        pass
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+
+
+async def run_async(
+    binary: str,
+    input_name: Optional[str] = None,
+    output_name: str = "out.o",
+    timeout: Optional[float] = None,
+    progress: Optional[Callable[[str], None]] = None,
+    chunk: int = 1 << 16,
+    cwd: Optional[str] = None,
+    env: Optional[dict] = None,
+) -> int:
+    """
+    Launch a command, with input_name as its standard input, and stream its
+    standard output to output_name while it runs.
+
+    Plain commands (e.g., "mpirun -np 4 turborvb-mpi.x") are executed without
+    a shell. The commands with pipes, lists, etc. (see shell_needed) are
+    executed by a shell, with the same file handles. If the command times out
+    or the task is cancelled, the process is terminated.
+
+    Args:
+        binary (str): command
+        input_name (str): standard input, None -> inherited
+        output_name (str): standard output
+        timeout (float): timeout (sec.), None -> no limit
+        progress (Callable): called with each line of the output, as it is
+            written (e.g., to follow an optimization)
+        chunk (int): the output is streamed by chunks of this size (bytes)
+        cwd (str): working directory of the command, None -> the current one
+            (input_name and output_name are relative to the current one)
+        env (dict): environment of the command, None -> os.environ
+    Returns:
+        int: the return code (0)
+    Raises:
+        subprocess.CalledProcessError: if the return code is not 0
+        asyncio.TimeoutError: if the command times out
+    """
+    sys_env = os.environ.copy() if env is None else dict(env)
+    if input_name is None:
+        logger.info(f"Execute command(s): {binary} > {output_name}")
+    else:
+        logger.info(f"Execute command(s): {binary} < {input_name} > {output_name}")
+
+    stdin = open(input_name, "rb") if input_name is not None else None
+    try:
+        with open(output_name, "wb") as stdout:
+            if shell_needed(binary):
+                cmd = binary
+                if sys.platform == "darwin":
+                    cmd = _darwin_shell_command(cmd, sys_env)
+                process = await asyncio.create_subprocess_shell(
+                    cmd, stdin=stdin, stdout=subprocess.PIPE, env=sys_env, cwd=cwd
+                )
             else:
-                raise NotImplementedError
+                process = await asyncio.create_subprocess_exec(
+                    *shlex.split(binary),
+                    stdin=stdin,
+                    stdout=subprocess.PIPE,
+                    env=sys_env,
+                    cwd=cwd,
+                )
+            start = time.monotonic()
+
+            async def stream() -> None:
+                pending = b""
+                while True:
+                    data = await process.stdout.read(chunk)
+                    if not data:
+                        break
+                    stdout.write(data)
+                    stdout.flush()
+                    if progress is not None:
+                        lines = (pending + data).split(b"\n")
+                        pending = lines.pop()
+                        for line in lines:
+                            progress(line.decode(errors="replace"))
+                if progress is not None and pending:
+                    progress(pending.decode(errors="replace"))
+                await process.wait()
+
+            try:
+                await asyncio.wait_for(stream(), timeout)
+            except asyncio.TimeoutError:
+                logger.error(f"{binary} timed out after {timeout} sec.")
+                await _terminate(process)
+                raise
+            except asyncio.CancelledError:
+                logger.warning(f"{binary} is cancelled.")
+                await _terminate(process)
+                raise
+    finally:
+        if stdin is not None:
+            stdin.close()
+
+    logger.debug(
+        f"{binary} exited with {process.returncode}"
+        f" in {time.monotonic() - start:.1f} sec."
+    )
+    if process.returncode != 0:
+        raise subprocess.CalledProcessError(process.returncode, binary)
+    return process.returncode
+
+
+async def run_many(jobs: list, max_concurrency: Optional[int] = None) -> list:
+    """
+    Launch many commands concurrently (see run_async), at most
+    max_concurrency at the same time. If a command fails, the others are
+    cancelled (i.e., terminated), and the exception is raised.
+
+    Args:
+        jobs (list): the keyword arguments of run_async for each command,
+            e.g., [{"binary": "...", "input_name": "...", "output_name": "..."}]
+        max_concurrency (int): the maximum number of commands running at the
+            same time, None -> os.cpu_count()
+    Returns:
+        list: the return codes
+    """
+    if max_concurrency is None:
+        max_concurrency = os.cpu_count() or 1
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def limited(job: dict) -> int:
+        async with semaphore:
+            return await run_async(**job)
+
+    tasks = [asyncio.ensure_future(limited(job)) for job in jobs]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+
+def run_coroutine(coroutine):
+    """
+    Run a coroutine to completion, also from a thread with a running event
+    loop (e.g., Jupyter), in which asyncio.run cannot be used.
+
+    Args:
+        coroutine: coroutine (e.g., run_many(jobs))
+    Returns:
+        the result of the coroutine
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+    result = {}
+
+    def target() -> None:
+        try:
+            result["value"] = asyncio.run(coroutine)
+        except BaseException as e:
+            result["error"] = e
+
+    thread = threading.Thread(target=target)
+    thread.start()
+    thread.join()
+    if "error" in result:
+        raise result["error"]
+    return result["value"]
+
+
+def run(
+    binary: str,
+    input_name: Optional[str] = None,
+    output_name: str = "out.o",
+    timeout: Optional[float] = None,
+):
+    """
+    Launch a command and wait for it (a synchronous wrapper of run_async).
 
-    subprocess.check_call(cmd, shell=True, env=sys_env)
+    Args:
+        binary (str): command
+        input_name (str): standard input, None -> inherited
+        output_name (str): standard output
+        timeout (float): timeout (sec.), None -> no limit
+    Returns:
+        int: the return code (0)
+    """
+    return run_coroutine(
+        run_async(
+            binary,
+            input_name=input_name,
+            output_name=output_name,
+            timeout=timeout,
+        )
+    )
@@ -0,0 +1,205 @@
+#!python -u
+# -*- coding: utf-8 -*-
+
+"""
+
+pyturbo: plotter, batched rendering of the parameter histories
+
+"""
+
+from __future__ import print_function
+
+# python modules
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+# set logger
+from logging import getLogger
+
+# turbogenius module
+from ..io_fort12 import IO_fort12, read_story
+
+logger = getLogger("pyturbo").getChild(__name__)
+
+
+def decimate(num_points: int, max_points: Optional[int] = None) -> np.ndarray:
+    """
+    Return the indices of at most max_points points, evenly spaced over
+    num_points points, including the last one.
+
+    Args:
+        num_points (int): the number of points
+        max_points (int): the maximum number of points, None -> no decimation
+    Returns:
+        np.ndarray: indices
+    """
+    if max_points is None or num_points <= max_points:
+        return np.arange(num_points)
+    stride = int(np.ceil(num_points / max_points))
+    indices = np.arange(0, num_points, stride)
+    if indices[-1] != num_points - 1:
+        indices = np.append(indices, num_points - 1)
+    return indices
+
+
+def _parameters_history(fort12: str, story: Optional[str]) -> tuple:
+    # (iterations, parameters) of story.d if given, otherwise of fort.12
+    if story is not None:
+        return read_story(story)
+    parameters = IO_fort12(fort12).parameters()
+    return np.arange(1, parameters.shape[0] + 1), parameters
+
+
+def _render_pages(
+    fort12: str,
+    story: Optional[str],
+    pages: list,
+    output: str,
+    fmt: str,
+    ncols: int,
+    max_points: Optional[int],
+    start: Optional[int],
+) -> list:
+    # worker of plot_parameters_pages, which renders the pages, i.e., lists
+    # of parameter indices (starting from 0), with the Agg canvas (without
+    # pyplot, i.e., without any global state)
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.backends.backend_pdf import PdfPages
+    from matplotlib.ticker import MaxNLocator
+
+    all_iterations, parameters = _parameters_history(fort12, story)
+    num_iterations = parameters.shape[0]
+    rows = decimate(num_iterations, max_points=max_points)
+    iterations = all_iterations[rows]
+    if start is not None:
+        # the first row averaged
+        first = int(np.searchsorted(all_iterations, start, side="right"))
+
+    pdf = PdfPages(output) if fmt == "pdf" else None
+    files = []
+    try:
+        for page, columns in pages:
+            nrows = int(np.ceil(len(columns) / ncols))
+            fig = Figure(figsize=(3.0 * ncols, 2.2 * nrows))
+            FigureCanvasAgg(fig)
+            # only the plotted rows and the columns of the page are read
+            values = np.asarray(parameters[np.ix_(rows, columns)], dtype=float)
+            if start is not None:
+                averages = np.mean(
+                    np.asarray(parameters[first:, columns], dtype=float), axis=0
+                )
+            for n, column in enumerate(columns):
+                ax = fig.add_subplot(nrows, ncols, n + 1)
+                ax.plot(iterations, values[:, n], color="black", linewidth=0.8)
+                if start is not None:
+                    window = iterations > start
+                    ax.plot(
+                        iterations[window],
+                        values[window, n],
+                        color="red",
+                        linewidth=0.8,
+                    )
+                    ax.axhline(averages[n], color="red", linestyle="dashed")
+                ax.set_title(f"Parameter_No.{column + 1}", fontsize=8)
+                ax.tick_params(labelsize=6, direction="in")
+                ax.get_yaxis().get_major_formatter().set_useOffset(False)
+                ax.get_xaxis().set_major_locator(MaxNLocator(integer=True))
+            fig.tight_layout()
+            if pdf is not None:
+                pdf.savefig(fig)
+            else:
+                file = output.format(page)
+                fig.savefig(file, dpi=100)
+                files.append(file)
+    finally:
+        if pdf is not None:
+            pdf.close()
+            files.append(output)
+    return files
+
+
+def plot_parameters_pages(
+    fort12: str = "fort.12",
+    graph_save_dir: str = "parameters_graphs",
+    per_page: int = 36,
+    ncols: int = 6,
+    workers: int = 1,
+    fmt: str = "png",
+    max_points: Optional[int] = 2000,
+    start: Optional[int] = None,
+    story: Optional[str] = None,
+) -> list:
+    """
+    Plot the histories of the variational parameters in fort.12 (see
+    IO_fort12.parameters), or in story.d if given (see read_story), per_page
+    parameters per page.
+
+    The pages are rendered in a process pool with the Agg canvas, and each
+    worker reads only the columns of its pages from the memory-mapped
+    fort.12. With fmt="png", each page is a multi-panel PNG
+    (Parameters_page{n}.png). With fmt="pdf", each worker writes its pages to
+    a multipage PDF (Parameters_history{n}.pdf, a single one if workers=1).
+
+    Args:
+        fort12 (str): fort.12 of the optimization
+        graph_save_dir (str): the directory of the graphs
+        per_page (int): the number of parameters per page
+        ncols (int): the number of panels per row
+        workers (int): the number of processes, -1 -> os.cpu_count()
+        fmt (str): "png" or "pdf"
+        max_points (int): the histories are decimated to at most max_points
+            iterations, None -> no decimation
+        start (int): if given, the iterations after start (i.e., the averaged
+            ones) and their average are drawn in red
+        story (str): story.d written by readalles.x, read instead of fort12
+    Returns:
+        list: the files written
+    """
+    if fmt not in {"png", "pdf"}:
+        logger.error(f"fmt={fmt} is not supported. Use png or pdf.")
+        raise ValueError
+    if workers == -1:
+        workers = os.cpu_count() or 1
+    num_parameters = _parameters_history(fort12, story)[1].shape[1]
+    os.makedirs(graph_save_dir, exist_ok=True)
+
+    pages = [
+        (page, list(range(first, min(first + per_page, num_parameters))))
+        for page, first in enumerate(range(0, num_parameters, per_page))
+    ]
+    workers = max(min(workers, len(pages)), 1)
+    # contiguous chunks of pages, one per worker
+    chunks = [list(chunk) for chunk in np.array_split(np.arange(len(pages)), workers)]
+    tasks = []
+    for n, chunk in enumerate(chunks):
+        if fmt == "pdf" and workers == 1:
+            name = "Parameters_history.pdf"
+        elif fmt == "pdf":
+            name = f"Parameters_history{n}.pdf"
+        else:
+            name = "Parameters_page{}.png"
+        tasks.append(
+            (
+                fort12,
+                story,
+                [pages[i] for i in chunk],
+                os.path.join(graph_save_dir, name),
+                fmt,
+                ncols,
+                max_points,
+                start,
+            )
+        )
+    logger.info(
+        f"{num_parameters} parameters are plotted in {len(pages)} pages"
+        f" by {workers} workers."
+    )
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_render_pages, *zip(*tasks)))
+    else:
+        results = [_render_pages(*task) for task in tasks]
+    return [file for files in results for file in files]
@@ -13,38 +13,35 @@ Todo:
 from __future__ import print_function
 
 # python modules
+import io
 import os
+import re
 import shutil
-import platform
+import itertools
+import tempfile
 import subprocess
 import linecache
+import warnings
 import numpy as np
-from scipy.io import FortranFile
 from logging import getLogger, StreamHandler, Formatter
 
 # python special module
 from pymatgen.core.periodic_table import Element, ElementBase
 
 # turbogenius module
-from .env import pyturbo_root
+from .env import pyturbo_root, turborvb_bin_root
+from .execute import run
+from ..io_fort12 import IO_fort12, read_story
 
 logger = getLogger("pyturbo").getChild(__name__)
 
+# a whitespace-separated field of a line
+_field_regex = re.compile(r"\S+")
+
 
 def get_linenum_fort12(fort12="fort.12"):
-    # check column length of fort.12
-    f = FortranFile(fort12, "r")
-    a = f.read_reals(dtype="float64")
-    column_length = len(a)
-    f.close()
-    head = ("head", "<i")
-    tail = ("tail", "<i")
-    dt = np.dtype([head, ("a", "<{}d".format(column_length)), tail])
-    fd = open(fort12, "r")
-    fort12_b = np.fromfile(fd, dtype=dt, count=-1)
-    data_length = len(fort12_b)
-    fd.close()
-    return data_length
+    # the number of records of fort.12
+    return IO_fort12(fort12).num_records
 
 
 def return_element_symbol(atomic_number):
@@ -264,110 +261,180 @@ def pygrep_lineno(file, keyword):
 
 
 def pysed_replace(file, value, lineno, index, inplace=False):
-    if platform.system() == "Darwin":
-        if shutil.which("gsed") is None:
-            logger.error("The BSD sed on MacOS is not supported.")
-            logger.error("Pls. install gsed via homebrew, i.e., brew install gnu-sed")
-            raise NotImplementedError
-        else:
-            sed = "gsed"
-            awk = "awk"
-    else:
-        sed = "sed"
-        awk = "awk"
-
-    sys_env = os.environ.copy()
-    cmds = []
-
-    lineno += 1
+    """
+    Replace a value in a file (see pyreplace_values).
 
-    cmds = [
-        f"line=`{sed} -n {lineno}p {file}`",
-        f'mod_line=`echo $line |  \
-            {awk} \'{{FS=" ";OFS=" "}}{{${index+1}={value}}}1\'`',
-    ]
-
-    if inplace:
-        cmds += [f"cp {file} {file}_bak"]
-
-    cmds += [
-        f'{sed} -i "{lineno}d" {file}',
-        f'{sed} -i "{lineno}i \\ $mod_line" {file}',
-    ]
-
-    cmd = "; ".join(cmds)
-    logger.debug(cmd)
-    subprocess.check_call(cmd, shell=True, env=sys_env)
+    Args:
+        file (str): File name (typically, fort.10)
+        value: new value
+        lineno (int): line No., starting from 0
+        index (int): index of the value in the line
+        inplace (bool): if True, the original file is backed up to {file}_bak
+    """
+    pysed_replace_lines(file, [lineno], [[value]], [[index]], inplace=inplace)
 
 
 def pysed_replace_lines(
-    file, lineno_list, value_list, index_list, inplace=False, cmd_chunk_num=10
+    file, lineno_list, value_list, index_list, inplace=False, cmd_chunk_num=None
 ):
-    if platform.system() == "Darwin":
-        if shutil.which("gsed") is None:
-            logger.error("The BSD sed on MacOS is not supported.")
-            logger.error("Pls. install gsed via homebrew, i.e., brew install gnu-sed")
-            raise NotImplementedError
-        else:
-            sed = "gsed"
-            awk = "awk"
-    else:
-        sed = "sed"
-        awk = "awk"
-
-    sys_env = os.environ.copy()
-
+    """
+    Replace values in a file, line by line (see pyreplace_values).
+
+    All the edits are applied in a single pass over the file, and the file
+    is written once.
+
+    Args:
+        file (str): File name (typically, fort.10)
+        lineno_list (list): line No. of each edited line, starting from 0
+        value_list (list): new values of each edited line
+        index_list (list): indices of the new values in each edited line
+        inplace (bool): if True, the original file is backed up to {file}_bak
+        cmd_chunk_num (int): deprecated and ignored
+    """
+    if cmd_chunk_num is not None:
+        warnings.warn(
+            "cmd_chunk_num of pysed_replace_lines is deprecated and ignored.",
+            DeprecationWarning,
+            stacklevel=2,
+        )
     assert len(lineno_list) == len(value_list)
     assert len(value_list) == len(index_list)
 
     if inplace:
-        cmd = f"cp {file} {file}_bak"
-        subprocess.check_call(cmd, shell=True, env=sys_env)
-
-    counter = 0
-    cmds = []
-    for value_list_l, index_list_l, lineno in zip(value_list, index_list, lineno_list):
-        lineno += 1  # because, grep starts from 1, but python starts from 0
-
-        cmds += [f"line=`{sed} -n {lineno}p {file}`"]
-
-        """ old!! Too slow.
-        for value, index in zip(value_list_l, index_list_l):
-            cmds += [
-                f'line=`echo $line |  \
-                    {awk} \'{{FS=" ";OFS=" "}}{{${index+1}={value}}}1\'`'
-            ]
-        """
-
-        # """ new!!
-        replaced = ""
-        for value, index in zip(value_list_l, index_list_l):
-            replaced += f"${index+1}={value};"
-            # index+1 # because, grep starts from 1,
-            # but python starts from 0
-        cmds += [f'line=`echo $line |  {awk} \'{{FS=" ";OFS=" "}}{{{replaced}}}1\'`']
-        # """
-
-        # without IOs -> ToDo avoid repating sed!!
-        cmds += [
-            f'{sed} -i "{lineno}d" {file}',
-            f'{sed} -i "{lineno}i \\ $line" {file}',
-        ]
-
-        counter += 1
-        if counter >= cmd_chunk_num:
-            cmd = "; ".join(cmds)
-            # logger.debug(cmd)
-            subprocess.check_call(cmd, shell=True, env=sys_env)
-            counter = 0
-            cmds = []
-
-    if len(cmds) != 0:
-        cmd = "; ".join(cmds)
-        # logger.debug(cmd)
-        subprocess.check_call(cmd, shell=True, env=sys_env)
-        counter = 0
-        cmds = []
+        shutil.copy(file, f"{file}_bak")
+
+    lineno = []
+    index = []
+    values = []
+    for lineno_l, value_list_l, index_list_l in zip(
+        lineno_list, value_list, index_list
+    ):
+        assert len(value_list_l) == len(index_list_l)
+        lineno += [lineno_l] * len(value_list_l)
+        index += list(index_list_l)
+        values += list(value_list_l)
+    pyreplace_values(file, lineno, index, values)
+
+
+def pyreplace_lines(file, edits, memory_budget=1 << 26):
+    """
+    Replace values in a file in a single streaming pass (see pyreplace_values).
+
+    Args:
+        file (str): File name (typically, fort.10)
+        edits (dict): {line No.: {index: new value}}, line No. starting from 0
+        memory_budget (int): bytes of the file held in memory at once
+    """
+    lineno = []
+    index = []
+    values = []
+    for lineno_l, edits_l in edits.items():
+        for index_l, value in edits_l.items():
+            lineno.append(lineno_l)
+            index.append(index_l)
+            values.append(value)
+    pyreplace_values(file, lineno, index, values, memory_budget=memory_budget)
+
+
+def pyreplace_values(
+    file,
+    lineno,
+    index,
+    values,
+    memory_budget=1 << 26,
+    output_file=None,
+    compare=False,
+):
+    """
+    Replace values in a file in a single streaming pass.
+
+    The edits are sorted by line once, and the file is then copied to a temporary
+    file in the same directory, merging the edits on the way: unchanged lines are
+    copied as they are, and in an edited line only the characters of the edited
+    fields are replaced, i.e., the spacing of the line is kept. The temporary file is
+    finally renamed onto the original one (atomic on POSIX). If the same value is
+    edited more than once, the last edit wins.
+
+    Args:
+        file (str): File name (typically, fort.10)
+        lineno (array_like): line No. of each value, starting from 0
+        index (array_like): index of each value in its line
+        values (list): new values
+        memory_budget (int): bytes of the file held in memory at once,
+            i.e., the size of the read and write buffers
+        output_file (str): if given, the result is written to output_file
+            instead, and file is left untouched
+        compare (bool): if True, a value equal to the number already in the file
+            is not rewritten, i.e., lines without actual changes are kept as they are
+    """
+    if output_file is None:
+        output_file = file
+    lineno = np.asarray(lineno, dtype=np.int64)
+    index = np.asarray(index, dtype=np.int64)
+    if not len(lineno) == len(index) == len(values):
+        logger.error(
+            f"len(lineno)={len(lineno)}, len(index)={len(index)}, "
+            f"and len(values)={len(values)} are inconsistent."
+        )
+        raise ValueError
+    if len(values) == 0:
+        return
+    if lineno.min() < 0 or index.min() < 0:
+        logger.error("line No. and index should be non-negative.")
+        raise ValueError
+
+    order = np.argsort(lineno, kind="stable")
+    edited_lineno, starts = np.unique(lineno[order], return_index=True)
+    stops = np.append(starts[1:], len(order))
+    buffering = max(memory_budget // 2, io.DEFAULT_BUFFER_SIZE)
+
+    dirname, basename = os.path.split(os.path.abspath(output_file))
+    fd, tmp_file = tempfile.mkstemp(prefix=f".{basename}.", dir=dirname)
+    try:
+        with open(file, "r", buffering=buffering) as f_in, os.fdopen(
+            fd, "w", buffering=buffering
+        ) as f_out:
+            current = 0
+            for target, start, stop in zip(edited_lineno, starts, stops):
+                f_out.writelines(itertools.islice(f_in, target - current))
+                line = next(f_in, None)
+                if line is None:
+                    logger.error(f"{file} has no line {target + 1}.")
+                    raise ValueError
+                spans = [match.span() for match in _field_regex.finditer(line)]
+                fields = {}
+                for k in order[start:stop]:
+                    if index[k] >= len(spans):
+                        logger.error(
+                            f"line {target + 1} of {file} has no index {index[k]}."
+                        )
+                        raise ValueError
+                    field_start, field_stop = spans[index[k]]
+                    if compare and _is_equal(line[field_start:field_stop], values[k]):
+                        continue
+                    fields[index[k]] = str(values[k])
+                # only the spans of the edited fields are replaced, from the
+                # right, so that the rest of the line is kept as it is
+                for i in sorted(fields, reverse=True):
+                    field_start, field_stop = spans[i]
+                    line = line[:field_start] + fields[i] + line[field_stop:]
+                f_out.write(line)
+                current = target + 1
+            f_out.writelines(f_in)
+        shutil.copymode(file, tmp_file)
+        os.replace(tmp_file, output_file)
+    except BaseException:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        raise
+
+
+def _is_equal(field, value):
+    # whether a field of a file holds value (Fortran D exponents are accepted)
+    try:
+        return float(field.replace("D", "E").replace("d", "e")) == float(value)
+    except (TypeError, ValueError):
+        return False
 
 
 def pygetline(
@@ -380,25 +447,77 @@ def pygetline(
     return line
 
 
-def remove_new_parameter_lines_in_fort10():
-    output_buffer = [
-        "#!/bin/bash",
-        "line_num_key=`grep 'new parameters' -n fort.10 | \
-            cut -d ':' -f 1 | head -n 1`",
-        'if [ -n "$line_num_key" ]; then',
-        "line_num=`expr ${line_num_key} - 1`",
-        "head -n ${line_num} fort.10 > fort.10_",
-        "mv fort.10_ fort.10",
-        "fi",
-    ]
-    output_buffer = "\n".join(output_buffer)
-    with open("./run_local.sh", "w") as f:
-        f.writelines(output_buffer)
-
-    sys_env = os.environ.copy()
-    cmds = ["chmod +x ./run_local.sh", "./run_local.sh", "./run_local.sh"]
-    for cmd in cmds:
-        subprocess.check_call(cmd, shell=True, env=sys_env)
+def remove_new_parameter_lines_in_fort10(fort10="fort.10", chunk=1 << 20):
+    """
+    Truncate fort10 in place just before the first "new parameters" line.
+
+    The "new parameters" lines are appended after the last section of fort.10
+    ("Eq. par. in the atomic 3-body par. in the chosen basis"), so the file is
+    read backward in chunks of a fixed size, and the scan stops as soon as
+    that section keyword is reached. The file is not copied.
+
+    Args:
+        fort10 (str): File name (typically, fort.10)
+        chunk (int): bytes read at once
+    """
+    marker = b"new parameters"
+    last_section = b"Eq. par. in the atomic 3-body"
+    overlap = max(len(marker), len(last_section)) - 1
+
+    first = None  # byte offset of the first marker found so far
+    with open(fort10, "rb") as f:
+        end = f.seek(0, os.SEEK_END)
+        while end > 0:
+            start = max(end - chunk, 0)
+            f.seek(start)
+            buf = f.read(end - start + overlap)
+            pos = buf.find(marker)
+            if pos != -1:
+                first = start + pos
+            if last_section in buf:
+                break
+            end = start
+        if first is None:
+            return
+        # the file is truncated at the beginning of the line
+        size = 0
+        end = first
+        while end > 0:
+            start = max(end - chunk, 0)
+            f.seek(start)
+            newline = f.read(end - start).rfind(b"\n")
+            if newline != -1:
+                size = start + newline + 1
+                break
+            end = start
+    logger.debug(f"{fort10} is truncated to {size} bytes.")
+    os.truncate(fort10, size)
+
+
+def read_parameters_history(native=False, fort12="fort.12", story="all_story.d"):
+    """
+    Return the history of the variational parameters of an optimization.
+
+    By default, readalles.x writes the history to story.d (binning length 1),
+    which is copied to story and read (see read_story). If native, the history
+    is read from fort12 directly (see IO_fort12.parameters), whose column
+    layout has not been checked against readalles.x for every optimization.
+
+    Args:
+        native (bool): if True, read fort12 without readalles.x
+        fort12 (str): fort.12 of the optimization
+        story (str): the copy of story.d
+    Returns:
+        tuple: (iterations, parameters), the (num_iterations,) iterations
+        (starting from 1) and the (num_iterations, num_parameters) parameters
+    """
+    if native:
+        parameters = IO_fort12(fort12).parameters()
+        return np.arange(1, parameters.shape[0] + 1), parameters
+    cmd = f"(echo '1 1 0 0'; echo '0'; echo '100000') | {os.path.join(turborvb_bin_root, 'readalles.x')}"
+    run(binary=cmd, output_name="out_readalles_for_plot_all")
+    shutil.copyfile("story.d", story)
+    return read_story(story)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,325 @@
+#!python -u
+# -*- coding: utf-8 -*-
+
+"""
+
+pyturbo: watcher, classes to stop a running turborvb job via stop.dat
+
+"""
+
+from __future__ import print_function
+
+# python modules
+import os
+import threading
+import numpy as np
+from typing import Optional
+
+# set logger
+from logging import getLogger
+
+# turbogenius module
+from ..io_fort12 import IO_fort12
+from ..io_output import IO_output
+from .execute import run
+from .utility import remove_file
+
+logger = getLogger("pyturbo").getChild(__name__)
+
+
+def weighted_slope(x, y, error) -> tuple:
+    """
+    Return the slope of the weighted least-squares line fitting y(x),
+    and its error bar.
+
+    Args:
+        x (array_like): x
+        y (array_like): y
+        error (array_like): error bars of y
+    Returns:
+        tuple: (slope, error bar)
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    w = 1.0 / np.maximum(np.asarray(error, dtype=float), 1.0e-300) ** 2
+    s, sx, sy = np.sum(w), np.sum(w * x), np.sum(w * y)
+    sxx, sxy = np.sum(w * x * x), np.sum(w * x * y)
+    delta = s * sxx - sx**2
+    if delta <= 0.0:
+        return 0.0, np.inf
+    return (s * sxy - sx * sy) / delta, np.sqrt(s / delta)
+
+
+def run_watched(
+    binary: str,
+    input_name: str,
+    output_name: str,
+    watcher: Optional["Watcher"] = None,
+    stop_file: str = "stop.dat",
+) -> None:
+    """
+    Run a turborvb job (see execute.run), followed by watcher if given.
+
+    With a watcher, the previous output and a stale stop.dat are removed
+    before the run, so that they are not taken for those of the running job.
+    stop.dat is removed after the run in any case, so that it does not stop
+    the next job.
+
+    Args:
+        binary (str): command
+        input_name (str): input file name
+        output_name (str): output file name
+        watcher (Watcher): if given, it follows output_name while the job
+            runs, and stops the job via stop.dat once converged
+        stop_file (str): the stop file
+    """
+    if watcher is None:
+        run(binary, input_name=input_name, output_name=output_name)
+    else:
+        remove_file(file=output_name)
+        remove_file(file=stop_file)
+        watcher.output_name = output_name
+        with watcher:
+            run(binary, input_name=input_name, output_name=output_name)
+    remove_file(file=stop_file)
+
+
+class Watcher:
+    """
+
+    This is a base class of the watchers, which follow the output of a running
+    turborvb job in a background thread, and write stop.dat (i.e., ask
+    turborvb to stop gracefully) once converged() returns True.
+
+    Only the data appended to the output are parsed at each poll (see IO_output).
+
+    Attributes:
+         output_name (str): output file name (e.g., out_min)
+         stop_file (str): the stop file, written in the directory of output_name
+         interval (float): polling interval (sec.)
+         stopped (bool): True if stop.dat has been written
+
+    """
+
+    def __init__(
+        self,
+        output_name: str = "out_min",
+        stop_file: str = "stop.dat",
+        interval: float = 10.0,
+    ):
+        self.output_name = output_name
+        self.stop_file = stop_file
+        self.interval = interval
+        self.stopped = False
+        self.__event = threading.Event()
+        self.__thread = None
+
+    def converged(self, io_output: IO_output) -> bool:
+        """
+        Return True if the job can be stopped.
+
+        Args:
+            io_output (IO_output): the parsed output
+        Returns:
+            bool: True if converged
+        """
+        raise NotImplementedError
+
+    def poll(self) -> bool:
+        """
+        Check the output once, and write stop.dat if converged.
+
+        Returns:
+            bool: True if stop.dat has been written
+        """
+        if not self.stopped and os.path.isfile(self.output_name):
+            if self.converged(IO_output.get(self.output_name)):
+                stop_file = os.path.join(
+                    os.path.dirname(os.path.abspath(self.output_name)),
+                    self.stop_file,
+                )
+                logger.info(f"Converged. {stop_file} is written to stop the job.")
+                with open(stop_file, "w"):
+                    pass
+                self.stopped = True
+        return self.stopped
+
+    def __watch(self) -> None:
+        while not self.__event.wait(self.interval):
+            try:
+                if self.poll():
+                    return
+            except (OSError, ValueError, IndexError) as e:
+                logger.warning(f"{self.output_name} cannot be checked: {e}")
+
+    def start(self) -> None:
+        """
+        Start watching in a background thread.
+        """
+        self.stopped = False
+        self.__event.clear()
+        self.__thread = threading.Thread(target=self.__watch, daemon=True)
+        self.__thread.start()
+
+    def stop(self) -> None:
+        """
+        Stop watching.
+        """
+        self.__event.set()
+        if self.__thread is not None:
+            self.__thread.join()
+            self.__thread = None
+
+    def __enter__(self) -> "Watcher":
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.stop()
+
+
+class ConvergenceWatcher(Watcher):
+    """
+
+    This class stops an optimization (VMCopt or LRDMCopt) once devmax stays
+    below devmax_threshold and the energy is statistically flat, i.e., the slope
+    of the energies is within slope_sigma error bars of zero, for the last
+    num_iterations iterations.
+
+    Attributes:
+         output_name (str): output file name (e.g., out_min)
+         devmax_threshold (float): threshold of devmax (converged criteria)
+         num_iterations (int): the number of the last iterations checked
+         slope_sigma (float): tolerance of the energy slope, in its error bars
+         min_iterations (int): the job is not stopped before this number of
+            iterations (e.g., to keep enough steps for averaging the parameters)
+         stop_file (str): the stop file, written in the directory of output_name
+         interval (float): polling interval (sec.)
+
+    """
+
+    def __init__(
+        self,
+        output_name: str = "out_min",
+        devmax_threshold: float = 4.5,
+        num_iterations: int = 10,
+        slope_sigma: float = 2.0,
+        min_iterations: int = 0,
+        stop_file: str = "stop.dat",
+        interval: float = 10.0,
+    ):
+        super().__init__(
+            output_name=output_name, stop_file=stop_file, interval=interval
+        )
+        self.devmax_threshold = devmax_threshold
+        self.num_iterations = num_iterations
+        self.slope_sigma = slope_sigma
+        self.min_iterations = min_iterations
+
+    def converged(self, io_output: IO_output) -> bool:
+        records = io_output.records()
+        if len(records) < max(self.num_iterations, self.min_iterations, 2):
+            return False
+        records = records[-self.num_iterations :]
+        iteration, energy, error, devmax = np.array(records).T
+        if np.any(devmax >= self.devmax_threshold):
+            return False
+        slope, slope_error = weighted_slope(iteration, energy, error)
+        logger.debug(
+            f"devmax={devmax[-1]}, energy slope={slope} +- {slope_error}"
+        )
+        return bool(abs(slope) <= self.slope_sigma * slope_error)
+
+
+class TargetErrorWatcher(Watcher):
+    """
+
+    This class stops a VMC or LRDMC run once the error bar of the energy
+    reaches target_error. At each poll, the growing fort.12 is reblocked in
+    Python (see IO_fort12.auto_binning and IO_fort12.energy), and the error
+    bar is projected to the number of records needed, i.e., n * (error *
+    safety_factor / target_error)**2, since it decreases as 1/sqrt(n).
+
+    Since the autocorrelation time and the error bar are themselves poorly
+    estimated from short series, the job is not stopped before the records
+    after the warm-up span min_autocorrelation_times autocorrelation times
+    and min_bins bins.
+
+    Attributes:
+         output_name (str): output file name (e.g., out_vmc, out_fn)
+         target_error (float): the target error bar of the energy (Ha)
+         fort12 (str): fort.12, in the directory of output_name
+         correct (int): the correcting factor of LRDMC (see IO_fort12.weights)
+         safety_factor (float): the error bar is multiplied by this factor
+            before being compared with target_error
+         min_bins (int): the minimum number of bins
+         min_autocorrelation_times (float): the minimum length of the records
+            after the warm-up, in units of the autocorrelation time
+         stop_file (str): the stop file, written in the directory of output_name
+         interval (float): polling interval (sec.)
+         energy (float): the last estimated energy (Ha)
+         error (float): the last estimated error bar (Ha)
+         projected_records (int): the last projected number of records needed
+
+    """
+
+    def __init__(
+        self,
+        output_name: str = "out_vmc",
+        target_error: float = 1.0e-3,
+        fort12: str = "fort.12",
+        correct: int = 1,
+        safety_factor: float = 1.1,
+        min_bins: int = 20,
+        min_autocorrelation_times: float = 50.0,
+        stop_file: str = "stop.dat",
+        interval: float = 10.0,
+    ):
+        super().__init__(
+            output_name=output_name, stop_file=stop_file, interval=interval
+        )
+        if target_error <= 0.0:
+            logger.error(f"target_error={target_error} should be positive.")
+            raise ValueError
+        self.target_error = target_error
+        self.fort12 = fort12
+        self.correct = correct
+        self.safety_factor = safety_factor
+        self.min_bins = min_bins
+        self.min_autocorrelation_times = min_autocorrelation_times
+        self.energy = None
+        self.error = None
+        self.projected_records = None
+        self.__io_fort12 = None
+
+    def converged(self, io_output: IO_output) -> bool:
+        fort12 = os.path.join(
+            os.path.dirname(os.path.abspath(self.output_name)), self.fort12
+        )
+        if not os.path.isfile(fort12):
+            return False
+        # the records are remapped only when fort.12 has grown
+        if self.__io_fort12 is None or self.__io_fort12.fort12 != fort12:
+            self.__io_fort12 = IO_fort12(fort12)
+        io_fort12 = self.__io_fort12
+        num_records = io_fort12.num_records
+        if num_records < 2 * self.min_bins:
+            return False
+        binning = io_fort12.auto_binning()
+        bin, init = binning["bin"], binning["init"] * binning["bin"]
+        tau = binning["autocorrelation_time"]
+        if (num_records - init) // bin < self.min_bins:
+            return False
+        if num_records - init < self.min_autocorrelation_times * tau:
+            return False
+        self.energy, self.error = io_fort12.energy(
+            bin=bin, init=init, correct=self.correct
+        )
+        ratio = self.error * self.safety_factor / self.target_error
+        self.projected_records = int(np.ceil(init + (num_records - init) * ratio**2))
+        logger.info(
+            f"E = {self.energy} +- {self.error} Ha with {num_records} records,"
+            f" {self.projected_records} records projected"
+            f" for the target error {self.target_error} Ha."
+        )
+        return bool(ratio <= 1.0)
@@ -0,0 +1,322 @@
+#!python -u
+# -*- coding: utf-8 -*-
+
+"""
+
+task_farm: run batches of independent *_genius jobs on a local node
+
+Each job is run by a fresh python process (python -m
+turbogenius.utils_workflows.task_farm), in its own working directory, pinned
+to its own cores, with the TurboRVB run command (TURBOVMC_RUN_COMMAND, see
+pyturbo.utils.env) set to its number of MPI ranks.
+
+"""
+
+from __future__ import print_function
+
+# python modules
+import os
+import sys
+import time
+import pickle
+import asyncio
+import subprocess
+import traceback
+import pandas as pd
+from typing import Optional
+
+# set logger
+from logging import getLogger, StreamHandler, Formatter
+
+# turbogenius module
+from turbogenius.pyturbo.utils.execute import run_coroutine, run_async
+
+logger = getLogger("Turbo-Genius").getChild(__name__)
+
+# the files written in the directory of each job
+job_file = "task_farm_job.pkl"
+result_file = "task_farm_result.pkl"
+
+
+def available_cores() -> list:
+    """
+    Return the cores available to this process.
+
+    Returns:
+        list: core ids
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+class TaskFarm:
+    """
+
+    This class runs independent *_genius jobs (e.g., VMC_genius, LRDMC_genius)
+    concurrently on a local node. The cores (num_cores) are split into slots
+    of cores_per_job cores, and each job is run in a free slot, with
+    ranks_per_job MPI ranks of cores_per_job // ranks_per_job OpenMP threads.
+
+    A job is a pair (working directory, genius), where genius is a *_genius
+    instance, or a picklable callable returning one (e.g.,
+    functools.partial(VMC_genius, vmcsteps=1000)), which is called in the
+    working directory (i.e., where fort.10 and pseudo.dat are). The method of
+    genius (e.g., run_all) is called in a fresh python process, whose log is
+    written to log_name in the working directory. A failed job does not stop
+    the others.
+
+    Attributes:
+         jobs (list): [(working directory, genius), ...]
+         cores_per_job (int): the number of cores of each job
+         ranks_per_job (int): the number of MPI ranks of each job,
+            None -> cores_per_job (i.e., flat MPI)
+         num_cores (int): the number of cores used, None -> all the available
+            ones (see available_cores)
+         run_command (str): the TurboRVB run command of each job, with the
+            placeholders {ranks}, {threads} and {cores} (the comma-separated
+            core ids), e.g., "mpirun -np {ranks} turborvb-mpi.x". None -> the
+            run command of the environment, which is used as it is.
+         method (str): the method of genius called (e.g., run_all, run)
+         method_kwargs (dict): the keyword arguments of method
+         pin (bool): if True, each job is pinned to the cores of its slot
+         timeout (float): timeout of each job (sec.), None -> no limit
+         log_name (str): the log file of each job
+         results (list): the genius of each job after the run (None if failed)
+
+    """
+
+    # attributes of genius collected into the table, if any
+    result_attributes = (
+        "energy",
+        "energy_error",
+        "forces",
+        "forces_error",
+        "estimated_time_for_1_generation",
+    )
+
+    def __init__(
+        self,
+        jobs: list,
+        cores_per_job: int = 1,
+        ranks_per_job: Optional[int] = None,
+        num_cores: Optional[int] = None,
+        run_command: Optional[str] = None,
+        method: str = "run_all",
+        method_kwargs: Optional[dict] = None,
+        pin: bool = True,
+        timeout: Optional[float] = None,
+        log_name: str = "out_task_farm",
+    ):
+        if ranks_per_job is None:
+            ranks_per_job = cores_per_job
+        if method_kwargs is None:
+            method_kwargs = {}
+        if cores_per_job < 1 or ranks_per_job < 1 or cores_per_job % ranks_per_job:
+            logger.error(
+                f"cores_per_job={cores_per_job} should be a multiple of"
+                f" ranks_per_job={ranks_per_job}."
+            )
+            raise ValueError
+        if run_command is None and ranks_per_job > 1:
+            logger.error(f"run_command is needed for ranks_per_job={ranks_per_job}.")
+            raise ValueError
+
+        cores = available_cores()
+        if num_cores is None:
+            num_cores = len(cores)
+        if num_cores > len(cores):
+            logger.warning(
+                f"num_cores={num_cores} is larger than the number of the"
+                f" available cores, {len(cores)}."
+            )
+            pin = False
+            cores = list(range(num_cores))
+        cores = cores[:num_cores]
+        self.slots = [
+            cores[i : i + cores_per_job]
+            for i in range(0, num_cores - cores_per_job + 1, cores_per_job)
+        ]
+        if len(self.slots) == 0:
+            logger.error(
+                f"cores_per_job={cores_per_job} is larger than num_cores={num_cores}."
+            )
+            raise ValueError
+
+        self.jobs = [(os.path.abspath(directory), genius) for directory, genius in jobs]
+        self.cores_per_job = cores_per_job
+        self.ranks_per_job = ranks_per_job
+        self.num_cores = num_cores
+        self.run_command = run_command
+        self.method = method
+        self.method_kwargs = method_kwargs
+        self.pin = pin
+        self.timeout = timeout
+        self.log_name = log_name
+        self.results = [None] * len(self.jobs)
+
+    def environment(self, cores: list) -> dict:
+        """
+        Return the environment of a job running on cores.
+
+        Args:
+            cores (list): core ids
+        Returns:
+            dict: environment
+        """
+        threads = self.cores_per_job // self.ranks_per_job
+        env = os.environ.copy()
+        for variable in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+            env[variable] = str(threads)
+        if self.run_command is not None:
+            env["TURBOVMC_RUN_COMMAND"] = self.run_command.format(
+                ranks=self.ranks_per_job,
+                threads=threads,
+                cores=",".join(str(core) for core in cores),
+            )
+        # the child sees the same modules as this process
+        env["PYTHONPATH"] = os.pathsep.join(
+            os.path.abspath(path) for path in sys.path if path
+        )
+        return env
+
+    async def __run_job(self, n: int, slots: asyncio.Queue) -> dict:
+        directory, genius = self.jobs[n]
+        row = {
+            "directory": directory,
+            "genius": getattr(
+                getattr(genius, "func", genius), "__name__", type(genius).__name__
+            ),
+            "status": "failed",
+        }
+        cores = await slots.get()
+        start = time.monotonic()
+        try:
+            with open(os.path.join(directory, job_file), "wb") as f:
+                pickle.dump(
+                    {
+                        "genius": genius,
+                        "method": self.method,
+                        "method_kwargs": self.method_kwargs,
+                        "cores": cores if self.pin else None,
+                    },
+                    f,
+                )
+            result_name = os.path.join(directory, result_file)
+            if os.path.isfile(result_name):
+                os.remove(result_name)
+            logger.info(f"Job {n} starts in {directory} on the cores {cores}.")
+            try:
+                await run_async(
+                    f"{sys.executable} -m {__name__} {job_file}",
+                    output_name=os.path.join(directory, self.log_name),
+                    timeout=self.timeout,
+                    cwd=directory,
+                    env=self.environment(cores),
+                )
+            except (subprocess.CalledProcessError, asyncio.TimeoutError) as e:
+                logger.error(f"Job {n} in {directory} failed: {e!r}")
+                row["error"] = repr(e)
+            if os.path.isfile(result_name):
+                with open(result_name, "rb") as f:
+                    result = pickle.load(f)
+                if "error" in result:
+                    row["error"] = result["error"]
+                else:
+                    row["status"] = "done"
+                    self.results[n] = result["genius"]
+                    for attribute in self.result_attributes:
+                        value = getattr(result["genius"], attribute, None)
+                        if value is not None:
+                            row[attribute] = value
+        except OSError as e:
+            logger.error(f"Job {n} in {directory} cannot be run: {e!r}")
+            row["error"] = repr(e)
+        finally:
+            slots.put_nowait(cores)
+        row["cores"] = ",".join(str(core) for core in cores)
+        row["ranks"] = self.ranks_per_job
+        row["elapsed"] = time.monotonic() - start
+        logger.info(f"Job {n} in {directory}: {row['status']}.")
+        return row
+
+    async def run_async(self) -> pd.DataFrame:
+        """
+        Run the jobs (see run).
+
+        Returns:
+            pd.DataFrame: the results, a row per job
+        """
+        slots = asyncio.Queue()
+        for cores in self.slots:
+            slots.put_nowait(cores)
+        logger.info(
+            f"{len(self.jobs)} jobs are run on {self.num_cores} cores,"
+            f" {len(self.slots)} at the same time."
+        )
+        rows = await asyncio.gather(
+            *[self.__run_job(n, slots) for n in range(len(self.jobs))]
+        )
+        columns = ["directory", "genius", "status", "cores", "ranks", "elapsed"]
+        return pd.DataFrame(rows).reindex(
+            columns=columns
+            + [
+                column
+                for column in self.result_attributes + ("error",)
+                if any(column in row for row in rows)
+            ]
+        )
+
+    def run(self) -> pd.DataFrame:
+        """
+        Run the jobs, and wait for all of them.
+
+        Returns:
+            pd.DataFrame: the results, a row per job (directory, genius, status
+                (done or failed), cores, ranks, elapsed (sec.), the
+                result_attributes of genius, and error)
+        """
+        return run_coroutine(self.run_async())
+
+
+def run_job(job_name: str = job_file) -> int:
+    """
+    Run a job of TaskFarm in the current directory, and write its result
+    (the genius after the run, or the error) to result_file.
+
+    Args:
+        job_name (str): the job file written by TaskFarm
+    Returns:
+        int: the exit status
+    """
+    try:
+        with open(job_name, "rb") as f:
+            job = pickle.load(f)
+        if job["cores"] is not None and hasattr(os, "sched_setaffinity"):
+            os.sched_setaffinity(0, job["cores"])
+        genius = job["genius"]
+        if callable(genius):
+            genius = genius()
+        getattr(genius, job["method"])(**job["method_kwargs"])
+        result = {"genius": genius}
+        status = 0
+    except Exception as e:
+        logger.error(traceback.format_exc())
+        result = {"error": repr(e)}
+        status = 1
+    with open(result_file, "wb") as f:
+        pickle.dump(result, f)
+    return status
+
+
+if __name__ == "__main__":
+    # the log of the job is written to the standard output
+    os.dup2(sys.stdout.fileno(), sys.stderr.fileno())
+    handler_format = Formatter("%(name)s - %(levelname)s - %(lineno)d - %(message)s")
+    for name in ("Turbo-Genius", "pyturbo"):
+        stream_handler = StreamHandler(sys.stdout)
+        stream_handler.setLevel("INFO")
+        stream_handler.setFormatter(handler_format)
+        getLogger(name).setLevel("INFO")
+        getLogger(name).addHandler(stream_handler)
+    sys.exit(run_job(*sys.argv[1:]))
@@ -22,6 +22,8 @@ from turbogenius.pyturbo.vmc import VMC
 from turbogenius.utils_workflows.env import turbo_genius_root
 from turbogenius.geniusIO import GeniusIO
 from turbogenius.pyturbo.io_fort10 import IO_fort10
+from turbogenius.pyturbo.io_fort12 import auto_binning_blocks
+from turbogenius.pyturbo.utils.watcher import Watcher, TargetErrorWatcher
 
 logger = getLogger("Turbo-Genius").getChild(__name__)
 
@@ -189,6 +191,7 @@ class VMC_genius(GeniusIO):
         cont: bool = False,
         input_name: str = "datasvmc.input",
         output_name: str = "out_vmc",
+        target_error: Optional[float] = None,
     ) -> None:
         """
         Generate input files and run the command.
@@ -196,11 +199,19 @@ class VMC_genius(GeniusIO):
         Args:
             input_name (str): input file name
             output_name (str): output file name
+            target_error (float): stop once the energy error bar reaches target_error (Ha), within vmcsteps.
+                The binning is then chosen from fort.12 (see TargetErrorWatcher).
 
         """
         self.generate_input(cont=cont, input_name=input_name)
-        self.run(input_name=input_name, output_name=output_name)
-        self.compute_energy_and_forces()
+        watcher = None
+        if target_error is not None:
+            if self.twist_average:
+                logger.error("target_error is not supported with twist_average.")
+                raise NotImplementedError
+            watcher = TargetErrorWatcher(target_error=target_error)
+        self.run(input_name=input_name, output_name=output_name, watcher=watcher)
+        self.compute_energy_and_forces(auto_binning=target_error is not None)
 
     def generate_input(
         self, cont: bool = False, input_name: str = "datasvmc.input"
@@ -217,15 +228,21 @@ class VMC_genius(GeniusIO):
             self.vmc.set_parameter("iopt", 0, "&simulation")
         self.vmc.generate_input(input_name=input_name)
 
-    def run(self, input_name="datasvmc.input", output_name="out_vmc"):
+    def run(
+        self,
+        input_name: str = "datasvmc.input",
+        output_name: str = "out_vmc",
+        watcher: Optional[Watcher] = None,
+    ):
         """
         Run the command.
 
         Args:
             input_name (str): input file name
             output_name (str): output file name
+            watcher (Watcher): if given, the run is stopped via stop.dat once converged (e.g., TargetErrorWatcher).
         """
-        self.vmc.run(input_name=input_name, output_name=output_name)
+        self.vmc.run(input_name=input_name, output_name=output_name, watcher=watcher)
         flags = self.vmc.check_results(output_names=[output_name])
         assert all(flags)
 
@@ -235,6 +252,7 @@ class VMC_genius(GeniusIO):
         warmupblocks: int = 5,
         output_names: Optional[list] = None,
         rerun: bool = False,
+        auto_binning: bool = False,
     ) -> bool:
         """
         Store results. This procedure stores estimated_time_for_1_generation, energy, and energy_error.
@@ -245,9 +263,12 @@ class VMC_genius(GeniusIO):
             warmupblocks (int): the number of disregarded blocks
             output_names (list): a list of output file names
             rerun (bool): if true, compute energy and force again even if there are energy and force files.
+            auto_binning (bool): if true, bin_block and warmupblocks are chosen from fort.12 (see auto_binning_blocks).
         """
         if output_names is None:
             output_names = ["out_vmc"]
+        if auto_binning:
+            bin_block, warmupblocks = auto_binning_blocks()
         self.estimated_time_for_1_generation = (
             self.get_estimated_time_for_1_generation(output_names=output_names)
         )
@@ -256,7 +277,11 @@ class VMC_genius(GeniusIO):
         )
 
     def compute_energy_and_forces(
-        self, bin_block: int = 10, warmupblocks: int = 5, rerun: bool = False
+        self,
+        bin_block: int = 10,
+        warmupblocks: int = 5,
+        rerun: bool = False,
+        auto_binning: bool = False,
     ) -> None:
         """
         Compute energy and forces
@@ -265,7 +290,10 @@ class VMC_genius(GeniusIO):
             bin_block (int): binning length
             warmupblocks (int): the number of disregarded blocks
             rerun (bool): if true, compute energy and force again even if there are energy and force files.
+            auto_binning (bool): if true, bin_block and warmupblocks are chosen from fort.12 (see auto_binning_blocks).
         """
+        if auto_binning:
+            bin_block, warmupblocks = auto_binning_blocks()
         self.energy, self.energy_error = self.vmc.get_energy(
             init=warmupblocks, bin=bin_block, rerun=rerun
         )
@@ -20,6 +20,7 @@ from logging import getLogger, StreamHandler, Formatter
 # turbogenius modules
 from turbogenius.pyturbo.vmcopt import VMCopt
 from turbogenius.pyturbo.io_fort10 import IO_fort10
+from turbogenius.pyturbo.utils.watcher import Watcher, ConvergenceWatcher
 from turbogenius.utils_workflows.env import turbo_genius_root
 from turbogenius.utils_workflows.utility import get_optimizer_flags
 from turbogenius.tools_genius import copy_jastrow_twist
@@ -316,6 +317,7 @@ class VMCopt_genius(GeniusIO):
         input_name: str = "datasmin.input",
         output_name: str = "out_min",
         average_parameters: bool = True,
+        watcher: Optional[Watcher] = None,
     ) -> None:
         """
         Generate input files and run the command.
@@ -326,10 +328,16 @@ class VMCopt_genius(GeniusIO):
             input_name (str): input file name
             output_name (str): output file name
             average_parameters (bool): if True, average the optimized parameters
+            watcher (Watcher): if given, the optimization is stopped via stop.dat once converged (e.g., ConvergenceWatcher).
 
         """
         self.generate_input(cont=cont, input_name=input_name)
-        self.run(input_name=input_name, output_name=output_name)
+        if average_parameters and isinstance(watcher, ConvergenceWatcher):
+            # keep enough steps for averaging the parameters
+            watcher.min_iterations = max(
+                watcher.min_iterations, optwarmsteps + watcher.num_iterations
+            )
+        self.run(input_name=input_name, output_name=output_name, watcher=watcher)
         if average_parameters:
             self.average(
                 optwarmupsteps=optwarmsteps,
@@ -355,7 +363,10 @@ class VMCopt_genius(GeniusIO):
         self.vmcopt.generate_input(input_name=input_name)
 
     def run(
-        self, input_name: str = "datasmin.input", output_name: str = "out_min"
+        self,
+        input_name: str = "datasmin.input",
+        output_name: str = "out_min",
+        watcher: Optional[Watcher] = None,
     ) -> None:
         """
         Run the command.
@@ -363,8 +374,11 @@ class VMCopt_genius(GeniusIO):
         Args:
             input_name (str): input file name
             output_name (str): output file name
+            watcher (Watcher): if given, the optimization is stopped via stop.dat once converged (e.g., ConvergenceWatcher).
         """
-        self.vmcopt.run(input_name=input_name, output_name=output_name)
+        self.vmcopt.run(
+            input_name=input_name, output_name=output_name, watcher=watcher
+        )
         flags = self.vmcopt.check_results(output_names=[output_name])
         assert all(flags)
 
@@ -419,6 +433,9 @@ class VMCopt_genius(GeniusIO):
         input_name: str = "datasmin.input",
         output_names: Optional[list] = None,
         graph_plot: bool = False,
+        native: bool = False,
+        graph_mode: str = "single",
+        workers: int = 1,
     ) -> None:
         """
         Average parameters of fort.10
@@ -428,6 +445,9 @@ class VMCopt_genius(GeniusIO):
             input_name (str): the input file used in the latest calculation
             output_names (list): a list of output file names
             graph_plot (bool): Flag for plotting a graph
+            native (bool): Flag for averaging jasmat and detmat in Python, if possible
+            graph_mode (str): "single" or "pages" (parameters per page, in parallel)
+            workers (int): the number of processes (graph_mode="pages")
         """
         if output_names is None:
             output_names = ["out_min"]
@@ -465,6 +485,9 @@ class VMCopt_genius(GeniusIO):
             equil_steps=optwarmupsteps,
             input_file_used=input_name,
             graph_plot=graph_plot,
+            native=native,
+            graph_mode=graph_mode,
+            workers=workers,
         )
 
         if twist_average_copyjas:
@@ -520,14 +543,31 @@ class VMCopt_genius(GeniusIO):
             output_names=output_names
         )
 
-    def plot_parameters_history(self, interactive: bool = True) -> None:
+    def plot_parameters_history(
+        self,
+        interactive: bool = True,
+        mode: str = "single",
+        workers: int = 1,
+        fmt: str = "png",
+        native: bool = False,
+    ) -> None:
         """
         plot history of optimized variational parameters
 
         Args:
             interactive (bool): flag for an interactive plot
+            mode (str): "single" (a figure per parameter) or "pages" (rendered in parallel)
+            workers (int): the number of processes (mode="pages")
+            fmt (str): "png" or "pdf" (mode="pages")
+            native (bool): Flag for reading the history from fort.12 without readalles.x
         """
-        self.vmcopt.plot_parameters_history(interactive=interactive)
+        self.vmcopt.plot_parameters_history(
+            interactive=interactive,
+            mode=mode,
+            workers=workers,
+            fmt=fmt,
+            native=native,
+        )
 
 
 if __name__ == "__main__":